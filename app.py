@@ -1,288 +1,103 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from PyPDF2 import PdfReader
-import requests
-import justext
-import re
-from nltk.tokenize import sent_tokenize
-import nltk
-# Assuming nltk has been previously downloaded and set up
-nltk.download("punkt")
-nltk.download("wordnet")
+import numpy as np
 
-# Define the subjects of interest with their synonyms
-selected_subjects = selected_subjects = {'Économie': ['économie',
-  'économies',
-  'économies',
-  'finances',
-  'marché',
-  'marchés',
-  'marchés',
-  'croissance',
-  'croissances',
-  'croissances',
-  'investissement étranger',
-  'investissement étrangers',
-  'investissement étrangers',
-  'politique économique',
-  'politique économiques',
-  'politique économiques'],
- 'Finance': ['finance',
-  'finances',
-  'finances',
-  'investissement',
-  'investissements',
-  'investissements',
-  'banque',
-  'banques',
-  'banques',
-  'budget',
-  'budgets',
-  'budgets',
-  'finances'],
- 'Gaz': ['gaz naturel',
-  'gaz naturels',
-  'gaz naturels',
-  'énergie fossile',
-  'énergie fossiles',
-  'énergie fossiles',
-  'exploitation gazière',
-  'exploitation gazières',
-  'exploitation gazières',
-  'gazoduc',
-  'gazoducs',
-  'gazoducs'],
- 'Éducation': ['éducation',
-  'éducations',
-  'éducations',
-  'scolarité',
-  'scolarités',
-  'scolarités',
-  'apprentissage',
-  'apprentissages',
-  'apprentissages',
-  'formation',
-  'formations',
-  'formations'],
- 'Agriculture': ['agriculture',
-  'agricultures',
-  'agricultures',
-  'cultures',
-  'agroalimentaire',
-  'agroalimentaires',
-  'agroalimentaires',
-  'cultivateurs'],
- 'Industrialisation': ['industrialisation',
-  'industrialisations',
-  'industrialisations',
-  'manufacture',
-  'manufactures',
-  'manufactures',
-  'production',
-  'productions',
-  'productions',
-  'usine',
-  'usines',
-  'usines'],
- 'Pêche': ['pêche',
-  'pêches',
-  'pêches',
-  'pisciculture',
-  'piscicultures',
-  'piscicultures',
-  'aquaculture',
-  'aquacultures',
-  'aquacultures',
-  'maritime',
-  'maritimes',
-  'maritimes'],
- 'Emploi': ['emploi',
-  'emplois',
-  'emplois',
-  'travail',
-  'travails',
-  'travails',
-  'marché du travail',
-  'marché du travails',
-  'marché du travails',
-  'chômage',
-  'chômages',
-  'chômages'],
- 'Gouvernance': ['gouvernance',
-  'gouvernances',
-  'gouvernances',
-  'administration',
-  'administrations',
-  'administrations',
-  'politique',
-  'politiques',
-  'politiques',
-  'leadership',
-  'leaderships',
-  'leaderships'],
- 'Transparence': ['transparence',
-  'transparences',
-  'transparences',
-  'responsabilité',
-  'responsabilités',
-  'responsabilités',
-  'ouverture',
-  'ouvertures',
-  'ouvertures',
-  'intégrité',
-  'intégrités',
-  'intégrités'],
- 'Justice': ['justice',
-  'justices',
-  'justices',
-  'tribunal',
-  'tribunals',
-  'tribunals',
-  'légal',
-  'légals',
-  'légals',
-  'droits'],
- 'Sécurité': ['sécurité',
-  'sécurités',
-  'sécurités',
-  'défense',
-  'défenses',
-  'défenses',
-  'protection',
-  'protections',
-  'protections',
-  'sûreté',
-  'sûretés',
-  'sûretés'],
- 'Numérique': ['numérique',
-  'numériques',
-  'numériques',
-  'technologie',
-  'technologies',
-  'technologies',
-  'informatique',
-  'informatiques',
-  'informatiques',
-  'innovation',
-  'innovations',
-  'innovations'],
- 'Santé': ['santé',
-  'santés',
-  'santés',
-  'soins médicaux',
-  'soins médicauxs',
-  'soins médicauxs',
-  'hôpital',
-  'hôpitals',
-  'hôpitals',
-  'prévention',
-  'préventions',
-  'préventions',
-  'médecine',
-  'médecines',
-  'médecines'],
- 'Infrastructure': ['infrastructure',
-  'infrastructures',
-  'routes',
-  'ponts',
-  'transports'],
- 'Environnement': ['environnement',
-  'environnements',
-  'écologie',
-  'écologies',
-  'développement durable',
-  'développement durables',
-  'protection de la nature',
-  'protection de la natures'],
- 'Énergie': ['énergie',
-  'énergies',
-  'renouvelable',
-  'renouvelables',
-  'solaire',
-  'solaires',
-  'éolienne',
-  'éoliennes',
-  'hydroélectrique',
-  'hydroélectriques'],
- 'Santé Publique': ['santé publique',
-  'santé publiques',
-  'prévention',
-  'préventions',
-  'vaccination',
-  'vaccinations',
-  'politiques de santé',
-  'politiques de santés'],
- 'Technologie et Innovation': ['technologie',
-  'technologies',
-  'innovation',
-  'innovations',
-  'startup',
-  'startups',
-  'numérique',
-  'numériques',
-  'futur',
-  'futurs'],
- 'Culture': ['culture',
-  'cultures',
-  'patrimoine',
-  'patrimoines',
-  'arts',
-  'traditions'],
- 'Sport': ['sport',
-  'sports',
-  'activités physiques',
-  'infrastructures sportives',
-  'événements sportifs'],
- 'Tourisme': ['tourisme',
-  'tourismes',
-  'promotion',
-  'promotions',
-  'sites touristiques',
-  'culture et patrimoine',
-  'culture et patrimoines'],
- 'Politique Sociale': ['politique sociale',
-  'politique sociales',
-  'inclusion',
-  'inclusions',
-  'solidarité',
-  'solidarités',
-  'aide sociale',
-  'aide sociales'],
- 'Droits Humains': ['droits humains',
-  'libertés fondamentales',
-  'égalité',
-  'égalités',
-  'justice sociale',
-  'justice sociales']}
+from diangat.bounded import MemoryCeiling, MemoryLimitExceeded
+from diangat.charts import draw_chart, heatmap, proportion_bars
+from diangat.disk_cache import content_hash
+from diangat.index import iter_pdf_indexes
+from diangat.progress import streamlit_progress
+from diangat.resources import nltk_data_ready
+from diangat.subjects import selected_subjects
+from diangat.theme_matrix import ThemeMatrix
+from diangat.timing import finish_run, show_diagnostics, span, start_run
 
 st.set_page_config(page_title="Jàngat - App", page_icon="https://thumb.ac-illust.com/41/4137d1a06f24fba4ad746d7672551894_t.jpeg")
 
-# Function to scrape content from PDF
-def scrape_content_pdf(pdf_file):
+# Timing of the stages of this rerun, shown in the sidebar at the end of the script
+run = start_run("app")
+
+# Function to index several PDFs, with the pages spread over the CPU cores. An upload is
+# only extracted and indexed once; switching themes afterwards reuses its index. The
+# indexes of one analysis are held under `ceiling` together.
+def iter_indexes_pdf(pdf_files, ceiling):
+    progress = streamlit_progress(label="Pages extraites :")
     try:
-        pdf_reader = PdfReader(pdf_file)
-        total_pages = len(pdf_reader.pages)
-        extracted_text = [pdf_reader.pages[i].extract_text() for i in range(total_pages)]
-        content_text = " ".join(extracted_text)
-        ###st.info(f"Nombre de pages dans le document '{pdf_file.name.replace('.pdf', '')}': {total_pages}")
-        return content_text
+        for idx, index in iter_pdf_indexes(pdf_files, ceiling=ceiling, on_page=progress.update):
+            if isinstance(index, MemoryLimitExceeded):
+                st.error(f"Analyse interrompue, mémoire insuffisante : {str(index)}")
+                continue
+            if isinstance(index, Exception):
+                st.error(f"Error extracting text from PDF: {str(index)}")
+                continue
+            yield idx, index
     except Exception as e:
         st.error(f"Error extracting text from PDF: {str(e)}")
-        return None
+    progress.finish()
 
-# Updated function to find subject occurrences in text
-def find_subject_occurrences(text, subject_terms):
-    occurrences = 0
-    sentences = sent_tokenize(text, language='french')
+title_map = {
+      'Numérique': "Poids du numérique dans chaque programme",
+      'Économie': "Poids de l'économie dans chaque programme",
+      'Agriculture': "Poids de l'agriculture dans chaque programme",
+      'Éducation': "Poids de l'éducation dans chaque programme",
+      'Industrialisation': "Poids de l'Industrialisation dans chaque programme",
+      'Justice': "Poids de la justice dans chaque programme",
+      'Santé': "Poids de la santé dans chaque programme",
+      'Infrastructure': "Poids des Infrastructures dans chaque programme",
+      # Ajoutez d'autres mappages de titres pour les thématiques restantes si nécessaire
+  }
+
+# Bar chart of the proportion of the selected subject in each programme
+def plot_proportions(file_names, result_counts, selected_subject):
+    # Utilisez `selected_subject` pour déterminer le titre spécifique
+    specific_title = title_map.get(selected_subject, f"Proportion de '{selected_subject}' dans chaque programme")
+    return proportion_bars(
+        file_names,
+        result_counts,
+        specific_title,
+        label_title="Candidats",
+        value_title="Proportion",
+    )
+
+# Heatmap of the proportion of every theme in every programme
+def plot_heatmap(matrix):
+    return heatmap(
+        matrix.proportions(),
+        matrix.themes,
+        matrix.documents,
+        "Poids de chaque thématique dans chaque programme",
+        x_title="Thématiques",
+        y_title="Candidats",
+        color_title="Proportion",
+    )
 
-    pattern = re.compile(r"\b(?:{})\b".format("|".join(map(re.escape, subject_terms))), re.IGNORECASE)
+# Draws the selected view of a document x theme matrix: the proportions of one theme are a
+# column of the matrix, the heatmap all of it
+def draw_matrix(container, matrix, selected_subject, view):
+    if view == "Toutes les thématiques":
+        draw_chart(container, plot_heatmap(matrix))
+    else:
+        draw_chart(
+            container,
+            plot_proportions(
+                matrix.documents, matrix.theme_proportions(selected_subject), selected_subject
+            ),
+        )
 
-    for sentence in sentences:
-        if re.search(pattern, sentence):
-            occurrences += 1
+# Heatmap of the pairwise similarity of the programmes, the closest ones side by side
+def plot_similarity(documents, similarity, basis):
+    from diangat.similarity import cluster_order
 
-    return occurrences, len(sentences)
+    order = cluster_order(similarity)
+    names = [documents[i] for i in order]
+    return heatmap(
+        similarity[np.ix_(order, order)],
+        names,
+        names,
+        f"Proximité des programmes ({basis.lower()})",
+        color_title="Similarité",
+        zmin=0,
+        zmax=1,
+    )
 
 # Streamlit UI
 st.title("Comparateur de programmes")
@@ -294,50 +109,67 @@ selected_subject = st.selectbox("Sélectionner une thématique", list(selected_s
 # PDF file uploader
 pdf_files = st.file_uploader("Charger jusqu'à cinq fichiers PDF", type=["pdf"], accept_multiple_files=True)
 
-if st.button("Analyser"):
+view = st.radio("Affichage", ("Une thématique", "Toutes les thématiques"))
+
+# The matrix of the last analysis stays valid as long as the same files are uploaded: same
+# contents, and same names since they label the matrix
+upload_key = tuple(
+    (pdf_file.name, content_hash(pdf_file.getvalue())) for pdf_file in pdf_files or []
+)
+chart = st.empty()
+drawn_matrix = None
+
+if st.button("Analyser") and nltk_data_ready():
     if pdf_files and len(pdf_files) <= 17:
-        result_counts = []
-        file_names = []
-        
-        for pdf_file in pdf_files:
-            sample_text = scrape_content_pdf(pdf_file)
-            if sample_text:
-                occurrences, total_sentences = find_subject_occurrences(
-                    sample_text, selected_subjects[selected_subject]
+        indexes = {}
+
+        # All the themes are counted at once; the chart is redrawn each time a programme is
+        # analysed, in upload order
+        # Memory the whole analysis of the uploads may add to the process
+        ceiling = MemoryCeiling()
+        for idx, index in iter_indexes_pdf(pdf_files, ceiling):
+            if index.total_sentences:
+                indexes[idx] = index
+                done = sorted(indexes)
+                matrix = ThemeMatrix.from_indexes(
+                    [pdf_files[i].name.replace(".pdf", "") for i in done],
+                    [indexes[i] for i in done],
+                    selected_subjects,
                 )
-                proportion = occurrences / total_sentences if total_sentences else 0
-                result_counts.append(proportion)
-                file_names.append(pdf_file.name.replace(".pdf", ""))
-                
-        # Visualization
-        proportions_df = pd.DataFrame({
-            "Candidats": file_names,
-            "Proportion": result_counts
-        })
-        title_map = {
-      'Numérique': "Poids du numérique dans chaque programme",
-      'Économie': "Poids de l'économie dans chaque programme",
-      'Agriculture': "Poids de l'agriculture dans chaque programme",
-      'Éducation': "Poids de l'éducation dans chaque programme",
-      'Industrialisation': "Poids de l'Industrialisation dans chaque programme",
-      'Justice': "Poids de la justice dans chaque programme",
-      'Santé': "Poids de la santé dans chaque programme",
-      'Infrastructure': "Poids des Infrastructures dans chaque programme",
-      # Ajoutez d'autres mappages de titres pour les thématiques restantes si nécessaire
-  }
-        # Utilisez `selected_subject` pour déterminer le titre spécifique
-        specific_title = title_map.get(selected_subject, f"Proportion de '{selected_subject}' dans chaque programme")
-        fig = px.bar(
-            proportions_df,
-            x="Candidats",
-            y="Proportion",
-            text=proportions_df["Proportion"].apply(lambda x: f"{x:.2%}"),
-            ##labels={"Proportion": "Proportion de la thématique", "Fichier": ""},
-            title=specific_title,
-            color="Proportion",
-            color_continuous_scale=px.colors.qualitative.Safe,
-        )
-        st.plotly_chart(fig)
+                draw_matrix(chart, matrix, selected_subject, view)
+                drawn_matrix = matrix
+        if indexes:
+            st.session_state["theme_matrix"] = (upload_key, matrix)
+            # Cosine similarity of the TF-IDF term vectors, computed once per set of uploads
+            with span("similarity"):
+                from diangat.similarity import term_similarity
+
+                similarity = term_similarity([indexes[i].term_counts() for i in sorted(indexes)])
+            st.session_state["term_similarity"] = (upload_key, similarity)
     else:
         st.error("Veuillez télécharger entre 1 et 5 fichiers PDF.")
 
+# Changing the theme or the view only slices the stored matrix
+stored = st.session_state.get("theme_matrix")
+if stored is not None and stored[0] == upload_key and stored[1] is not drawn_matrix:
+    draw_matrix(chart, stored[1], selected_subject, view)
+
+stored_similarity = st.session_state.get("term_similarity")
+if (
+    stored is not None
+    and stored[0] == upload_key
+    and stored_similarity is not None
+    and stored_similarity[0] == upload_key
+    and len(stored[1].documents) > 1
+):
+    st.subheader("Proximité entre candidats")
+    basis = st.radio("Similarité calculée sur", ("Le vocabulaire", "Les thématiques"))
+    if basis == "Le vocabulaire":
+        similarity = stored_similarity[1]
+    else:
+        from diangat.similarity import theme_similarity
+
+        similarity = theme_similarity(stored[1])
+    draw_chart(st, plot_similarity(stored[1].documents, similarity, basis))
+
+show_diagnostics(finish_run(run))
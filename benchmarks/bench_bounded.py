@@ -0,0 +1,99 @@
+"""Large PDF benchmark: in-memory page lists versus the bounded-memory mode.
+
+Run from the repository root with `python -m benchmarks.bench_bounded`. Each mode indexes
+the same synthetic PDF in a fresh interpreter, so that the peak resident memory reported
+by the system belongs to that mode alone. Next to it, the peak of the data the analysis
+itself holds (pages, page offsets, posting lists) is reported as `MemoryCeiling` accounts
+it. The last mode indexes the PDF again from the pages the bounded mode spooled to the
+page cache.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import make_pages, make_pdf
+
+MODES = ["memory", "bounded", "bounded_cached"]
+
+
+# Runs in the child interpreter: index the PDF and print the measures as JSON
+def run_mode(mode, pdf_path):
+    from diangat.bounded import MemoryCeiling
+    from diangat.index import DocumentIndex, build_bounded_index
+    from diangat.pdf_text import extract_pages
+
+    ceiling = MemoryCeiling(max_bytes=None)
+    start = time.perf_counter()
+    if mode == "memory":
+        pages = extract_pages(pdf_path)
+        ceiling.hold(sum(sys.getsizeof(page) for page in pages))
+        index = DocumentIndex.build(pages, ceiling=ceiling)
+    else:
+        index = build_bounded_index(pdf_path, ceiling=ceiling)
+    seconds = time.perf_counter() - start
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_bytes = max_rss if sys.platform == "darwin" else max_rss * 1024
+    record = {
+        "seconds": seconds,
+        "peak_rss": peak_bytes,
+        "peak_held": ceiling.peak,
+        "sentences": index.total_sentences,
+    }
+    print(json.dumps(record))
+
+
+def measure(mode, pdf_path, cache_dir):
+    env = dict(os.environ, DIANGAT_CACHE_DIR=str(cache_dir))
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_bounded", "--child", mode, str(pdf_path)],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[200, 600, 1200])
+    parser.add_argument("--json", action="store_true", help="one JSON record per line")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PDF"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(*args.child)
+        return
+
+    if not args.json:
+        print(
+            f"{'pages':>6} {'mode':>14} {'seconds':>9} {'peak RSS (MB)':>14} "
+            f"{'held (MB)':>10}"
+        )
+    with tempfile.TemporaryDirectory(prefix="diangat-bench-") as tmp_dir:
+        for page_count in args.pages:
+            pdf_path = Path(tmp_dir) / f"programme-{page_count}.pdf"
+            pdf_path.write_bytes(make_pdf(make_pages(page_count)))
+            for mode in MODES:
+                # An empty cache directory per mode, so that both uncached modes run PyPDF2
+                cache_mode = "bounded" if mode == "bounded_cached" else mode
+                cache_dir = Path(tmp_dir) / f"cache-{page_count}-{cache_mode}"
+                result = measure(mode, pdf_path, cache_dir)
+                if args.json:
+                    record = dict(result, benchmark="bounded", pages=page_count, mode=mode)
+                    print(json.dumps(record))
+                else:
+                    print(
+                        f"{page_count:>6} {mode:>14} {result['seconds']:>9.2f} "
+                        f"{result['peak_rss'] / 2**20:>14.1f} {result['peak_held'] / 2**20:>10.1f}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Chart benchmark: Plotly Express from a DataFrame versus the array-built, cached charts.
+
+Run from the repository root with `python -m benchmarks.bench_charts`. For each number of
+themes, the horizontal bar chart of keep_app and the document x theme heatmap of app.py
+are built the way they used to be (DataFrame, `.apply` formatting of every bar, default
+template) and through `diangat.charts`, first on a cold cache and then for a redraw of the
+same results. The size of the JSON spec each figure sends to the browser is reported next
+to the build and serialization time.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from diangat import charts
+
+
+# Historical build: DataFrame, one formatted string per bar, the whole default template
+def express_bars(labels, values):
+    import pandas as pd
+    import plotly.express as px
+
+    proportions_df = pd.DataFrame(zip(labels, values), columns=["Thématiques", "Proportions"])
+    return px.bar(
+        proportions_df,
+        x="Proportions",
+        y="Thématiques",
+        orientation="h",
+        text=proportions_df["Proportions"].apply(lambda x: f"{x:.2%}"),
+        labels={"Proportions": "Proportions (%)", "Thématiques": "Thématiques"},
+        title="Proportions",
+        color=proportions_df["Proportions"],
+        color_continuous_scale=px.colors.qualitative.Safe,
+        width=800,
+        height=600,
+    )
+
+
+def express_heatmap(matrix, themes, documents):
+    import plotly.express as px
+
+    return px.imshow(
+        matrix,
+        x=themes,
+        y=documents,
+        labels={"x": "Thématiques", "y": "Candidats", "color": "Proportion"},
+        title="Poids de chaque thématique dans chaque programme",
+        color_continuous_scale="Blues",
+        aspect="auto",
+    )
+
+
+def compact_bars(labels, values):
+    return charts.proportion_bars(
+        labels,
+        values,
+        "Proportions",
+        orientation="h",
+        label_title="Thématiques",
+        value_title="Proportions (%)",
+        width=800,
+        height=600,
+    )
+
+
+def compact_heatmap(matrix, themes, documents):
+    return charts.heatmap(
+        matrix,
+        themes,
+        documents,
+        "Poids de chaque thématique dans chaque programme",
+        x_title="Thématiques",
+        y_title="Candidats",
+        color_title="Proportion",
+    )
+
+
+# Best time of `repeat` builds plus serializations, and the size of the spec
+def time_express(build, args, repeat):
+    import plotly.io as pio
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        spec = pio.to_json(build(*args), validate=False)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(spec.encode("utf-8"))
+
+
+def time_compact(build, args, repeat):
+    import plotly.io as pio
+
+    cold = None
+    for _ in range(repeat):
+        charts._figure_cache.clear()
+        start = time.perf_counter()
+        chart = build(*args)
+        pio.to_json(chart.figure, validate=False)
+        elapsed = time.perf_counter() - start
+        cold = elapsed if cold is None else min(cold, elapsed)
+    # A redraw of the same results: the cached figure is only serialized again
+    start = time.perf_counter()
+    for _ in range(repeat):
+        pio.to_json(build(*args).figure, validate=False)
+    warm = (time.perf_counter() - start) / repeat
+    return cold, warm, chart.payload_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--themes", type=int, nargs="+", default=[6, 24, 96])
+    parser.add_argument("--documents", type=int, default=17)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="one JSON record per line")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Imports and first-call set-up are not part of the timings
+    time_express(express_bars, (["a"], [0.5]), 1)
+    time_compact(compact_bars, (["a"], [0.5]), 1)
+
+    if not args.json:
+        print(
+            f"{'chart':<8} {'themes':>6} {'express s':>10} {'bytes':>8} "
+            f"{'compact s':>10} {'redraw s':>9} {'bytes':>8}"
+        )
+    for theme_count in args.themes:
+        themes = [f"Thématique {idx}" for idx in range(theme_count)]
+        documents = [f"Candidat {idx}" for idx in range(args.documents)]
+        matrix = rng.random((args.documents, theme_count)) / 5
+        cases = [
+            ("bars", express_bars, compact_bars, (themes, matrix[0])),
+            ("heatmap", express_heatmap, compact_heatmap, (matrix, themes, documents)),
+        ]
+        for chart, express, compact, chart_args in cases:
+            express_seconds, express_bytes = time_express(express, chart_args, args.repeat)
+            cold, warm, compact_bytes = time_compact(compact, chart_args, args.repeat)
+            if args.json:
+                record = {
+                    "benchmark": "charts",
+                    "chart": chart,
+                    "themes": theme_count,
+                    "documents": args.documents,
+                    "express_seconds": express_seconds,
+                    "express_bytes": express_bytes,
+                    "compact_seconds": cold,
+                    "compact_redraw_seconds": warm,
+                    "compact_bytes": compact_bytes,
+                }
+                print(json.dumps(record))
+            else:
+                print(
+                    f"{chart:<8} {theme_count:>6} {express_seconds:>10.4f} {express_bytes:>8} "
+                    f"{cold:>10.4f} {warm:>9.4f} {compact_bytes:>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Cold start benchmark: import cost of each Streamlit app and of the dependencies it defers.
+
+Run from the repository root with `python -m benchmarks.bench_imports`. Every measure is
+taken in a fresh interpreter with `python -X importtime`, as on a new container: the
+top-level imports of each app script are run after `import streamlit`, and the
+cumulative time of each module they pull in is reported. The heavy dependencies that are
+only imported on the code path that needs them are then timed one by one, which is what
+the first visit of the matching page costs. With `--first-run`, the whole script is also
+run once through `streamlit.testing`, as a proxy for the time to first paint.
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import time
+
+APPS = ["app.py", "keep_app.py", "main.py"]
+
+# Imported inside the functions using them, hence not part of the cold start
+DEFERRED = [
+    "nltk",
+    "openai",
+    "matplotlib.pyplot",
+    "pandas",
+    "wordcloud",
+    "yake",
+    "scipy.cluster.hierarchy",
+    "scipy.sparse",
+    "pytube",
+    "youtube_transcript_api",
+    "justext",
+]
+
+
+# Import statements at the top level of a script, in order
+def top_level_imports(path):
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    return [
+        ast.get_source_segment(source, node)
+        for node in ast.parse(source, path).body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+
+
+# Cumulative import time of the modules imported directly by `code`, in seconds
+def import_times(code):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONPATH=os.getcwd()),
+    )
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented by two spaces per level below the one importing them
+        if not cumulative.strip().isdigit() or name[1:].startswith(" "):
+            continue
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+# Import time of `code` once `baseline` is imported, per module it pulls in
+def extra_import_times(code, baseline):
+    before = import_times(baseline)
+    return {
+        name: seconds
+        for name, seconds in import_times(f"{baseline}\n{code}").items()
+        if name not in before
+    }
+
+
+def measure_app(path, baseline):
+    return extra_import_times("\n".join(top_level_imports(path)), baseline)
+
+
+def measure_module(module, baseline):
+    return sum(extra_import_times(f"import {module}", baseline).values())
+
+
+# Wall time of the first run of a script in a fresh interpreter
+def first_run(path, timeout):
+    code = (
+        "import time\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        "start = time.perf_counter()\n"
+        f"AppTest.from_file({path!r}, default_timeout={timeout}).run()\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONPATH=os.getcwd()),
+    )
+    total = time.perf_counter() - start
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return total, float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", nargs="+", default=APPS)
+    parser.add_argument("--deferred", nargs="+", default=DEFERRED)
+    parser.add_argument("--baseline", default="import streamlit", help="code run beforehand")
+    parser.add_argument("--first-run", action="store_true", help="also run each app once")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--json", action="store_true", help="one JSON record per line")
+    args = parser.parse_args()
+
+    for path in args.apps:
+        times = measure_app(path, args.baseline)
+        if args.json:
+            record = {
+                "benchmark": "imports",
+                "app": path,
+                "modules": times,
+                "total_seconds": sum(times.values()),
+            }
+            print(json.dumps(record))
+        else:
+            print(f"{path}: {sum(times.values()):.3f} s of top-level imports after streamlit")
+            for name, seconds in sorted(times.items(), key=lambda item: -item[1]):
+                print(f"  {name:<32} {seconds:>8.3f}")
+
+    if not args.json:
+        print("deferred until first use:")
+    for module in args.deferred:
+        try:
+            seconds = measure_module(module, args.baseline)
+        except RuntimeError as e:
+            seconds, error = None, str(e)
+        else:
+            error = None
+        if args.json:
+            record = {"benchmark": "imports", "deferred": module, "seconds": seconds}
+            if error:
+                record["error"] = error
+            print(json.dumps(record))
+        elif error:
+            print(f"  {module:<32} {error}")
+        else:
+            print(f"  {module:<32} {seconds:>8.3f}")
+
+    if args.first_run:
+        if not args.json:
+            print("first run:")
+        for path in args.apps:
+            total, script = first_run(path, args.timeout)
+            if args.json:
+                record = {
+                    "benchmark": "imports",
+                    "first_run": path,
+                    "process_seconds": total,
+                    "script_seconds": script,
+                }
+                print(json.dumps(record))
+            else:
+                print(f"  {path:<32} {script:>8.3f} script {total:>8.3f} process")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Insights benchmark: one request per chunk after the other versus the concurrent cached
+map-reduce.
+
+Run from the repository root with `python -m benchmarks.bench_insights`. A local stub of an
+OpenAI-compatible server stands for the language model: it waits `--latency` seconds before
+answering each request. The synthetic document is cut into chunks once; the sequential
+baseline sends them one by one, then `summarize` runs on an empty insights cache for each
+concurrency, and once more on the filled cache, as when the same text is analysed again.
+The rate limit is lifted so that only the latency of the backend is measured.
+"""
+import argparse
+import json
+import tempfile
+import time
+
+from diangat.disk_cache import DiskCache
+from diangat.insights import (
+    CHUNK_TOKENS,
+    MAP_PROMPT,
+    MAX_TOKENS,
+    OVERLAP_TOKENS,
+    HTTPBackend,
+    chunk_text,
+    start_stub_server,
+    summarize,
+)
+from diangat.segmentation import get_sentence_tokenizer
+
+from benchmarks.synthetic import make_pages
+
+
+# Historical behaviour: every chunk sent after the previous answer, nothing kept
+def sequential(backend, chunks):
+    return [backend.complete(MAP_PROMPT.format(text=chunk), MAX_TOKENS) for chunk in chunks]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=40, help="size of the document")
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per request")
+    parser.add_argument("--chunk-tokens", type=int, default=CHUNK_TOKENS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--json", action="store_true", help="one JSON record per line")
+    args = parser.parse_args()
+
+    get_sentence_tokenizer()
+    text = " ".join(make_pages(args.pages))
+    overlap_tokens = min(OVERLAP_TOKENS, args.chunk_tokens // 4)
+    server = start_stub_server(latency=args.latency)
+    backend = HTTPBackend(f"http://127.0.0.1:{server.server_port}/v1", model="stub")
+    chunks = chunk_text(text, args.chunk_tokens, overlap_tokens)
+
+    start = time.perf_counter()
+    sequential(backend, chunks)
+    sequential_time = time.perf_counter() - start
+    if not args.json:
+        print(f"{len(chunks)} chunks of at most {args.chunk_tokens} tokens")
+        print(f"{'concurrency':>11} {'seconds':>9} {'speedup':>8} {'requests':>9} {'cached':>7}")
+        print(f"{'sequential':>11} {sequential_time:>9.3f} {'':>8} {len(chunks):>9}")
+
+    # The last run summarizes the text again with the cache filled by the previous one
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        runs = [(concurrency, False) for concurrency in args.concurrency]
+        runs.append((args.concurrency[-1], True))
+        for concurrency, warm in runs:
+            cache = DiskCache(f"{tmp_dir}/{concurrency}", max_bytes=1 << 30)
+            start = time.perf_counter()
+            insights = summarize(
+                text,
+                backend,
+                chunk_tokens=args.chunk_tokens,
+                overlap_tokens=overlap_tokens,
+                max_concurrency=concurrency,
+                requests_per_minute=0,
+                cache=cache,
+            )
+            seconds = time.perf_counter() - start
+            assert insights.chunks == chunks, "chunking differs between runs"
+            label = "cached" if warm else str(concurrency)
+            if args.json:
+                record = {
+                    "benchmark": "insights",
+                    "pages": args.pages,
+                    "chunks": len(chunks),
+                    "latency": args.latency,
+                    "concurrency": concurrency,
+                    "cached": warm,
+                    "requests": insights.requests,
+                    "cached_requests": insights.cached,
+                    "sequential_seconds": sequential_time,
+                    "summarize_seconds": seconds,
+                }
+                print(json.dumps(record))
+            else:
+                print(
+                    f"{label:>11} {seconds:>9.3f} {sequential_time / seconds:>7.1f}x "
+                    f"{insights.requests:>9} {insights.cached:>7}"
+                )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Keyword benchmark: YAKE over the whole text versus chunks scored on a process pool.
+
+Run from the repository root with `python -m benchmarks.bench_keywords`. A synthetic
+book-length document is scored once by YAKE in a single pass, the reference, then by
+`extract_keywords_parallel` for each number of worker processes. Next to the time and the
+speedup, the agreement of each chunked top with the reference is reported as the average
+rank overlap and the share of common keywords. Workers are started and have loaded YAKE
+before the timings, as the process pool of the server is.
+"""
+import argparse
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from diangat import keywords
+from diangat.keywords import (
+    KEYWORD_CHUNK_CHARS,
+    chunk_candidates,
+    extract_keywords,
+    extract_keywords_parallel,
+    rank_overlap,
+    sentence_chunks,
+)
+from diangat.segmentation import get_sentence_tokenizer
+
+from benchmarks.synthetic import make_pages
+
+
+def start_pool(workers):
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    warm_up = [
+        executor.submit(chunk_candidates, "Mise en route.", 10, "french", 3, 0.9)
+        for _ in range(workers * 2)
+    ]
+    for future in warm_up:
+        future.result()
+    return executor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300, help="size of the document")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--chunk-chars", type=int, default=KEYWORD_CHUNK_CHARS)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--json", action="store_true", help="one JSON record per line")
+    args = parser.parse_args()
+
+    get_sentence_tokenizer()
+    text = " ".join(make_pages(args.pages))
+    chunks = len(sentence_chunks(text, args.chunk_chars))
+
+    start = time.perf_counter()
+    reference = [keyword for keyword, _ in extract_keywords(text, top=args.top)]
+    full_seconds = time.perf_counter() - start
+    if not args.json:
+        print(f"{len(text)} characters in {chunks} chunks of at most {args.chunk_chars}")
+        print(f"{'workers':>7} {'seconds':>9} {'speedup':>8} {'overlap':>8} {'common':>7}")
+        print(f"{'full':>7} {full_seconds:>9.3f}")
+
+    for workers in args.workers:
+        executor = start_pool(workers)
+        keywords._keywords_cache.clear()
+        start = time.perf_counter()
+        chunked = extract_keywords_parallel(
+            text, top=args.top, chunk_chars=args.chunk_chars, executor=executor
+        )
+        seconds = time.perf_counter() - start
+        executor.shutdown()
+        chunked = [keyword for keyword, _ in chunked]
+        overlap = rank_overlap(reference, chunked, args.top)
+        common = len({k.lower() for k in reference} & {k.lower() for k in chunked}) / args.top
+        if args.json:
+            record = {
+                "benchmark": "keywords",
+                "characters": len(text),
+                "chunks": chunks,
+                "top": args.top,
+                "workers": workers,
+                "full_seconds": full_seconds,
+                "chunked_seconds": seconds,
+                "rank_overlap": overlap,
+                "common": common,
+            }
+            print(json.dumps(record))
+        else:
+            print(
+                f"{workers:>7} {seconds:>9.3f} {full_seconds / seconds:>7.1f}x "
+                f"{overlap:>8.3f} {common:>7.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Theme matching benchmark: one regex pass per theme versus the single-pass matcher.
+
+Run from the repository root with `python -m benchmarks.bench_matcher`. The matcher time
+should grow with the number of sentences only, while the regex loop grows with
+sentences x themes.
+"""
+import argparse
+import json
+import re
+import time
+from array import array
+
+from diangat.matcher import ThemeMatcher
+from diangat.segmentation import SentenceIndex
+from diangat.subjects import selected_subjects
+
+from benchmarks.synthetic import make_sentences
+
+
+# Historical implementation: one compiled regex and one pass over the sentences per theme
+def regex_hits(sentences, subjects):
+    hits = {subject: 0 for subject in subjects}
+    for subject, synonyms in subjects.items():
+        pattern = re.compile(
+            r"\b(?:{})\b".format("|".join(map(re.escape, synonyms))), re.IGNORECASE
+        )
+        for sentence in sentences:
+            if re.search(pattern, sentence):
+                hits[subject] += 1
+    return hits
+
+
+# Offsets of the sentences once joined with spaces, as produced by the segmentation layer
+def make_document(sentences):
+    starts = array("I")
+    ends = array("I")
+    position = 0
+    for sentence in sentences:
+        starts.append(position)
+        ends.append(position + len(sentence))
+        position += len(sentence) + 1
+    return SentenceIndex(" ".join(sentences), starts, ends)
+
+
+def matcher_hits(document, subjects):
+    hits = ThemeMatcher(subjects).find_hits(document)
+    return {subject: len(ids) for subject, ids in hits.items()}
+
+
+def best_of(func, repeat, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--themes", type=int, nargs="+", default=[1, 6, 12, 24])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="one JSON record per line")
+    args = parser.parse_args()
+
+    themes = list(selected_subjects)
+    if not args.json:
+        print(f"{'pages':>6} {'themes':>6} {'regex (s)':>10} {'matcher (s)':>12} {'speedup':>8}")
+    for pages in args.pages:
+        sentences = make_sentences(pages)
+        document = make_document(sentences)
+        for theme_count in args.themes:
+            subjects = {theme: selected_subjects[theme] for theme in themes[:theme_count]}
+            regex_time, expected = best_of(regex_hits, args.repeat, sentences, subjects)
+            matcher_time, result = best_of(matcher_hits, args.repeat, document, subjects)
+            assert result == expected, "matcher and regex disagree"
+            if args.json:
+                record = {
+                    "benchmark": "matcher",
+                    "pages": pages,
+                    "themes": theme_count,
+                    "sentences": len(sentences),
+                    "regex_seconds": regex_time,
+                    "matcher_seconds": matcher_time,
+                }
+                print(json.dumps(record))
+            else:
+                print(
+                    f"{pages:>6} {theme_count:>6} {regex_time:>10.4f} {matcher_time:>12.4f} "
+                    f"{regex_time / matcher_time:>7.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
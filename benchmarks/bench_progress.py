@@ -0,0 +1,80 @@
+"""Progress reporting benchmark: one front-end update per item versus the coalescing reporter.
+
+Run from the repository root with `python -m benchmarks.bench_progress`. Each rendered
+update stands for one progress bar delta sent over the websocket and costs
+`--message-cost` seconds; each item of the loop costs `--item-cost` seconds, as when
+going through the paragraphs of a long article or the pages of a PDF.
+"""
+import argparse
+import json
+import time
+
+from diangat.progress import ProgressReporter
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+# Historical behaviour: the bar is redrawn after every item
+def per_item(items, item_cost, message_cost):
+    messages = 0
+    for i in range(items):
+        busy_wait(item_cost)
+        busy_wait(message_cost)
+        messages += 1
+    return messages
+
+
+def coalesced(items, item_cost, message_cost, frame_rate):
+    reporter = ProgressReporter(
+        lambda fraction, message: busy_wait(message_cost), total=items, frame_rate=frame_rate
+    )
+    for i in range(items):
+        busy_wait(item_cost)
+        reporter.advance()
+    return reporter.emitted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 2000, 20000])
+    parser.add_argument("--item-cost", type=float, default=20e-6)
+    parser.add_argument("--message-cost", type=float, default=200e-6)
+    parser.add_argument("--frame-rate", type=float, default=10)
+    parser.add_argument("--json", action="store_true", help="one JSON record per line")
+    args = parser.parse_args()
+
+    if not args.json:
+        print(
+            f"{'items':>7} {'messages':>9} {'coalesced':>10} {'seconds':>9} "
+            f"{'coalesced':>10} {'speedup':>8}"
+        )
+    for items in args.items:
+        start = time.perf_counter()
+        messages = per_item(items, args.item_cost, args.message_cost)
+        per_item_time = time.perf_counter() - start
+        start = time.perf_counter()
+        emitted = coalesced(items, args.item_cost, args.message_cost, args.frame_rate)
+        coalesced_time = time.perf_counter() - start
+        if args.json:
+            record = {
+                "benchmark": "progress",
+                "items": items,
+                "per_item_messages": messages,
+                "coalesced_messages": emitted,
+                "per_item_seconds": per_item_time,
+                "coalesced_seconds": coalesced_time,
+            }
+            print(json.dumps(record))
+        else:
+            print(
+                f"{items:>7} {messages:>9} {emitted:>10} {per_item_time:>9.3f} "
+                f"{coalesced_time:>10.3f} {per_item_time / coalesced_time:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
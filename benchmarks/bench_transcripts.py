@@ -0,0 +1,128 @@
+"""Playlist benchmark: one transcript after the other versus the concurrent cached batch.
+
+Run from the repository root with `python -m benchmarks.bench_transcripts`. A local fake
+fetcher stands for YouTube: it waits `--latency` seconds before returning each synthetic
+transcript. Every video goes through segmentation, theme matching and YAKE. The batch is
+timed on an empty transcript cache for each number of connections, then once more on the
+filled cache, as when the same playlist is analysed again.
+"""
+import argparse
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from diangat import keywords
+from diangat.disk_cache import DiskCache
+from diangat.segmentation import get_sentence_tokenizer
+from diangat.subjects import selected_subjects
+from diangat.transcripts import iter_video_analyses, transcript_analysis
+
+from benchmarks.synthetic import make_pages
+
+
+class FakeFetcher:
+    def __init__(self, videos, pages, latency):
+        self.transcripts = {
+            f"video{idx:06d}": " ".join(make_pages(pages, seed=idx)) for idx in range(videos)
+        }
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def video_ids(self, url):
+        return list(self.transcripts)
+
+    def transcript(self, video_id, languages):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return self.transcripts[video_id]
+
+
+# Historical behaviour: each video downloaded and analysed before the next one
+def sequential(fetcher, subjects, num_keywords):
+    subject_count = dict.fromkeys(subjects, 0)
+    for video_id in fetcher.video_ids(None):
+        text = fetcher.transcript(video_id, ("fr",))
+        _, counts, _ = transcript_analysis(text, subjects, num_keywords)
+        for subject, count in counts.items():
+            subject_count[subject] += count
+    return subject_count
+
+
+def batch(fetcher, subjects, num_keywords, connections, executor, cache):
+    aggregate = None
+    for video, aggregate in iter_video_analyses(
+        fetcher.video_ids(None),
+        subjects,
+        num_keywords,
+        max_connections=connections,
+        executor=executor,
+        fetcher=fetcher,
+        cache=cache,
+    ):
+        assert video.error is None, video.error
+    return aggregate.subject_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=2, help="size of each transcript")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per transcript")
+    parser.add_argument("--keywords", type=int, default=20)
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--json", action="store_true", help="one JSON record per line")
+    args = parser.parse_args()
+
+    get_sentence_tokenizer()
+    fetcher = FakeFetcher(args.videos, args.pages, args.latency)
+
+    start = time.perf_counter()
+    expected = sequential(fetcher, selected_subjects, args.keywords)
+    sequential_time = time.perf_counter() - start
+    if not args.json:
+        print(f"{'connections':>11} {'seconds':>9} {'videos/s':>9} {'speedup':>8} {'fetched':>8}")
+        rate = args.videos / sequential_time
+        print(f"{'sequential':>11} {sequential_time:>9.3f} {rate:>9.1f}")
+
+    # Analysis on threads, as the process pool startup would dominate a short run. The last
+    # run analyses the playlist again with the cache filled by the previous one.
+    with ThreadPoolExecutor() as executor, tempfile.TemporaryDirectory() as tmp_dir:
+        runs = [(connections, False) for connections in args.connections]
+        runs.append((args.connections[-1], True))
+        for connections, warm in runs:
+            cache = DiskCache(f"{tmp_dir}/{connections}", max_bytes=1 << 30)
+            # YAKE results of the previous runs would otherwise come from memory
+            keywords._keywords_cache.clear()
+            fetcher.calls = 0
+            start = time.perf_counter()
+            result = batch(
+                fetcher, selected_subjects, args.keywords, connections, executor, cache
+            )
+            seconds = time.perf_counter() - start
+            assert result == expected, "batch and sequential counts disagree"
+            label = "cached" if warm else str(connections)
+            if args.json:
+                record = {
+                    "benchmark": "transcripts",
+                    "videos": args.videos,
+                    "latency": args.latency,
+                    "connections": connections,
+                    "cached": warm,
+                    "fetched": fetcher.calls,
+                    "sequential_seconds": sequential_time,
+                    "batch_seconds": seconds,
+                }
+                print(json.dumps(record))
+            else:
+                print(
+                    f"{label:>11} {seconds:>9.3f} {args.videos / seconds:>9.1f} "
+                    f"{sequential_time / seconds:>7.1f}x {fetcher.calls:>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Multi-URL ingestion benchmark: sequential downloads versus the concurrent event loop.
+
+Run from the repository root with `python -m benchmarks.bench_urls`. A local HTTP server
+serves synthetic articles and waits `--latency` seconds before answering each request, the
+way a distant press site would. Sequential ingestion should take about
+articles x latency, the concurrent one about articles / connections x latency.
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from diangat.fetch import fetch_article_text
+from diangat.ingest import iter_url_theme_counts
+from diangat.matcher import get_matcher
+from diangat.segmentation import get_sentence_tokenizer, segment
+from diangat.subjects import selected_subjects
+
+from benchmarks.synthetic import make_pages
+
+
+def make_article(idx, pages):
+    paragraphs = "".join(f"<p>{page}</p>" for page in make_pages(pages, seed=idx))
+    return f"<html><head><title>Article {idx}</title></head><body>{paragraphs}</body></html>"
+
+
+# Local server answering /article/<n> after an artificial delay. Responses carry no
+# validators, so the HTTP cache never short-circuits a download.
+def start_server(articles, pages, latency):
+    bodies = [make_article(idx, pages).encode("utf-8") for idx in range(articles)]
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = bodies[int(self.path.rsplit("/", 1)[-1])]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Historical behaviour: one article after the other
+def sequential(urls, subjects):
+    matcher = get_matcher(subjects)
+    subject_count = dict.fromkeys(subjects, 0)
+    for url in urls:
+        for subject, sentence_ids in matcher.find_hits(segment(fetch_article_text(url))).items():
+            subject_count[subject] += len(sentence_ids)
+    return subject_count
+
+
+def concurrent(urls, subjects, connections, executor):
+    aggregate = None
+    for article, aggregate in iter_url_theme_counts(
+        urls, subjects, max_connections=connections, executor=executor
+    ):
+        assert article.error is None, article.error
+    return aggregate.subject_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=2, help="size of each article")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per request")
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--json", action="store_true", help="one JSON record per line")
+    args = parser.parse_args()
+
+    get_sentence_tokenizer()
+    server = start_server(args.articles, args.pages, args.latency)
+    base_url = f"http://127.0.0.1:{server.server_port}/article"
+    urls = [f"{base_url}/{idx}" for idx in range(args.articles)]
+
+    start = time.perf_counter()
+    expected = sequential(urls, selected_subjects)
+    sequential_time = time.perf_counter() - start
+    if not args.json:
+        print(f"{'connections':>11} {'seconds':>9} {'articles/s':>11} {'speedup':>8}")
+        rate = args.articles / sequential_time
+        print(f"{'sequential':>11} {sequential_time:>9.3f} {rate:>11.1f}")
+
+    # Boilerplate removal on threads, as the process pool startup would dominate a short run
+    with ThreadPoolExecutor() as executor:
+        for connections in args.connections:
+            start = time.perf_counter()
+            result = concurrent(urls, selected_subjects, connections, executor)
+            seconds = time.perf_counter() - start
+            assert result == expected, "concurrent and sequential counts disagree"
+            if args.json:
+                record = {
+                    "benchmark": "urls",
+                    "articles": args.articles,
+                    "latency": args.latency,
+                    "connections": connections,
+                    "sequential_seconds": sequential_time,
+                    "concurrent_seconds": seconds,
+                }
+                print(json.dumps(record))
+            else:
+                print(
+                    f"{connections:>11} {seconds:>9.3f} {args.articles / seconds:>11.1f} "
+                    f"{sequential_time / seconds:>7.1f}x"
+                )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
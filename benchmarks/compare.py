@@ -0,0 +1,46 @@
+"""Compare two result files of `benchmarks.run`, stage by stage.
+
+    python -m benchmarks.compare before.jsonl after.jsonl
+
+A ratio above 1 means the second run is faster (time) or lighter (memory).
+"""
+import argparse
+import json
+
+
+# Last record of every (stage, pages, themes) case of a JSON-lines file
+def load_results(path):
+    results = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                results[(record["stage"], record["pages"], record["themes"])] = record
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    before = load_results(args.before)
+    after = load_results(args.after)
+    print(
+        f"{'stage':<18} {'pages':>5} {'themes':>6} {'before (s)':>11} {'after (s)':>10} "
+        f"{'speedup':>8} {'memory':>8}"
+    )
+    for key in sorted(before.keys() & after.keys(), key=lambda key: (key[0], key[1], key[2] or 0)):
+        stage, pages, themes = key
+        old, new = before[key], after[key]
+        memory_ratio = old["peak_bytes"] / new["peak_bytes"] if new["peak_bytes"] else float("nan")
+        print(
+            f"{stage:<18} {pages:>5} {themes or '':>6} {old['seconds']:>11.4f} "
+            f"{new['seconds']:>10.4f} {old['seconds'] / new['seconds']:>7.2f}x "
+            f"{memory_ratio:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
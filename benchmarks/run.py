@@ -0,0 +1,187 @@
+"""Benchmark suite: time and peak memory of each analysis stage on synthetic programmes.
+
+    python -m benchmarks.run -o bench.jsonl
+    python -m benchmarks.compare before.jsonl bench.jsonl
+
+Every stage is timed separately for each document size (and each theme count for the
+matching stage). Timings are the best of `--repeat` runs; peak memory comes from one
+extra run under tracemalloc, so that tracing does not distort the timings. Each result
+is one JSON record per line, tagged with the current commit. No network access is
+needed, but the French Punkt model must be installed for the segmentation stages.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from diangat import pdf_text
+from diangat.disk_cache import DiskCache
+from diangat.matcher import ThemeMatcher
+from diangat.pipeline import count_themes
+from diangat.segmentation import get_sentence_tokenizer, segment
+from diangat.subjects import selected_subjects
+
+from benchmarks.synthetic import make_pages, make_pdf
+
+DEFAULT_PAGES = [10, 50, 100, 250, 500]
+DEFAULT_THEMES = [1, 6, 12, 24]
+STAGES = [
+    "extraction",
+    "extraction_cached",
+    "segmentation",
+    "matching",
+    "pipeline",
+    "keywords",
+    "keywords_cached",
+    "wordcloud",
+    "wordcloud_cached",
+]
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Best wall time of `repeat` calls, then peak traced memory of one more call
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(timings), peak_bytes
+
+
+# (stage, themes, callable) for one document size
+def stage_cases(stages, pages, pdf_path, theme_counts, tmp_dir):
+    text = " ".join(pages)
+    themes = list(selected_subjects)
+    if "extraction" in stages:
+        # A cache that keeps nothing: every call runs PyPDF2
+        uncached = DiskCache(Path(tmp_dir) / "uncached", max_bytes=0)
+
+        def extraction():
+            pdf_text._page_cache = uncached
+            pdf_text.extract_pages(pdf_path)
+
+        yield "extraction", None, extraction
+    if "extraction_cached" in stages:
+        cached = DiskCache(Path(tmp_dir) / "cached", max_bytes=1 << 40)
+        pdf_text._page_cache = cached
+        pdf_text.extract_pages(pdf_path)
+
+        def extraction_cached():
+            pdf_text._page_cache = cached
+            pdf_text.extract_pages(pdf_path)
+
+        yield "extraction_cached", None, extraction_cached
+    if "segmentation" in stages:
+        yield "segmentation", None, lambda: segment(text)
+    if "matching" in stages:
+        document = segment(text)
+        for theme_count in theme_counts:
+            subjects = {theme: selected_subjects[theme] for theme in themes[:theme_count]}
+            yield "matching", theme_count, lambda: ThemeMatcher(subjects).find_hits(document)
+    if "pipeline" in stages:
+        yield "pipeline", len(themes), lambda: count_themes(pages, selected_subjects)
+    if {"keywords", "keywords_cached", "wordcloud", "wordcloud_cached"} & set(stages):
+        from diangat import keywords as keywords_module
+        from diangat.keywords import extract_keywords
+    if "keywords" in stages:
+        # The in-memory cache is emptied so that every call runs YAKE
+
+        def keywords_uncached():
+            keywords_module._keywords_cache.clear()
+            extract_keywords(text, top=20)
+
+        yield "keywords", None, keywords_uncached
+    if "keywords_cached" in stages:
+        extract_keywords(text, top=20)
+        yield "keywords_cached", None, lambda: extract_keywords(text, top=20)
+    if {"wordcloud", "wordcloud_cached"} & set(stages):
+        from diangat import wordclouds
+
+        keywords = extract_keywords(text, top=20)
+        width, height = wordclouds.wordcloud_size()
+        if "wordcloud" in stages:
+            yield "wordcloud", None, lambda: wordclouds.render_wordcloud(keywords, width, height)
+        if "wordcloud_cached" in stages:
+            wordclouds._wordcloud_cache = DiskCache(Path(tmp_dir) / "wordclouds", 1 << 40)
+            # Rendered once beforehand, so that every timed call is served from the cache
+            wordclouds.wordcloud_png(keywords)
+
+            def wordcloud_cached():
+                wordclouds.wordcloud_png(keywords)
+
+            yield "wordcloud_cached", None, wordcloud_cached
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=DEFAULT_PAGES)
+    parser.add_argument("--themes", type=int, nargs="+", default=DEFAULT_THEMES)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", help="JSON-lines file (default: standard output)")
+    args = parser.parse_args()
+
+    if {"segmentation", "matching", "pipeline"} & set(args.stages):
+        # Loaded once, like in the apps, rather than inside the first timing
+        get_sentence_tokenizer()
+
+    context = {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+    out = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    try:
+        with tempfile.TemporaryDirectory(prefix="diangat-bench-") as tmp_dir:
+            for page_count in args.pages:
+                pages = make_pages(page_count)
+                chars = sum(len(page) for page in pages)
+                pdf_path = Path(tmp_dir) / f"programme-{page_count}.pdf"
+                pdf_path.write_bytes(make_pdf(pages))
+                cases = stage_cases(args.stages, pages, pdf_path, args.themes, tmp_dir)
+                for stage, themes, func in cases:
+                    seconds, peak_bytes = measure(func, args.repeat)
+                    record = dict(
+                        context,
+                        stage=stage,
+                        pages=page_count,
+                        themes=themes,
+                        chars=chars,
+                        seconds=seconds,
+                        pages_per_second=page_count / seconds,
+                        chars_per_second=chars / seconds,
+                        peak_bytes=peak_bytes,
+                    )
+                    out.write(json.dumps(record) + "\n")
+                    out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
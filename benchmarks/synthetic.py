@@ -0,0 +1,93 @@
+"""Synthetic French programmes, as text or PDF, for benchmarks that need no network."""
+import random
+
+from diangat.subjects import selected_subjects
+
+FILLER = (
+    "le candidat propose de renforcer la place du pays dans la sous-région avec des "
+    "mesures concrètes pour les jeunes les femmes et les territoires afin de garantir "
+    "un avenir meilleur à tous les citoyens dans le respect des valeurs de la République"
+).split()
+
+SENTENCES_PER_PAGE = 40
+LINE_CHARS = 90
+LINES_PER_PAGE = 60
+
+
+# Synthetic programme sentences, with roughly one theme synonym every three sentences
+def make_sentences(pages, seed=0):
+    rng = random.Random(seed)
+    synonyms = [term for terms in selected_subjects.values() for term in terms]
+    sentences = []
+    for _ in range(pages * SENTENCES_PER_PAGE):
+        words = rng.sample(FILLER, rng.randint(8, 20))
+        if rng.random() < 0.35:
+            words.insert(rng.randrange(len(words)), rng.choice(synonyms))
+        sentences.append(" ".join(words).capitalize() + ".")
+    return sentences
+
+
+# Text of each page of a synthetic programme
+def make_pages(pages, seed=0):
+    sentences = make_sentences(pages, seed)
+    return [
+        " ".join(sentences[i : i + SENTENCES_PER_PAGE])
+        for i in range(0, len(sentences), SENTENCES_PER_PAGE)
+    ]
+
+
+def _wrap(text, width=LINE_CHARS):
+    lines = []
+    line = ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+
+def _pdf_string(line):
+    data = line.encode("cp1252", errors="replace")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+# Minimal PDF (Helvetica, WinAnsi encoding) with one page of text per item of `pages`
+def make_pdf(pages):
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_ids = []
+    for text in pages:
+        lines = _wrap(text)[:LINES_PER_PAGE]
+        stream = b"BT /F1 10 Tf 12 TL 40 800 Td\n"
+        stream += b"".join(b"(" + _pdf_string(line) + b") Tj T*\n" for line in lines)
+        stream += b"ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref_offset = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref_offset,
+    )
+    return bytes(pdf)
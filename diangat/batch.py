@@ -0,0 +1,258 @@
+"""Headless theme analysis of a corpus of programmes, speeches and articles.
+
+    python -m diangat.batch corpus/ -o results.csv
+    python -m diangat.batch manifest.txt -o results.parquet --workers 8
+
+    python -m diangat.batch corpus/ -o results.csv --similarity similarity.csv
+
+The input is a directory (searched recursively for .pdf and .txt files) or a manifest
+listing one path or URL per line. Every finished document is appended to a JSON-lines
+checkpoint next to the output, so an interrupted run resumes where it stopped. The
+checkpoint starts with the parameters of its run (keywords, language, themes), and is
+started over by a run with other ones rather than mixing their results; the
+CSV or Parquet file with one row per document and one column per theme is written
+from that checkpoint at the end of the run. With `--similarity`, the pairwise cosine
+similarity of the documents is also written, rows and columns ordered so that the
+closest documents are next to each other.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from diangat.disk_cache import content_hash
+from diangat.index import DocumentIndex
+from diangat.pdf_text import extract_pages
+from diangat.pipeline import count_themes
+from diangat.subjects import selected_subjects
+
+DOCUMENT_SUFFIXES = (".pdf", ".txt")
+
+logger = logging.getLogger("diangat.batch")
+
+
+# Sources of a directory or a manifest file, in a stable order
+def list_sources(input_path):
+    input_path = Path(input_path)
+    if input_path.is_dir():
+        return sorted(
+            str(path)
+            for path in input_path.rglob("*")
+            if path.is_file() and path.suffix.lower() in DOCUMENT_SUFFIXES
+        )
+    sources = []
+    base_dir = input_path.parent
+    for line in input_path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith(("http://", "https://")) or os.path.isabs(line):
+            sources.append(line)
+        else:
+            sources.append(str(base_dir / line))
+    return sources
+
+
+# Text of a source, as a list of pages
+def load_pages(source):
+    if source.startswith(("http://", "https://")):
+        from diangat.fetch import fetch_article_text
+
+        return [fetch_article_text(source)]
+    if source.lower().endswith(".pdf"):
+        return extract_pages(source)
+    return [Path(source).read_text(encoding="utf-8", errors="replace")]
+
+
+# Runs in a worker process: one row of the results. With `with_terms`, the document is
+# indexed instead, and the record also carries its term vector for the similarity matrix.
+def analyse_source(source, num_keywords, language, with_terms=False):
+    record = {"document": source, "error": None}
+    try:
+        pages = load_pages(source)
+        record["pages"] = len(pages)
+        if with_terms:
+            index = DocumentIndex.build(pages, language=language)
+            record["sentences"] = index.total_sentences
+            record.update(index.theme_counts(selected_subjects))
+            record["terms"] = index.term_counts()
+        else:
+            counts = count_themes(pages, selected_subjects, language)
+            record["sentences"] = counts.total_sentences
+            record.update(counts.subject_count)
+        if num_keywords:
+            from diangat.keywords import extract_keywords
+
+            keywords = extract_keywords(" ".join(pages), top=num_keywords, language=language)
+            record["keywords"] = "; ".join(keyword for keyword, _ in keywords)
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def checkpoint_path(output):
+    return Path(f"{output}.checkpoint.jsonl")
+
+
+# Parameters the records of a run depend on, written as the first line of its checkpoint
+def run_params(num_keywords, language):
+    themes = json.dumps(selected_subjects, ensure_ascii=False, sort_keys=True)
+    return {"keywords": num_keywords, "language": language, "themes": content_hash(themes)}
+
+
+# Records of the documents already analysed without error by a previous run with the same
+# `params`; a checkpoint of other parameters, or without any, is ignored
+def load_checkpoint(path, params):
+    records = {}
+    if not path.exists():
+        return records
+    with open(path, encoding="utf-8") as f:
+        try:
+            header = json.loads(f.readline())
+        except json.JSONDecodeError:
+            header = None
+        if not isinstance(header, dict) or header.get("params") != params:
+            logger.info("%s was written with other parameters, starting over", path)
+            return records
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line of an interrupted write
+                continue
+            if record.get("error") is None:
+                records[record["document"]] = record
+    return records
+
+
+def write_results(records, output):
+    import pandas as pd
+
+    columns = ["document", "pages", "sentences", *selected_subjects, "keywords", "error"]
+    df = pd.DataFrame(records).reindex(columns=columns)
+    # Failed documents have no counts, which must not turn the others into floats
+    count_columns = ["pages", "sentences", *selected_subjects]
+    df[count_columns] = df[count_columns].astype("Int64")
+    if str(output).endswith(".parquet"):
+        df.to_parquet(output, index=False)
+    else:
+        df.to_csv(output, index=False)
+
+
+# Pairwise similarity of the analysed documents, on their TF-IDF term vectors or on their
+# theme proportions, in clustered order
+def write_similarity(records, output, basis="terms"):
+    import pandas as pd
+
+    from diangat.similarity import cluster_order, term_similarity, theme_similarity
+    from diangat.theme_matrix import ThemeMatrix
+
+    records = [record for record in records if record.get("error") is None]
+    documents = [record["document"] for record in records]
+    if basis == "terms":
+        similarity = term_similarity([record["terms"] for record in records])
+    else:
+        counts = [[record[subject] for subject in selected_subjects] for record in records]
+        sentences = [record["sentences"] for record in records]
+        similarity = theme_similarity(
+            ThemeMatrix(documents, selected_subjects, counts, sentences)
+        )
+    order = cluster_order(similarity)
+    names = [documents[i] for i in order]
+    df = pd.DataFrame(similarity[order][:, order], index=names, columns=names)
+    if str(output).endswith(".parquet"):
+        df.to_parquet(output)
+    else:
+        df.to_csv(output)
+
+
+def run(
+    sources,
+    output,
+    workers=None,
+    num_keywords=10,
+    language="french",
+    similarity_output=None,
+    similarity_basis="terms",
+):
+    checkpoint = checkpoint_path(output)
+    params = run_params(num_keywords, language)
+    done = load_checkpoint(checkpoint, params)
+    with_terms = similarity_output is not None and similarity_basis == "terms"
+    if with_terms:
+        # Documents analysed by a run without term vectors are analysed again
+        done = {source: record for source, record in done.items() if "terms" in record}
+    # Keep one record per document, the failed ones being tried again
+    with open(checkpoint, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"params": params}, ensure_ascii=False) + "\n")
+        for record in done.values():
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    todo = [source for source in sources if source not in done]
+    logger.info("%d documents, %d already analysed", len(sources), len(sources) - len(todo))
+
+    records = dict(done)
+    with open(checkpoint, "a", encoding="utf-8") as f, ProcessPoolExecutor(workers) as executor:
+        futures = [
+            executor.submit(analyse_source, source, num_keywords, language, with_terms)
+            for source in todo
+        ]
+        for i, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            records[record["document"]] = record
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            if record["error"]:
+                logger.warning("[%d/%d] %s: %s", i, len(todo), record["document"], record["error"])
+            else:
+                logger.info("[%d/%d] %s", i, len(todo), record["document"])
+
+    results = [records[source] for source in sources if source in records]
+    write_results(results, output)
+    if similarity_output is not None:
+        write_similarity(results, similarity_output, similarity_basis)
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m diangat.batch", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("input", help="directory of documents or manifest of paths and URLs")
+    parser.add_argument("-o", "--output", required=True, help="results file (.csv or .parquet)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes")
+    parser.add_argument(
+        "-k", "--keywords", type=int, default=10, help="YAKE keywords per document (0 to skip)"
+    )
+    parser.add_argument("--language", default="french", help="language of the documents")
+    parser.add_argument(
+        "--similarity", help="pairwise similarity matrix of the documents (.csv or .parquet)"
+    )
+    parser.add_argument(
+        "--similarity-basis",
+        choices=["terms", "themes"],
+        default="terms",
+        help="compare the documents on their vocabulary or on their theme proportions",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    sources = list_sources(args.input)
+    records = run(
+        sources,
+        args.output,
+        args.workers,
+        args.keywords,
+        args.language,
+        args.similarity,
+        args.similarity_basis,
+    )
+    failed = sum(1 for record in records.values() if record["error"])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""Bounded-memory analysis of very large PDFs.
+
+Instead of holding every page of a document as a list of strings, the pages are extracted
+a chunk at a time and spilled to a temporary file read back through mmap. The chunks go to
+the process pool, a few at a time, with the same per-page timeout as smaller PDFs; with a
+single worker they are extracted in place, dropping the objects PyPDF2 parsed for the
+previous chunk. Once complete, the spool file is kept in the page cache, so a rerun maps it
+again instead of extracting the PDF. The analysis stages then stream the pages from that
+file, so that only counts, posting lists and offsets stay in memory.
+
+A `MemoryCeiling` bounds what one analysis holds: the stages report the data they keep
+(pages waiting to be spilled, page offsets, posting lists, segmented pages) and the
+analysis is aborted with `MemoryLimitExceeded` once the total passes the limit. The
+resident memory of the process is not used, as it also counts the other sessions of the
+server and whatever the allocator has not returned to the system.
+"""
+import io
+import logging
+import mmap
+import os
+import sys
+import tempfile
+import threading
+from array import array
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from PyPDF2 import PdfReader
+
+from diangat.pdf_text import (
+    PAGE_TIMEOUT,
+    PDF_WORKERS,
+    LargePdf,
+    _extract_page_range,
+    _reset_executor,
+    extract_reader_pages,
+    get_executor,
+    get_page_cache,
+    iter_extract_many,
+    pdf_cache_key,
+    read_pdf_bytes,
+    spooled_cache_key,
+)
+from diangat.timing import span
+
+# Memory an analysis may hold, and size from which a PDF is analysed this way
+MAX_ANALYSIS_BYTES = int(os.environ.get("DIANGAT_MAX_ANALYSIS_MB", "1024")) * 1024 * 1024
+BOUNDED_PAGES = int(os.environ.get("DIANGAT_BOUNDED_PAGES", "200"))
+CHUNK_PAGES = 16
+# Chunks of a large PDF extracted or waiting to be spilled at a time, per worker process
+CHUNKS_PER_WORKER = 2
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryLimitExceeded(MemoryError):
+    pass
+
+
+class MemoryCeiling:
+    """Bytes held by one analysis, as reported by its stages, against `max_bytes`."""
+
+    def __init__(self, max_bytes=MAX_ANALYSIS_BYTES):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def hold(self, nbytes):
+        with self._lock:
+            self.used += nbytes
+            self.peak = max(self.peak, self.used)
+        self.check()
+
+    def release(self, nbytes):
+        with self._lock:
+            self.used -= nbytes
+
+    def check(self):
+        if self.max_bytes is not None and self.used > self.max_bytes:
+            raise MemoryLimitExceeded(
+                f"analysis holds {self.used / 2**20:.0f} MB, "
+                f"the limit is {self.max_bytes / 2**20:.0f} MB"
+            )
+
+
+class SpooledPages:
+    """Pages of a document in a file, read back through mmap.
+
+    Only the byte offsets of the pages are kept in memory; iterating yields the pages one
+    at a time, as many times as needed. A new spool writes to a temporary file; `save`
+    copies it to a cache, where `from_cache` maps it again, page offsets first.
+    """
+
+    def __init__(self, file=None, offsets=None, base=0):
+        self._file = file or tempfile.TemporaryFile(prefix="diangat-pages-")
+        self.offsets = array("Q", [0]) if offsets is None else offsets
+        self._base = base
+        self._map = None
+
+    @classmethod
+    def from_cache(cls, cache, key):
+        blob = cache.open(key)
+        if blob is None:
+            return None
+        try:
+            count = int.from_bytes(blob.read(8), "little")
+            offsets = array("Q")
+            offsets.fromfile(blob, count + 1)
+        except (EOFError, ValueError):
+            blob.close()
+            return None
+        return cls(blob, offsets, 8 + offsets.itemsize * len(offsets))
+
+    def append(self, text):
+        data = text.encode("utf-8")
+        self._file.write(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _mapped(self):
+        size = self._base + self.offsets[-1]
+        if self._map is None or len(self._map) < size:
+            self._file.flush()
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+        return self._map
+
+    def page(self, idx):
+        start, end = self.offsets[idx], self.offsets[idx + 1]
+        if start == end:
+            return ""
+        return self._mapped()[self._base + start : self._base + end].decode("utf-8")
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self.page(idx)
+
+    def save(self, cache, key, block_bytes=1 << 20):
+        def chunks():
+            yield len(self).to_bytes(8, "little")
+            yield self.offsets.tobytes()
+            self._file.flush()
+            self._file.seek(self._base)
+            while True:
+                block = self._file.read(block_bytes)
+                if not block:
+                    break
+                yield block
+            self._file.seek(0, os.SEEK_END)
+
+        cache.set_stream(key, chunks())
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Chunks of pages of an open PDF extracted one after the other on the calling thread, as
+# `(start, pages, timed out page numbers, bytes held)`
+def _iter_inline_chunks(pdf_reader, total_pages, chunk_pages, page_timeout, ceiling):
+    if threading.current_thread() is not threading.main_thread():
+        # Signal handlers can only be installed from the main thread
+        page_timeout = None
+    for start in range(0, total_pages, chunk_pages):
+        stop = min(total_pages, start + chunk_pages)
+        with span("pdf_extraction"):
+            _, pages, timed_out = extract_reader_pages(pdf_reader, start, stop, page_timeout)
+        chunk_bytes = sum(sys.getsizeof(page) for page in pages)
+        ceiling.hold(chunk_bytes)
+        # Content streams of the chunk are parsed again if ever needed
+        pdf_reader.resolved_objects.clear()
+        yield start, pages, timed_out, chunk_bytes
+
+
+# Same chunks extracted on the process pool, where each page keeps its timeout. At most
+# `chunks_in_flight` chunks are being extracted or waiting for the previous ones, and they
+# are yielded in page order.
+def _iter_pooled_chunks(
+    data, total_pages, chunk_pages, page_timeout, ceiling, max_workers, chunks_in_flight
+):
+    executor = get_executor(max_workers)
+    starts = iter(range(0, total_pages, chunk_pages))
+    running = {}
+    ready = {}
+    with tempfile.TemporaryDirectory(prefix="diangat-pdf-") as tmp_dir:
+        # Workers read the file from disk instead of receiving the bytes with every chunk
+        path = os.path.join(tmp_dir, "document.pdf")
+        with open(path, "wb") as f:
+            f.write(data)
+
+        def submit():
+            start = next(starts, None)
+            if start is not None:
+                stop = min(total_pages, start + chunk_pages)
+                future = executor.submit(_extract_page_range, path, start, stop, page_timeout)
+                running[future] = start
+
+        for _ in range(chunks_in_flight):
+            submit()
+        next_start = 0
+        try:
+            while running:
+                with span("pdf_extraction"):
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    try:
+                        start, pages, timed_out = future.result()
+                    except BrokenProcessPool:
+                        _reset_executor()
+                        raise
+                    chunk_bytes = sum(sys.getsizeof(page) for page in pages)
+                    ceiling.hold(chunk_bytes)
+                    ready[start] = (pages, timed_out, chunk_bytes)
+                while next_start in ready:
+                    pages, timed_out, chunk_bytes = ready.pop(next_start)
+                    yield next_start, pages, timed_out, chunk_bytes
+                    next_start += chunk_pages
+                    submit()
+        finally:
+            for future in running:
+                future.cancel()
+            wait(running)
+
+
+# Text of every page of a PDF spilled to a `SpooledPages`, extracted `chunk_pages` at a time.
+# `pdf_file` is an upload, a path, bytes or the `LargePdf` yielded by `iter_extract_many`.
+# The chunks are spread over the process pool, a few at a time, unless `max_workers` is 1.
+# Complete spools are kept in the page cache and mapped again on the next call.
+def spool_pdf_pages(
+    pdf_file,
+    chunk_pages=CHUNK_PAGES,
+    ceiling=None,
+    page_timeout=PAGE_TIMEOUT,
+    on_page=None,
+    cache=None,
+    max_workers=PDF_WORKERS,
+):
+    ceiling = ceiling or MemoryCeiling()
+    cache = get_page_cache() if cache is None else cache
+    if isinstance(pdf_file, LargePdf):
+        data, key, pdf_reader = pdf_file
+    else:
+        data = read_pdf_bytes(pdf_file)
+        key, pdf_reader = pdf_cache_key(data), None
+    spool = SpooledPages.from_cache(cache, spooled_cache_key(key))
+    if spool is not None:
+        ceiling.hold(spool.offsets.itemsize * len(spool.offsets))
+        if on_page is not None:
+            on_page(len(spool), len(spool))
+        return spool
+
+    spool = SpooledPages()
+    complete = True
+    try:
+        if pdf_reader is None:
+            pdf_reader = PdfReader(io.BytesIO(data))
+        total_pages = len(pdf_reader.pages)
+        if max_workers <= 1:
+            chunks = _iter_inline_chunks(
+                pdf_reader, total_pages, chunk_pages, page_timeout, ceiling
+            )
+        else:
+            chunks = _iter_pooled_chunks(
+                data,
+                total_pages,
+                chunk_pages,
+                page_timeout,
+                ceiling,
+                max_workers,
+                CHUNKS_PER_WORKER * max_workers,
+            )
+        # The text of a chunk is held until it is spilled, then only its offsets
+        for start, pages, timed_out, chunk_bytes in chunks:
+            for page_number in timed_out:
+                logger.warning("Page %d timed out and was skipped", page_number + 1)
+                complete = False
+            for page in pages:
+                spool.append(page)
+            del pages
+            ceiling.release(chunk_bytes)
+            ceiling.hold(spool.offsets.itemsize * (len(spool) - start))
+            if on_page is not None:
+                on_page(len(spool), total_pages)
+        # Spools with skipped pages are not cached, so they get another chance next time
+        if complete:
+            spool.save(cache, spooled_cache_key(key))
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+# Same as `iter_extract_many`, except that the PDFs of more than `bounded_pages` pages are
+# spooled under `ceiling` as soon as they are met. Every file is parsed once, both to count
+# its pages and to extract them.
+def iter_extract_bounded(pdf_files, ceiling, bounded_pages=BOUNDED_PAGES, on_page=None):
+    for idx, pages in iter_extract_many(pdf_files, on_page=on_page, large_pages=bounded_pages):
+        if isinstance(pages, LargePdf):
+            try:
+                pages = spool_pdf_pages(pages, ceiling=ceiling, on_page=on_page)
+            except Exception as e:
+                pages = e
+        yield idx, pages
+
+
+# Same as `iter_extract_bounded`, with the results in the order of `pdf_files`
+def extract_bounded(pdf_files, ceiling, bounded_pages=BOUNDED_PAGES, on_page=None):
+    results = [None] * len(pdf_files)
+    for idx, pages in iter_extract_bounded(pdf_files, ceiling, bounded_pages, on_page):
+        results[idx] = pages
+    return results
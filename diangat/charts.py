@@ -0,0 +1,200 @@
+"""Plotly figures of the apps, built from arrays and cached by content.
+
+The figures are assembled with `plotly.graph_objects` straight from the result arrays: no
+DataFrame, and the percentages are formatted by Plotly in the browser through
+`texttemplate` rather than sent as one string per bar. Instead of the whole default
+template (about 7 kB of JSON in every chart), each figure carries only the part of it that
+bar charts and heatmaps use. A figure is built once per content, labels and title;
+redrawing the same results reuses it, and `draw_chart` reports the size of its spec to the
+timing of the run.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from diangat.disk_cache import content_hash
+from diangat.timing import record_bytes, span
+
+MAX_CACHED_FIGURES = 64
+
+# Values are sent with the precision the charts display, a tenth of a percent and better
+VALUE_DECIMALS = 4
+
+# Settings of the default "plotly" template the charts of the apps rely on
+COMPACT_TEMPLATE = {
+    "data": {"bar": [{"marker": {"line": {"color": "#E5ECF6", "width": 0.5}}}]},
+    "layout": {
+        "autotypenumbers": "strict",
+        "font": {"color": "#2a3f5f"},
+        "hoverlabel": {"align": "left"},
+        "hovermode": "closest",
+        "paper_bgcolor": "white",
+        "plot_bgcolor": "#E5ECF6",
+        "title": {"x": 0.05},
+        "xaxis": {
+            "automargin": True,
+            "gridcolor": "white",
+            "linecolor": "white",
+            "ticks": "",
+            "title": {"standoff": 15},
+            "zerolinecolor": "white",
+            "zerolinewidth": 2,
+        },
+        "yaxis": {
+            "automargin": True,
+            "gridcolor": "white",
+            "linecolor": "white",
+            "ticks": "",
+            "title": {"standoff": 15},
+            "zerolinecolor": "white",
+            "zerolinewidth": 2,
+        },
+        "coloraxis": {"colorbar": {"outlinewidth": 0, "ticks": ""}},
+    },
+}
+
+# Figure with the size of its JSON spec, which is what Streamlit sends to the browser
+Chart = namedtuple("Chart", ["figure", "payload_bytes"])
+
+_figure_cache = OrderedDict()
+_figure_lock = threading.Lock()
+
+
+# Colour scale spreading a list of colours evenly, as Plotly Express does
+def _spread_colorscale(colors):
+    return [[idx / (len(colors) - 1), color] for idx, color in enumerate(colors)]
+
+
+def _compact(values):
+    return np.round(np.asarray(values, dtype=np.float64), VALUE_DECIMALS)
+
+
+def _cache_key(kind, arrays, params):
+    data = [f"{kind}\n{params!r}".encode("utf-8")]
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        data.append(f"\n{array.dtype}{array.shape}\n".encode("utf-8"))
+        data.append(array.tobytes())
+    return content_hash(b"".join(data))
+
+
+# Chart of `kind` for these results, built by `build(*arrays, **params)` on the first request
+def cached_chart(kind, build, arrays, **params):
+    key = _cache_key(kind, arrays, params)
+    with _figure_lock:
+        chart = _figure_cache.get(key)
+        if chart is not None:
+            _figure_cache.move_to_end(key)
+            return chart
+
+    import plotly.io as pio
+
+    with span("plotly"):
+        figure = build(*arrays, **params)
+        chart = Chart(figure, len(pio.to_json(figure, validate=False).encode("utf-8")))
+    with _figure_lock:
+        _figure_cache[key] = chart
+        while len(_figure_cache) > MAX_CACHED_FIGURES:
+            _figure_cache.popitem(last=False)
+    return chart
+
+
+def _bar_figure(labels, values, title, orientation, label_title, value_title, width, height):
+    import plotly.graph_objects as go
+    from plotly.colors import qualitative
+
+    value_axis, label_axis = ("x", "y") if orientation == "h" else ("y", "x")
+    bar = {
+        value_axis: values,
+        label_axis: list(labels),
+        "orientation": orientation,
+        "marker": {"color": values, "coloraxis": "coloraxis"},
+        "texttemplate": f"%{{{value_axis}:.2%}}",
+        "hovertemplate": (
+            f"{value_title}=%{{{value_axis}:.2%}}<br>"
+            f"{label_title}=%{{{label_axis}}}<extra></extra>"
+        ),
+    }
+    layout = {
+        "template": COMPACT_TEMPLATE,
+        "title": {"text": title},
+        f"{value_axis}axis": {"title": {"text": value_title}},
+        f"{label_axis}axis": {"title": {"text": label_title}},
+        "coloraxis": {
+            "colorscale": _spread_colorscale(qualitative.Safe),
+            "colorbar": {"title": {"text": value_title}},
+        },
+        "width": width,
+        "height": height,
+    }
+    return go.Figure(go.Bar(bar), layout)
+
+
+# Bar per label of the proportions `values`, labelled as percentages
+def proportion_bars(
+    labels, values, title, orientation="v", label_title="", value_title="", width=None, height=None
+):
+    return cached_chart(
+        "bars",
+        _bar_figure,
+        (np.asarray(labels, dtype=str), _compact(values)),
+        title=title,
+        orientation=orientation,
+        label_title=label_title,
+        value_title=value_title,
+        width=width,
+        height=height,
+    )
+
+
+def _heatmap_figure(z, x, y, title, x_title, y_title, color_title, zmin, zmax, colorscale):
+    import plotly.graph_objects as go
+
+    heatmap = {
+        "z": z,
+        "x": list(x),
+        "y": list(y),
+        "coloraxis": "coloraxis",
+        "hovertemplate": (
+            f"{x_title}: %{{x}}<br>{y_title}: %{{y}}<br>{color_title}: %{{z}}<extra></extra>"
+        ),
+    }
+    layout = {
+        "template": COMPACT_TEMPLATE,
+        "title": {"text": title},
+        "xaxis": {"title": {"text": x_title}, "constrain": "domain"},
+        "yaxis": {"title": {"text": y_title}, "autorange": "reversed", "constrain": "domain"},
+        "coloraxis": {
+            "colorscale": colorscale,
+            "cmin": zmin,
+            "cmax": zmax,
+            "colorbar": {"title": {"text": color_title}},
+        },
+    }
+    return go.Figure(go.Heatmap(heatmap), layout)
+
+
+# Heatmap of the matrix `z`, rows labelled by `y` from top to bottom and columns by `x`
+def heatmap(
+    z, x, y, title, x_title="", y_title="", color_title="", zmin=None, zmax=None, colorscale="Blues"
+):
+    return cached_chart(
+        "heatmap",
+        _heatmap_figure,
+        (_compact(z), np.asarray(x, dtype=str), np.asarray(y, dtype=str)),
+        title=title,
+        x_title=x_title,
+        y_title=y_title,
+        color_title=color_title,
+        zmin=zmin,
+        zmax=zmax,
+        colorscale=colorscale,
+    )
+
+
+# Draws `chart` in `container`, timing it and counting the size of the spec sent
+def draw_chart(container, chart, **kwargs):
+    with span("plotly"):
+        container.plotly_chart(chart.figure, **kwargs)
+    record_bytes("plotly", chart.payload_bytes)
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+CACHE_ROOT = Path(os.environ.get("DIANGAT_CACHE_DIR", Path.home() / ".cache" / "diangat"))
+
+
+# Hex digest used as a content address for uploaded files and texts
+def content_hash(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class DiskCache:
+    """Directory of immutable blobs with a size-bounded, least-recently-used eviction.
+
+    The modification time of a blob is refreshed on every hit, so that eviction removes
+    the entries that were read the longest time ago. Writes go through a temporary file
+    and an atomic rename, which makes the cache safe to share between the processes of
+    a server.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key):
+        return self.directory / key[:2] / key
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    # Blob of `key` as an open binary file, for blobs too large to be read at once
+    def open(self, key):
+        path = self._path(key)
+        try:
+            blob = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return blob
+
+    def set(self, key, data):
+        self.set_stream(key, [data])
+
+    # Same as `set` for a blob given as an iterable of byte strings, never held in memory
+    def set_stream(self, key, chunks):
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                for chunk in chunks:
+                    tmp_file.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.evict()
+
+    # Remove the least recently used blobs until the cache fits in `max_bytes`
+    def evict(self):
+        entries = []
+        total_bytes = 0
+        for path in self.directory.glob("*/*"):
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_bytes += stat.st_size
+        if total_bytes <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+            if total_bytes <= self.max_bytes:
+                break
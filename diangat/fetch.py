@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
+
+from diangat.disk_cache import CACHE_ROOT, DiskCache, content_hash
+from diangat.resources import justext_stoplist
+from diangat.timing import span
+
+# Seconds allowed to connect and then between two bytes of the response
+DEFAULT_TIMEOUT = (5, 30)
+# Seconds allowed for the whole download, however steadily the server trickles bytes
+DEFAULT_DEADLINE = 60
+MAX_RESPONSE_BYTES = int(os.environ.get("DIANGAT_MAX_RESPONSE_MB", "10")) * 1024 * 1024
+HTTP_CACHE_BYTES = int(os.environ.get("DIANGAT_HTTP_CACHE_MB", "64")) * 1024 * 1024
+POOL_SIZE = 16
+CHUNK_BYTES = 8 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+_http_cache = None
+
+
+class ResponseTooLarge(Exception):
+    pass
+
+
+# Session shared by the whole process, so that connections to a site are kept alive and reused
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            retries = Retry(
+                total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504), raise_on_status=False
+            )
+            adapter = HTTPAdapter(
+                pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retries
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def get_http_cache():
+    global _http_cache
+    if _http_cache is None:
+        _http_cache = DiskCache(CACHE_ROOT / "http", HTTP_CACHE_BYTES)
+    return _http_cache
+
+
+# A cached response is stored as one line of JSON metadata followed by the body
+def _load_cached(cache, key):
+    blob = cache.get(key)
+    if blob is None:
+        return None, None
+    header, _, body = blob.partition(b"\n")
+    try:
+        return json.loads(header), body
+    except ValueError:
+        return None, None
+
+
+def _store_cached(cache, key, meta, body):
+    cache.set(key, json.dumps(meta).encode("utf-8") + b"\n" + body)
+
+
+# Seconds for which a response may be reused without asking the server, from Cache-Control
+def _max_age(headers):
+    directives = [d.strip().lower() for d in headers.get("Cache-Control", "").split(",")]
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+    for directive in directives:
+        if directive.startswith("max-age="):
+            try:
+                return max(0, int(directive[len("max-age=") :]))
+            except ValueError:
+                return 0
+    return 0
+
+
+# Seconds allowed between two bytes, from a `timeout` given as requests takes it
+def _read_timeout(timeout):
+    return timeout[1] if isinstance(timeout, tuple) else timeout
+
+
+# Chunks of a streamed response as they arrive: each one comes from a single read of the
+# socket, where `iter_content` waits for CHUNK_BYTES however slowly they come
+def _iter_chunks(response):
+    if not hasattr(response.raw, "read1"):
+        yield from response.iter_content(CHUNK_BYTES)
+        return
+    while True:
+        chunk = response.raw.read1(CHUNK_BYTES, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+
+# Body of a response read in chunks, stopped as soon as it exceeds `max_bytes` or `deadline`.
+# Each read of the socket waits at most until the deadline, so a server that stalls or sends
+# a byte now and then cannot hold the download past it.
+def _read_body(response, max_bytes, deadline, read_timeout=None):
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise ResponseTooLarge(f"{response.url}: {length} bytes, the limit is {max_bytes}")
+    sock = getattr(getattr(response.raw, "connection", None), "sock", None)
+    chunks = []
+    received = 0
+    content = _iter_chunks(response)
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.Timeout(f"{response.url}: download took longer than the deadline")
+        if sock is not None:
+            sock.settimeout(min(remaining, read_timeout) if read_timeout else remaining)
+        try:
+            chunk = next(content, None)
+        except ReadTimeoutError as error:
+            raise requests.Timeout(f"{response.url}: {error}") from error
+        if chunk is None:
+            return b"".join(chunks)
+        received += len(chunk)
+        if received > max_bytes:
+            raise ResponseTooLarge(f"{response.url}: more than {max_bytes} bytes")
+        chunks.append(chunk)
+
+
+# Body of a URL through the on-disk HTTP cache. A cached response still fresh according to
+# Cache-Control is returned as is; otherwise it is revalidated with a conditional GET on its
+# ETag / Last-Modified, and the server only sends the body again if it changed.
+def fetch_url(
+    url,
+    timeout=DEFAULT_TIMEOUT,
+    max_bytes=MAX_RESPONSE_BYTES,
+    deadline=DEFAULT_DEADLINE,
+    cache=None,
+):
+    cache = cache or get_http_cache()
+    key = content_hash(url)
+    meta, body = _load_cached(cache, key)
+    if meta is not None and time.time() < meta.get("fresh_until", 0):
+        return body
+
+    headers = {}
+    if meta is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    with span("fetch"):
+        with get_session().get(url, headers=headers, timeout=timeout, stream=True) as response:
+            if response.status_code == 304 and meta is not None:
+                max_age = _max_age(response.headers)
+                if max_age:
+                    meta["fresh_until"] = time.time() + max_age
+                    _store_cached(cache, key, meta, body)
+                return body
+            response.raise_for_status()
+            body = _read_body(
+                response, max_bytes, time.monotonic() + deadline, _read_timeout(timeout)
+            )
+
+    max_age = _max_age(response.headers)
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if max_age is not None and (max_age or etag or last_modified):
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh_until": time.time() + max_age,
+        }
+        _store_cached(cache, key, meta, body)
+    return body
+
+
+# Text of the non-boilerplate paragraphs of an HTML page
+def article_text(content):
+    import justext
+
+    with span("boilerplate"):
+        paragraphs = justext.justext(content, justext_stoplist("French"))
+    scraped_content = [paragraph.text for paragraph in paragraphs if not paragraph.is_boilerplate]
+    return " ".join(scraped_content)
+
+
+# Main text of a web article, without the boilerplate paragraphs
+def fetch_article_text(url, timeout=DEFAULT_TIMEOUT):
+    return article_text(fetch_url(url, timeout=timeout))
@@ -0,0 +1,56 @@
+from collections import namedtuple
+
+from diangat.disk_cache import content_hash
+
+# Result of a stage with the fingerprint of the inputs it was computed from; `version`
+# changes whenever the value may have changed, and is part of the fingerprint of the
+# nodes computed from it
+Node = namedtuple("Node", ["name", "fingerprint", "version", "value"])
+
+
+class ComputationGraph:
+    """Results of the analysis stages of a session, recomputed only when their inputs change.
+
+    A node is identified by its name and remembers the versions of the nodes it was computed
+    from, plus an optional `key` for inputs that are not nodes (file contents, synonyms...).
+    Asking for a node whose inputs did not change returns the stored value; otherwise the
+    node is recomputed, which in turn makes every node downstream of it stale. `store` is
+    any mutable mapping, typically a dict kept in `st.session_state`.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.computed = []
+
+    @staticmethod
+    def _fingerprint(deps, key):
+        return (key, tuple(dep.version for dep in deps))
+
+    # Stored node if it is up to date with `deps` and `key`, None otherwise
+    def get(self, name, deps=(), key=None):
+        node = self.store.get(name)
+        if node is not None and node.fingerprint == self._fingerprint(deps, key):
+            return node
+        return None
+
+    # Stores a value computed outside of `node`, e.g. several nodes filled by one pass
+    def set(self, name, value, deps=(), key=None):
+        fingerprint = self._fingerprint(deps, key)
+        version = content_hash(f"{name}\n{fingerprint!r}")[:16]
+        node = self.store[name] = Node(name, fingerprint, version, value)
+        self.computed.append(name)
+        return node
+
+    def node(self, name, func, deps=(), key=None):
+        node = self.get(name, deps, key)
+        if node is None:
+            node = self.set(name, func(*(dep.value for dep in deps)), deps, key)
+        return node
+
+    # Drops the node `name` and the nodes named under it (`name:...`), e.g. `hits:0` drops
+    # the hits of every theme in the first document but not those of the tenth
+    def discard(self, name):
+        prefix = f"{name}:"
+        for stored in list(self.store):
+            if stored == name or stored.startswith(prefix):
+                del self.store[stored]
@@ -0,0 +1,200 @@
+import re
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+
+from diangat.bounded import (
+    BOUNDED_PAGES,
+    MAX_ANALYSIS_BYTES,
+    MemoryCeiling,
+    MemoryLimitExceeded,
+    spool_pdf_pages,
+)
+from diangat.matcher import get_matcher
+from diangat.pdf_text import LargePdf, iter_extract_many, pdf_cache_key, read_pdf_bytes
+from diangat.pipeline import iter_page_sentences
+from diangat.subjects import selected_subjects
+from diangat.timing import span
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Number of document indexes kept in memory by the process
+MAX_INDEXES = 64
+
+_EMPTY = array("I")
+
+# Memory of a new posting list besides its entries: the empty array and the dict slot
+_POSTING_LIST_BYTES = sys.getsizeof(_EMPTY) + 16
+
+
+# Every synonym of every theme, case-folded: the phrases indexed exactly
+def default_vocabulary():
+    return tuple(sorted({term.lower() for terms in selected_subjects.values() for term in terms}))
+
+
+class DocumentIndex:
+    """Inverted index of a document, from terms to the ids of the sentences containing them.
+
+    Every phrase of the vocabulary gets an exact posting list, computed with the theme
+    matcher, and every word token gets its own. A theme is then answered by the union of
+    the posting lists of its synonyms, without going back to the text.
+    """
+
+    def __init__(self, total_sentences, vocabulary, phrase_postings, token_postings):
+        self.total_sentences = total_sentences
+        self.vocabulary = frozenset(vocabulary)
+        self.phrase_postings = phrase_postings
+        self.token_postings = token_postings
+        self._counts = {}
+
+    # Index of a stream of pages. The posting lists are reported to `ceiling` as they grow.
+    @classmethod
+    def build(cls, pages, vocabulary=None, language="french", ceiling=None):
+        vocabulary = vocabulary or default_vocabulary()
+        phrase_matcher = get_matcher({term: [term] for term in vocabulary})
+        phrase_postings = {}
+        token_postings = {}
+        total_sentences = 0
+        for document in iter_page_sentences(pages, language):
+            entries = new_bytes = 0
+            for offset, mask in enumerate(phrase_matcher.match_spans(document)):
+                for term in phrase_matcher.themes_of(mask):
+                    postings = phrase_postings.get(term)
+                    if postings is None:
+                        postings = phrase_postings[term] = array("I")
+                        new_bytes += _POSTING_LIST_BYTES + sys.getsizeof(term)
+                    postings.append(total_sentences + offset)
+                    entries += 1
+            with span("indexing"):
+                for offset in range(len(document)):
+                    sentence_id = total_sentences + offset
+                    for token in set(TOKEN_PATTERN.findall(document.sentence(offset).lower())):
+                        postings = token_postings.get(token)
+                        if postings is None:
+                            postings = token_postings[token] = array("I")
+                            new_bytes += _POSTING_LIST_BYTES + sys.getsizeof(token)
+                        postings.append(sentence_id)
+                        entries += 1
+            total_sentences += len(document)
+            if ceiling is not None:
+                ceiling.hold(new_bytes + entries * _EMPTY.itemsize)
+        return cls(total_sentences, vocabulary, phrase_postings, token_postings)
+
+    # Ids of the sentences containing `term`. A phrase outside of the vocabulary is answered
+    # with the sentences containing all of its words, a superset of its exact occurrences.
+    def postings(self, term):
+        term = term.lower()
+        if term in self.vocabulary:
+            return self.phrase_postings.get(term, _EMPTY)
+        words = TOKEN_PATTERN.findall(term)
+        if not words:
+            return _EMPTY
+        if len(words) == 1 and words[0] == term:
+            return self.token_postings.get(term, _EMPTY)
+        candidates = set(self.token_postings.get(words[0], _EMPTY))
+        for word in words[1:]:
+            candidates.intersection_update(self.token_postings.get(word, _EMPTY))
+        return array("I", sorted(candidates))
+
+    # Number of sentences containing at least one of `terms`
+    def count_sentences(self, terms):
+        key = tuple(terms)
+        count = self._counts.get(key)
+        if count is None:
+            sentence_ids = set()
+            for term in terms:
+                sentence_ids.update(self.postings(term))
+            count = self._counts[key] = len(sentence_ids)
+        return count
+
+    def theme_counts(self, subjects):
+        return {subject: self.count_sentences(terms) for subject, terms in subjects.items()}
+
+    # Number of sentences containing each word token, the term vector of the document
+    def term_counts(self):
+        return {token: len(sentence_ids) for token, sentence_ids in self.token_postings.items()}
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_cached_index(key):
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+        return index
+
+
+def store_index(key, index):
+    with _indexes_lock:
+        _indexes[key] = index
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+
+
+# Index of a PDF too large to be held in memory, built from its pages spilled to disk
+def build_bounded_index(
+    pdf_file, language="french", max_bytes=MAX_ANALYSIS_BYTES, on_page=None, ceiling=None
+):
+    ceiling = ceiling or MemoryCeiling(max_bytes)
+    with spool_pdf_pages(pdf_file, ceiling=ceiling, on_page=on_page) as pages:
+        return DocumentIndex.build(pages, language=language, ceiling=ceiling)
+
+
+# Index of every PDF, built once per uploaded content and then kept in memory. Yields
+# `(position, index)` in completion order, or the exception raised by an unreadable file.
+# PDFs of more than `bounded_pages` pages are indexed one after the other in bounded memory.
+# Every index built, whatever the size of its PDF, is held on the same `ceiling`: one per
+# call by default, to be shared by all the PDFs of an analysis.
+def iter_pdf_indexes(
+    pdf_files, language="french", bounded_pages=BOUNDED_PAGES, ceiling=None, **extract_kwargs
+):
+    ceiling = ceiling or MemoryCeiling()
+    keys = {}
+    missing = []
+    for idx, pdf_file in enumerate(pdf_files):
+        try:
+            keys[idx] = f"{pdf_cache_key(read_pdf_bytes(pdf_file))}-{language}"
+        except Exception as e:
+            yield idx, e
+            continue
+        index = get_cached_index(keys[idx])
+        if index is None:
+            missing.append(idx)
+        else:
+            yield idx, index
+
+    missing_files = [pdf_files[idx] for idx in missing]
+    extracted = iter_extract_many(missing_files, large_pages=bounded_pages, **extract_kwargs)
+    for position, pages in extracted:
+        idx = missing[position]
+        if isinstance(pages, LargePdf):
+            try:
+                index = build_bounded_index(
+                    pages, language, on_page=extract_kwargs.get("on_page"), ceiling=ceiling
+                )
+            except Exception as e:
+                yield idx, e
+                continue
+            store_index(keys[idx], index)
+            yield idx, index
+            continue
+        if isinstance(pages, Exception):
+            yield idx, pages
+            continue
+        # The pages are held until the index is built
+        pages_bytes = sum(sys.getsizeof(page) for page in pages)
+        try:
+            ceiling.hold(pages_bytes)
+            index = DocumentIndex.build(pages, language=language, ceiling=ceiling)
+        except MemoryLimitExceeded as e:
+            yield idx, e
+            continue
+        finally:
+            ceiling.release(pages_bytes)
+        store_index(keys[idx], index)
+        yield idx, index
@@ -0,0 +1,125 @@
+import asyncio
+import contextvars
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from diangat.fetch import article_text, fetch_url
+from diangat.matcher import get_matcher, theme_proportions
+from diangat.pdf_text import get_executor
+from diangat.segmentation import segment
+from diangat.timing import span
+
+# Downloads in flight at the same time, however many URLs are given
+MAX_CONNECTIONS = 8
+
+ArticleCounts = namedtuple("ArticleCounts", ["index", "url", "error", "sentences", "subject_count"])
+AggregateCounts = namedtuple(
+    "AggregateCounts", ["articles", "failed", "total_sentences", "subject_count", "proportions"]
+)
+
+_DONE = object()
+
+
+# Number of sentences and theme hits of an HTML page, run in a worker process
+def article_theme_counts(content, subjects, language="french"):
+    document = segment(article_text(content), language)
+    hits = get_matcher(subjects).find_hits(document)
+    return len(document), {subject: len(sentence_ids) for subject, sentence_ids in hits.items()}
+
+
+# Downloads every URL with `download` on a bounded thread pool driven by the event loop, then
+# hands each body to `work` on `executor`, so that the analysis never blocks the downloads.
+# Downloads run in a copy of the context of the loop, so their spans go to the current run;
+# `work` may run in another process, and is timed as a whole as the "analysis" stage.
+async def _process_urls(urls, work, args, max_connections, executor, results, stop, download):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_connections)
+
+    with ThreadPoolExecutor(max_workers=max_connections) as downloader:
+
+        async def process(idx, url):
+            try:
+                async with semaphore:
+                    if stop.is_set():
+                        return
+                    content = await loop.run_in_executor(
+                        downloader, contextvars.copy_context().run, download, url
+                    )
+                with span("analysis"):
+                    result = await loop.run_in_executor(executor, work, content, *args)
+            except Exception as e:
+                result = e
+            results.put((idx, url, result))
+
+        await asyncio.gather(*(process(idx, url) for idx, url in enumerate(urls)))
+
+
+# Runs the event loop in a background thread and yields `(index, url, result)` from the
+# calling thread as soon as each URL is processed; a failed URL comes with its exception.
+# Closing the generator early stops the downloads that have not started yet. `download`
+# turns an item into the input of `work`; any blocking callable does, not only HTTP.
+def iter_processed_urls(
+    urls, work, args=(), max_connections=MAX_CONNECTIONS, executor=None, download=fetch_url
+):
+    if executor is None:
+        executor = get_executor()
+    results = queue.Queue()
+    stop = threading.Event()
+
+    def run_loop():
+        try:
+            asyncio.run(
+                _process_urls(
+                    urls, work, args, max_connections, executor, results, stop, download
+                )
+            )
+        finally:
+            results.put(_DONE)
+
+    # The loop runs in the context of the caller, e.g. with the timing run of the app
+    context = contextvars.copy_context()
+    threading.Thread(
+        target=context.run, args=(run_loop,), name="diangat-ingest", daemon=True
+    ).start()
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+# Main text of several web articles, in completion order
+def iter_article_texts(urls, max_connections=MAX_CONNECTIONS, executor=None):
+    return iter_processed_urls(urls, article_text, (), max_connections, executor)
+
+
+# Theme counts of several web articles, each one followed by the running aggregate of all
+# the articles received so far
+def iter_url_theme_counts(
+    urls, subjects, language="french", max_connections=MAX_CONNECTIONS, executor=None
+):
+    subjects = dict(subjects)
+    subject_count = dict.fromkeys(subjects, 0)
+    articles = failed = total_sentences = 0
+    processed = iter_processed_urls(
+        urls, article_theme_counts, (subjects, language), max_connections, executor
+    )
+    for idx, url, result in processed:
+        if isinstance(result, Exception):
+            failed += 1
+            article = ArticleCounts(idx, url, result, None, None)
+        else:
+            articles += 1
+            sentences, counts = result
+            total_sentences += sentences
+            for subject, count in counts.items():
+                subject_count[subject] += count
+            article = ArticleCounts(idx, url, None, sentences, counts)
+        yield article, AggregateCounts(
+            articles, failed, total_sentences, dict(subject_count), theme_proportions(subject_count)
+        )
@@ -0,0 +1,421 @@
+"""Map-reduce insights of long texts with a language model.
+
+The text is cut at sentence boundaries into chunks of at most `chunk_tokens` tokens, each
+one repeating the last `overlap_tokens` tokens of the previous one so that no topic is
+split without context. Every chunk goes to the backend with the map prompt, at most
+`max_concurrency` requests at a time and `requests_per_minute` for the whole process;
+requests failing on a timeout, a lost connection, a rate limit or a server error are
+retried with an exponential backoff. The chunk insights are then merged by the reduce
+prompt into the insights of the document, in several rounds if they do not fit in one
+request. Every answer is cached on disk per (chunk hash, prompt, model), so a rerun, or
+another document sharing chunks with this one, only pays for new chunks.
+
+A backend is any object with a `model` attribute and a `complete(prompt, max_tokens)`
+method raising `TransientError` for the failures worth retrying. `OpenAIBackend` reads
+its key from OPENAI_API_KEY; `HTTPBackend` talks to any OpenAI-compatible endpoint, such
+as the stub server started by `python -m diangat.insights serve`, which answers without a
+model, for tests and benchmarks. `get_backend` picks the HTTP backend when DIANGAT_LLM_URL is set.
+"""
+import argparse
+import functools
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from diangat.disk_cache import CACHE_ROOT, DiskCache, content_hash
+from diangat.segmentation import segment
+from diangat.timing import span
+
+DEFAULT_MODEL = os.environ.get("DIANGAT_LLM_MODEL", "gpt-3.5-turbo")
+LLM_URL = os.environ.get("DIANGAT_LLM_URL")
+MAX_CONCURRENCY = int(os.environ.get("DIANGAT_LLM_CONCURRENCY", "4"))
+REQUESTS_PER_MINUTE = float(os.environ.get("DIANGAT_LLM_RPM", "60"))
+INSIGHTS_CACHE_BYTES = int(os.environ.get("DIANGAT_INSIGHTS_CACHE_MB", "16")) * 1024 * 1024
+
+# Chunks leave room for the prompt and the answer in a 4096 token context
+CHUNK_TOKENS = 3000
+OVERLAP_TOKENS = 200
+MAX_TOKENS = 50
+REDUCE_MAX_TOKENS = 200
+RETRIES = 3
+RETRY_BACKOFF = 1.0
+# Reduce rounds before the remaining insights are merged in a single request
+MAX_REDUCE_ROUNDS = 8
+
+MAP_PROMPT = "Extract 5 main topics from the following text:\n{text}\n\nInsights:"
+REDUCE_PROMPT = (
+    "Here are the main topics of successive parts of a document:\n{text}\n\n"
+    "Merge them into the 5 main topics of the whole document:"
+)
+
+Insights = namedtuple("Insights", ["summary", "chunks", "chunk_insights", "requests", "cached"])
+
+_insights_cache = None
+
+
+class BackendUnavailable(RuntimeError):
+    pass
+
+
+# Failure worth retrying: timeout, lost connection, rate limit or server error. Backends
+# raise it for those only; a bad request or a rejected key fails at once.
+class TransientError(RuntimeError):
+    pass
+
+
+def get_insights_cache():
+    global _insights_cache
+    if _insights_cache is None:
+        _insights_cache = DiskCache(CACHE_ROOT / "insights", INSIGHTS_CACHE_BYTES)
+    return _insights_cache
+
+
+@functools.lru_cache(maxsize=None)
+def _token_encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding("cl100k_base")
+
+
+# Number of tokens of a text: exact with tiktoken, otherwise about 4 characters per token,
+# rounded up per word so that chunks err on the small side
+def count_tokens(text):
+    encoding = _token_encoding()
+    if encoding is None:
+        return sum(len(word) // 4 + 1 for word in text.split())
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+# Sentences of a text with their token counts; a sentence longer than a chunk is cut
+# between words
+def _token_pieces(text, chunk_tokens, language):
+    document = segment(text, language)
+    for idx in range(len(document)):
+        sentence = document.sentence(idx)
+        tokens = count_tokens(sentence)
+        if tokens <= chunk_tokens:
+            yield sentence, tokens
+            continue
+        words, words_tokens = [], 0
+        for word in sentence.split():
+            word_tokens = count_tokens(word)
+            if words and words_tokens + word_tokens > chunk_tokens:
+                yield " ".join(words), words_tokens
+                words, words_tokens = [], 0
+            words.append(word)
+            words_tokens += word_tokens
+        if words:
+            yield " ".join(words), words_tokens
+
+
+# Chunks of at most `chunk_tokens` tokens made of whole sentences, each starting with the
+# last sentences of the previous one, up to `overlap_tokens` tokens
+def chunk_text(text, chunk_tokens=CHUNK_TOKENS, overlap_tokens=OVERLAP_TOKENS, language="french"):
+    chunks = []
+    current, current_tokens = [], 0
+    for sentence, tokens in _token_pieces(text, chunk_tokens, language):
+        if current and current_tokens + tokens > chunk_tokens:
+            chunks.append(" ".join(piece for piece, _ in current))
+            overlap, overlap_tokens_kept = [], 0
+            for piece, piece_tokens in reversed(current):
+                if overlap_tokens_kept + piece_tokens > overlap_tokens:
+                    break
+                overlap.insert(0, (piece, piece_tokens))
+                overlap_tokens_kept += piece_tokens
+            current, current_tokens = overlap, overlap_tokens_kept
+            while current and current_tokens + tokens > chunk_tokens:
+                current_tokens -= current.pop(0)[1]
+        current.append((sentence, tokens))
+        current_tokens += tokens
+    if current:
+        chunks.append(" ".join(piece for piece, _ in current))
+    return chunks
+
+
+class RateLimiter:
+    """Spaces requests so that at most `requests_per_minute` start in any minute."""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+# Rate limiter shared by every session of the process, as the limit applies to the API key
+@functools.lru_cache(maxsize=None)
+def get_rate_limiter(requests_per_minute=REQUESTS_PER_MINUTE):
+    return RateLimiter(requests_per_minute)
+
+
+class OpenAIBackend:
+    def __init__(self, model=DEFAULT_MODEL, api_key=None):
+        self.model = model
+        self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
+        if not self.api_key:
+            raise BackendUnavailable("OPENAI_API_KEY is not set")
+        self._client = None
+
+    def complete(self, prompt, max_tokens):
+        import openai
+
+        if self._client is None:
+            self._client = openai.OpenAI(api_key=self.api_key)
+        try:
+            response = self._client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                temperature=0.5,
+            )
+        except (
+            openai.APIConnectionError,
+            openai.RateLimitError,
+            openai.InternalServerError,
+        ) as e:
+            raise TransientError(str(e)) from e
+        return response.choices[0].message.content.strip()
+
+
+class HTTPBackend:
+    """OpenAI-compatible chat completions endpoint, e.g. a local server or the stub server."""
+
+    def __init__(self, base_url, model=DEFAULT_MODEL, api_key=None, timeout=(5, 120)):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.model = model
+        self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
+        self.timeout = timeout
+
+    def complete(self, prompt, max_tokens):
+        import requests
+
+        from diangat.fetch import get_session
+
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        try:
+            response = get_session().post(
+                self.url,
+                json={
+                    "model": self.model,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "max_tokens": max_tokens,
+                    "temperature": 0.5,
+                },
+                headers=headers,
+                timeout=self.timeout,
+            )
+        except (requests.Timeout, requests.ConnectionError) as e:
+            raise TransientError(str(e)) from e
+        if response.status_code == 429 or response.status_code >= 500:
+            raise TransientError(f"{response.status_code} {response.reason} for {self.url}")
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"].strip()
+
+
+def get_backend(model=DEFAULT_MODEL):
+    if LLM_URL:
+        return HTTPBackend(LLM_URL, model)
+    return OpenAIBackend(model)
+
+
+def insight_key(model, prompt, text, max_tokens):
+    return content_hash(f"{model}\n{content_hash(prompt)}\n{content_hash(text)}\n{max_tokens}")
+
+
+# Answer of the backend to `prompt` filled with `text`, and whether it came from the cache
+def complete_cached(backend, prompt, text, max_tokens, cache, limiter, retries=RETRIES):
+    key = insight_key(backend.model, prompt, text, max_tokens)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached.decode("utf-8"), True
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        try:
+            answer = backend.complete(prompt.format(text=text), max_tokens)
+            break
+        except TransientError:
+            if attempt == retries:
+                raise
+            time.sleep(RETRY_BACKOFF * 2**attempt)
+    cache.set(key, answer.encode("utf-8"))
+    return answer, False
+
+
+# Answers to `prompt` for every text, `max_concurrency` requests at a time, in input order
+def map_prompt(
+    backend, prompt, texts, max_tokens, cache, limiter, max_concurrency, retries, on_done=None
+):
+    answers = [None] * len(texts)
+    cached = 0
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        futures = {
+            pool.submit(
+                complete_cached, backend, prompt, text, max_tokens, cache, limiter, retries
+            ): idx
+            for idx, text in enumerate(texts)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            answers[futures[future]], from_cache = future.result()
+            cached += from_cache
+            if on_done is not None:
+                on_done(done, len(texts))
+    return answers, cached
+
+
+# Groups of consecutive insights fitting in one reduce request
+def _reduce_batches(insights, chunk_tokens):
+    batches, batch, batch_tokens = [], [], 0
+    for insight in insights:
+        tokens = count_tokens(insight)
+        if batch and batch_tokens + tokens > chunk_tokens:
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(insight)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+# Insights of a whole document: map over its chunks, then reduce the chunk insights.
+# `on_chunk(done, total)` follows the map requests, e.g. a `ProgressReporter.update`.
+def summarize(
+    text,
+    backend=None,
+    map_prompt_template=MAP_PROMPT,
+    reduce_prompt_template=REDUCE_PROMPT,
+    max_tokens=MAX_TOKENS,
+    reduce_max_tokens=REDUCE_MAX_TOKENS,
+    chunk_tokens=CHUNK_TOKENS,
+    overlap_tokens=OVERLAP_TOKENS,
+    max_concurrency=MAX_CONCURRENCY,
+    requests_per_minute=REQUESTS_PER_MINUTE,
+    retries=RETRIES,
+    cache=None,
+    language="french",
+    on_chunk=None,
+):
+    backend = backend or get_backend()
+    cache = get_insights_cache() if cache is None else cache
+    limiter = get_rate_limiter(requests_per_minute)
+    with span("insights_chunking"):
+        chunks = chunk_text(text, chunk_tokens, overlap_tokens, language)
+    if not chunks:
+        return Insights("", [], [], 0, 0)
+
+    with span("insights"):
+        chunk_insights, cached = map_prompt(
+            backend,
+            map_prompt_template,
+            chunks,
+            max_tokens,
+            cache,
+            limiter,
+            max_concurrency,
+            retries,
+            on_chunk,
+        )
+        requests = len(chunks)
+        insights = chunk_insights
+        rounds = 0
+        while len(insights) > 1:
+            rounds += 1
+            batches = _reduce_batches(insights, chunk_tokens)
+            if rounds == MAX_REDUCE_ROUNDS:
+                batches = [insights]
+            elif len(batches) == len(insights):
+                # No two insights fit in one request: they are paired anyway, so that every
+                # round at least halves their number
+                batches = [insights[idx : idx + 2] for idx in range(0, len(insights), 2)]
+            insights, batch_cached = map_prompt(
+                backend,
+                reduce_prompt_template,
+                ["\n".join(batch) for batch in batches],
+                reduce_max_tokens,
+                cache,
+                limiter,
+                max_concurrency,
+                retries,
+            )
+            requests += len(batches)
+            cached += batch_cached
+    return Insights(insights[0], chunks, chunk_insights, requests, cached)
+
+
+# Local OpenAI-compatible server answering every chat completion with the most frequent
+# long words of the prompt after `latency` seconds, for tests and benchmarks
+def start_stub_server(host="127.0.0.1", port=0, latency=0.0):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    prompt_words = set(re.findall(r"\w{6,}", (MAP_PROMPT + REDUCE_PROMPT).lower()))
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(latency)
+            prompt = request["messages"][-1]["content"]
+            words = Counter(
+                word
+                for word in re.findall(r"\w{6,}", prompt.lower())
+                if word not in prompt_words
+            )
+            topics = ", ".join(word for word, _ in words.most_common(5))
+            body = json.dumps(
+                {
+                    "object": "chat.completion",
+                    "model": request.get("model"),
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": topics},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                }
+            ).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of an OpenAI-compatible server")
+    parser.add_argument("command", choices=["serve"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.host, args.port, args.latency)
+    print(f"DIANGAT_LLM_URL=http://{args.host}:{server.server_port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
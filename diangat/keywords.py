@@ -0,0 +1,179 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+
+from diangat.disk_cache import content_hash
+from diangat.resources import keyword_extractor
+from diangat.segmentation import segment
+from diangat.timing import span
+
+# Number of (text, parameters) keyword lists kept in memory by the process
+MAX_CACHED_KEYWORDS = 256
+
+# Texts longer than this many characters are scored in chunks by `extract_keywords_parallel`
+KEYWORD_CHUNK_CHARS = int(os.environ.get("DIANGAT_KEYWORD_CHUNK_CHARS", "100000"))
+
+# Candidates kept from each chunk per keyword asked for, so that a keyword ranked low in
+# every chunk can still reach the global top
+CANDIDATES_PER_KEYWORD = 10
+
+_keywords_cache = OrderedDict()
+_keywords_lock = threading.Lock()
+
+
+def _cached(key):
+    with _keywords_lock:
+        keywords = _keywords_cache.get(key)
+        if keywords is not None:
+            _keywords_cache.move_to_end(key)
+        return keywords
+
+
+def _store(key, keywords):
+    with _keywords_lock:
+        _keywords_cache[key] = keywords
+        while len(_keywords_cache) > MAX_CACHED_KEYWORDS:
+            _keywords_cache.popitem(last=False)
+
+
+# YAKE keywords of a text, as (keyword, score) pairs; the lower the score, the more relevant.
+# Results are cached by text hash and parameters, so a document goes through YAKE once per
+# parameter set however many times it is displayed.
+def extract_keywords(
+    text, top=20, language="french", max_ngram_size=3, deduplication_threshold=0.9
+):
+    key = (content_hash(text), language, max_ngram_size, deduplication_threshold, top)
+    keywords = _cached(key)
+    if keywords is not None:
+        return keywords
+
+    kw_extractor = keyword_extractor(language, max_ngram_size, deduplication_threshold, top)
+    with span("keywords"):
+        keywords = kw_extractor.extract_keywords(text)[:top]
+    keywords = tuple((keyword, float(score)) for keyword, score in keywords)
+
+    _store(key, keywords)
+    return keywords
+
+
+# Consecutive whole sentences of a text, grouped into chunks of at most `chunk_chars`
+# characters; a sentence longer than that is a chunk of its own
+def sentence_chunks(text, chunk_chars=KEYWORD_CHUNK_CHARS, language="french"):
+    document = segment(text, language)
+    chunks = []
+    first = 0
+    for idx in range(1, len(document) + 1):
+        if idx == len(document) or document.ends[idx] - document.starts[first] > chunk_chars:
+            chunks.append(text[document.starts[first] : document.ends[idx - 1]])
+            first = idx
+    return chunks
+
+
+# YAKE candidates of one chunk, run in a worker process
+def chunk_candidates(chunk, candidates, language, max_ngram_size, deduplication_threshold):
+    kw_extractor = keyword_extractor(language, max_ngram_size, deduplication_threshold, candidates)
+    return [(keyword, float(score)) for keyword, score in kw_extractor.extract_keywords(chunk)]
+
+
+# Global top of the candidates of every chunk. A YAKE score is the relevance of the words of
+# a candidate divided by its frequency, so the inverse scores of the chunks add up like the
+# frequencies: the merged score is the score of the candidate in the whole text when its
+# words are equally relevant in every chunk. Candidates are then deduplicated as YAKE does.
+def merge_candidates(
+    chunks_candidates, top=20, language="french", max_ngram_size=3, deduplication_threshold=0.9
+):
+    merged = {}
+    for candidates in chunks_candidates:
+        for keyword, score in candidates:
+            key = keyword.lower()
+            inverse = 1.0 / score if score > 0 else float("inf")
+            if key in merged:
+                merged[key][0] += inverse
+            else:
+                merged[key] = [inverse, keyword]
+
+    kw_extractor = keyword_extractor(language, max_ngram_size, deduplication_threshold, top)
+    keywords = []
+    for inverse, keyword in sorted(merged.values(), key=lambda item: -item[0]):
+        if len(keywords) == top:
+            break
+        if deduplication_threshold < 1 and any(
+            kw_extractor.similarity(keyword, kept) > deduplication_threshold
+            for kept, _ in keywords
+        ):
+            continue
+        keywords.append((keyword, 1.0 / inverse))
+    return tuple(keywords)
+
+
+# YAKE keywords of a long text from chunks scored in parallel on `executor` (the process
+# pool of the server by default) and merged by `merge_candidates`. Texts of a single chunk
+# go through `extract_keywords` unchanged; results are cached the same way.
+def extract_keywords_parallel(
+    text,
+    top=20,
+    language="french",
+    max_ngram_size=3,
+    deduplication_threshold=0.9,
+    chunk_chars=KEYWORD_CHUNK_CHARS,
+    executor=None,
+):
+    if not chunk_chars or len(text) <= chunk_chars:
+        return extract_keywords(text, top, language, max_ngram_size, deduplication_threshold)
+    key = (content_hash(text), language, max_ngram_size, deduplication_threshold, top, chunk_chars)
+    keywords = _cached(key)
+    if keywords is not None:
+        return keywords
+
+    chunks = sentence_chunks(text, chunk_chars, language)
+    if len(chunks) == 1:
+        return extract_keywords(text, top, language, max_ngram_size, deduplication_threshold)
+    shared_executor = executor is None
+    if shared_executor:
+        from diangat.pdf_text import get_executor
+
+        executor = get_executor()
+    candidates = top * CANDIDATES_PER_KEYWORD
+    with span("keywords"):
+        futures = [
+            executor.submit(
+                chunk_candidates,
+                chunk,
+                candidates,
+                language,
+                max_ngram_size,
+                deduplication_threshold,
+            )
+            for chunk in chunks
+        ]
+        try:
+            chunks_candidates = [future.result() for future in futures]
+        except BrokenProcessPool:
+            # The next call starts a new pool rather than failing on this one
+            if shared_executor:
+                from diangat.pdf_text import _reset_executor
+
+                _reset_executor()
+            raise
+        keywords = merge_candidates(
+            chunks_candidates, top, language, max_ngram_size, deduplication_threshold
+        )
+
+    _store(key, keywords)
+    return keywords
+
+
+# Average overlap of two rankings: the share of common keywords among the first d of each,
+# averaged over d = 1..depth. 1.0 for the same ranking, 0.0 for disjoint ones; a swap near
+# the top costs more than one near the bottom.
+def rank_overlap(reference, candidate, depth=None):
+    reference = [keyword.lower() for keyword in reference]
+    candidate = [keyword.lower() for keyword in candidate]
+    depth = depth or max(len(reference), len(candidate))
+    if not depth:
+        return 1.0
+    total = 0.0
+    for d in range(1, depth + 1):
+        total += len(set(reference[:d]) & set(candidate[:d])) / d
+    return total / depth
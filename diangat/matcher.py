@@ -0,0 +1,193 @@
+import functools
+from array import array
+from collections import deque
+
+from diangat.timing import span
+
+
+# Same definition of a word character as the `\b` of the `re` module for str patterns
+def _is_word_char(char):
+    return char.isalnum() or char == "_"
+
+
+# Lowercase of a character as `re.IGNORECASE` compares them: one character, and the same for
+# every character with the same uppercase ("ſ" and "s", "ς" and "σ", "ı", "İ" and "i")
+@functools.lru_cache(maxsize=None)
+def _fold_char(char):
+    lowered = char.lower()[0]
+    upper = lowered.upper()
+    if len(upper) == 1 and len(upper.lower()) == 1:
+        return upper.lower()
+    return lowered
+
+
+# Text case-folded character per character, so that offsets in the folded text are offsets
+# in the original one. `str.lower` alone turns "İ" into two characters.
+def _fold(text):
+    lowered = text.lower()
+    if lowered.isascii():
+        return lowered
+    table = {}
+    for char in set(text):
+        if not char.isascii() and _fold_char(char) != char.lower():
+            table[ord(char)] = _fold_char(char)
+    return text.translate(table).lower() if table else lowered
+
+
+class ThemeMatcher:
+    """Aho-Corasick automaton over the synonyms of several themes.
+
+    Every synonym is case-folded and deduplicated; a synonym shared by several themes is
+    stored once with a bit mask of the themes it belongs to. A sentence is scanned once,
+    whatever the number of themes, and a hit follows the semantics of the historical
+    `\\b(?:synonym|...)\\b` regex with `re.IGNORECASE`, down to its case equivalences.
+    """
+
+    def __init__(self, subjects):
+        self.themes = list(subjects.keys())
+        self.full_mask = (1 << len(self.themes)) - 1
+
+        goto = [{}]
+        terminals = [{}]
+        for idx, theme in enumerate(self.themes):
+            for synonym in set(_fold(term) for term in subjects[theme]):
+                if not synonym:
+                    continue
+                node = 0
+                for char in synonym:
+                    next_node = goto[node].get(char)
+                    if next_node is None:
+                        next_node = len(goto)
+                        goto[node][char] = next_node
+                        goto.append({})
+                        terminals.append({})
+                    node = next_node
+                terminals[node][len(synonym)] = terminals[node].get(len(synonym), 0) | (1 << idx)
+
+        # Breadth-first construction of the failure links, folded into a complete
+        # transition table so that scanning is a single dict lookup per character
+        fail = [0] * len(goto)
+        outputs = [()] * len(goto)
+        delta = [dict(goto[0])]
+        delta.extend({} for _ in range(len(goto) - 1))
+        outputs[0] = tuple(terminals[0].items())
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            outputs[node] = tuple(terminals[node].items()) + outputs[fail[node]]
+            transitions = dict(delta[fail[node]])
+            transitions.update(goto[node])
+            delta[node] = transitions
+            for char, child in goto[node].items():
+                fail[child] = delta[fail[node]].get(char, 0)
+                queue.append(child)
+
+        self._delta = delta
+        self._outputs = outputs
+
+    # Bit mask of the themes having at least one synonym in `sentence`
+    def match(self, sentence):
+        lowered = _fold(sentence)
+        size = len(lowered)
+        delta = self._delta
+        outputs = self._outputs
+        full_mask = self.full_mask
+        found = 0
+        node = 0
+        for position, char in enumerate(lowered):
+            node = delta[node].get(char, 0)
+            output = outputs[node]
+            if not output:
+                continue
+            end = position + 1
+            if end < size and _is_word_char(lowered[end]):
+                continue
+            for length, mask in output:
+                if mask & ~found == 0:
+                    continue
+                start = end - length
+                if start > 0 and _is_word_char(lowered[start - 1]):
+                    continue
+                found |= mask
+            if found == full_mask:
+                break
+        return found
+
+    # Names of the themes encoded in a bit mask returned by `match`
+    def themes_of(self, mask):
+        themes = []
+        while mask:
+            lowest = mask & -mask
+            themes.append(self.themes[lowest.bit_length() - 1])
+            mask ^= lowest
+        return themes
+
+    # Bit masks of the themes found in each sentence of a `SentenceIndex`. The whole text is
+    # scanned once; a synonym must lie inside a single sentence, with the edges of the
+    # sentence counting as word boundaries.
+    def match_spans(self, document):
+        with span("matching"):
+            return self._match_spans(document)
+
+    def _match_spans(self, document):
+        text, starts, ends = document.text, document.starts, document.ends
+        lowered = _fold(text)
+        delta = self._delta
+        outputs = self._outputs
+        total_sentences = len(starts)
+        masks = [0] * total_sentences
+        sentence = 0
+        node = 0
+        for position, char in enumerate(lowered):
+            node = delta[node].get(char, 0)
+            output = outputs[node]
+            if not output:
+                continue
+            end = position + 1
+            while sentence < total_sentences and ends[sentence] < end:
+                sentence += 1
+            if sentence == total_sentences:
+                break
+            sentence_start = starts[sentence]
+            if end <= sentence_start:
+                continue
+            if end < ends[sentence] and _is_word_char(lowered[end]):
+                continue
+            found = masks[sentence]
+            # Outputs go from the longest synonym to the shortest
+            for length, mask in output:
+                start = end - length
+                if start < sentence_start or mask & ~found == 0:
+                    continue
+                if start > sentence_start and _is_word_char(lowered[start - 1]):
+                    continue
+                found |= mask
+            masks[sentence] = found
+        return masks
+
+    # Ids of the matching sentences of a `SentenceIndex`, per theme
+    def find_hits(self, document):
+        hits = {theme: array("I") for theme in self.themes}
+        for idx, mask in enumerate(self.match_spans(document)):
+            if mask:
+                for theme in self.themes_of(mask):
+                    hits[theme].append(idx)
+        return hits
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_matcher(subjects_key):
+    return ThemeMatcher(dict(subjects_key))
+
+
+# Matchers are immutable, so one instance per set of themes is shared by every rerun
+def get_matcher(subjects):
+    return _cached_matcher(tuple((theme, tuple(terms)) for theme, terms in subjects.items()))
+
+
+# Proportion of each theme among all the theme hits, as displayed by the comparators
+def theme_proportions(subject_count):
+    total_subjects = sum(subject_count.values())
+    if total_subjects == 0:
+        return {}
+    return {subject: count / total_subjects for subject, count in subject_count.items()}
@@ -0,0 +1,260 @@
+import io
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import PyPDF2
+from PyPDF2 import PdfReader
+
+from diangat.disk_cache import CACHE_ROOT, DiskCache, content_hash
+from diangat.timing import span
+
+PDF_CACHE_BYTES = int(os.environ.get("DIANGAT_PDF_CACHE_MB", "256")) * 1024 * 1024
+PDF_WORKERS = int(os.environ.get("DIANGAT_PDF_WORKERS", os.cpu_count() or 1))
+PAGES_PER_TASK = 8
+PAGE_TIMEOUT = float(os.environ.get("DIANGAT_PAGE_TIMEOUT", "20"))
+
+logger = logging.getLogger(__name__)
+
+# PDF left out of `iter_extract_many` for having too many pages, with its bytes, its cache key
+# and its parsed reader; the reader is None when its pages are already spooled in the cache
+LargePdf = namedtuple("LargePdf", ["data", "key", "reader"])
+
+_page_cache = None
+_executor = None
+
+
+def get_page_cache():
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = DiskCache(CACHE_ROOT / "pdf_pages", PDF_CACHE_BYTES)
+    return _page_cache
+
+
+# Raw bytes of an uploaded file, a file object, a path or bytes
+def read_pdf_bytes(pdf_file):
+    if isinstance(pdf_file, bytes):
+        return pdf_file
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, "rb") as f:
+            return f.read()
+    if hasattr(pdf_file, "getvalue"):
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+
+# The extractor version is part of the key so that an upgrade of PyPDF2 invalidates the cache
+def pdf_cache_key(data):
+    return f"{content_hash(data)}-pypdf2-{PyPDF2.__version__}"
+
+
+# Key of the pages of a large PDF, cached as a spool file rather than as a JSON list
+def spooled_cache_key(key):
+    return f"{key}-spooled"
+
+
+# Text of every page of a PDF, served from the on-disk cache when the same bytes were seen before
+def extract_pages(pdf_file, on_page=None):
+    data = read_pdf_bytes(pdf_file)
+    cache = get_page_cache()
+    key = pdf_cache_key(data)
+
+    cached = cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
+
+    with span("pdf_extraction"):
+        pdf_reader = PdfReader(io.BytesIO(data))
+        total_pages = len(pdf_reader.pages)
+        pages = []
+        for i in range(total_pages):
+            pages.append(pdf_reader.pages[i].extract_text() or "")
+            if on_page is not None:
+                on_page(i + 1, total_pages)
+
+    cache.set(key, json.dumps(pages, ensure_ascii=False).encode("utf-8"))
+    return pages
+
+
+class PageTimeout(Exception):
+    pass
+
+
+def _raise_page_timeout(signum, frame):
+    raise PageTimeout()
+
+
+# Runs in a worker process: text of the pages [start, stop) of a PDF stored at `path`.
+# A page taking more than `page_timeout` seconds is interrupted and left empty.
+def _extract_page_range(path, start, stop, page_timeout):
+    return extract_reader_pages(PdfReader(path), start, stop, page_timeout)
+
+
+# Text of the pages [start, stop) of an open PDF, as `(start, pages, timed out page numbers)`
+def extract_reader_pages(pdf_reader, start, stop, page_timeout=PAGE_TIMEOUT):
+    use_alarm = page_timeout and hasattr(signal, "setitimer")
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_page_timeout)
+    pages = []
+    timed_out = []
+    try:
+        for i in range(start, stop):
+            page = pdf_reader.pages[i]
+            try:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, page_timeout)
+                pages.append(page.extract_text() or "")
+            except PageTimeout:
+                pages.append("")
+                timed_out.append(i)
+            finally:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+    finally:
+        if use_alarm:
+            signal.signal(signal.SIGALRM, previous_handler)
+    return start, pages, timed_out
+
+
+# Process pool kept for the lifetime of the server, so workers are only started once
+def get_executor(max_workers=PDF_WORKERS):
+    global _executor
+    if _executor is None:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        _executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+    return _executor
+
+
+def _reset_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+
+
+# Text of every page of several PDFs, with page ranges of all the files spread over a
+# process pool. Yields `(index, pages)` as soon as every page of a file is extracted, in
+# completion order; a file that cannot be read is yielded with the exception it raised.
+# A file of more than `large_pages` pages is not extracted but yielded as a `LargePdf`.
+def iter_extract_many(
+    pdf_files,
+    max_workers=PDF_WORKERS,
+    pages_per_task=PAGES_PER_TASK,
+    page_timeout=PAGE_TIMEOUT,
+    on_page=None,
+    large_pages=None,
+):
+    cache = get_page_cache()
+    results = {}
+    keys = {}
+    remaining_tasks = {}
+    tasks = []
+
+    with tempfile.TemporaryDirectory(prefix="diangat-pdf-") as tmp_dir:
+        for idx, pdf_file in enumerate(pdf_files):
+            try:
+                data = read_pdf_bytes(pdf_file)
+                keys[idx] = pdf_cache_key(data)
+                cached = cache.get(keys[idx])
+                if cached is not None:
+                    yield idx, json.loads(cached)
+                    continue
+                if large_pages is not None:
+                    spooled = cache.open(spooled_cache_key(keys[idx]))
+                    if spooled is not None:
+                        spooled.close()
+                        yield idx, LargePdf(data, keys[idx], None)
+                        continue
+                pdf_reader = PdfReader(io.BytesIO(data))
+                total_pages = len(pdf_reader.pages)
+                if large_pages is not None and total_pages > large_pages:
+                    yield idx, LargePdf(data, keys[idx], pdf_reader)
+                    continue
+                del pdf_reader
+            except Exception as e:
+                yield idx, e
+                continue
+            if total_pages == 0:
+                yield idx, []
+                continue
+            # Workers read the file from disk instead of receiving the bytes with every task
+            path = os.path.join(tmp_dir, f"{idx}.pdf")
+            with open(path, "wb") as f:
+                f.write(data)
+            results[idx] = [None] * total_pages
+            remaining_tasks[idx] = 0
+            for start in range(0, total_pages, pages_per_task):
+                tasks.append((idx, path, start, min(start + pages_per_task, total_pages)))
+                remaining_tasks[idx] += 1
+
+        total_task_pages = sum(stop - start for _, _, start, stop in tasks)
+        if max_workers <= 1 or total_task_pages <= pages_per_task:
+            completed = (
+                (idx, _run_inline, (path, start, stop, page_timeout))
+                for idx, path, start, stop in tasks
+            )
+        else:
+            executor = get_executor(max_workers)
+            futures = {
+                executor.submit(_extract_page_range, path, start, stop, page_timeout): idx
+                for idx, path, start, stop in tasks
+            }
+            completed = (
+                (futures[future], future.result, ()) for future in as_completed(futures)
+            )
+
+        done_pages = 0
+        incomplete = set()
+        for idx, get_result, args in completed:
+            try:
+                with span("pdf_extraction"):
+                    start, pages, timed_out = get_result(*args)
+            except BrokenProcessPool:
+                _reset_executor()
+                raise
+            except Exception as e:
+                if idx in results:
+                    del results[idx]
+                    yield idx, e
+                continue
+            if idx not in results:
+                continue
+            results[idx][start : start + len(pages)] = pages
+            for page_number in timed_out:
+                logger.warning("Page %d of PDF #%d timed out and was skipped", page_number + 1, idx)
+                incomplete.add(idx)
+            done_pages += len(pages)
+            if on_page is not None:
+                on_page(done_pages, total_task_pages)
+
+            remaining_tasks[idx] -= 1
+            if remaining_tasks[idx] == 0:
+                pages = results.pop(idx)
+                # Files with skipped pages are not cached, so they get another chance next time
+                if idx not in incomplete:
+                    cache.set(keys[idx], json.dumps(pages, ensure_ascii=False).encode("utf-8"))
+                yield idx, pages
+
+
+# Same as `iter_extract_many`, with the results in the order of `pdf_files`
+def extract_many(pdf_files, **kwargs):
+    results = [None] * len(pdf_files)
+    for idx, pages in iter_extract_many(pdf_files, **kwargs):
+        results[idx] = pages
+    return results
+
+
+def _run_inline(path, start, stop, page_timeout):
+    # Signal handlers can only be installed from the main thread
+    if threading.current_thread() is not threading.main_thread():
+        page_timeout = None
+    return _extract_page_range(path, start, stop, page_timeout)
@@ -0,0 +1,121 @@
+import sys
+from collections import namedtuple
+
+from diangat.matcher import get_matcher, theme_proportions
+from diangat.segmentation import SentenceIndex, segment
+
+# Longest unterminated sentence carried from one page to the next before it is cut
+MAX_CARRY_CHARS = 20000
+
+# Snapshot of the analysis after each page
+RunningCounts = namedtuple(
+    "RunningCounts", ["pages", "total_sentences", "subject_count", "proportions"]
+)
+
+
+# Complete sentences of a stream of pages, one `SentenceIndex` per page plus a last one for
+# the end of the document. The last sentence of a page may continue on the next one, so it
+# is segmented again together with the following page; apart from that carry, only the
+# current page is held in memory.
+def iter_page_sentences(pages, language="french", max_carry_chars=MAX_CARRY_CHARS):
+    carry = ""
+    for page in pages:
+        text = f"{carry} {page}" if carry else page
+        document = segment(text, language)
+        carry = ""
+        if len(document):
+            last_sentence = document.sentence(len(document) - 1)
+            if len(last_sentence) <= max_carry_chars:
+                carry = last_sentence
+                document = SentenceIndex(text, document.starts[:-1], document.ends[:-1])
+        yield document
+    yield segment(carry, language)
+
+
+# Sentences of a document that is not held in memory (e.g. spooled pages), segmented again
+# at each iteration instead of being kept
+class StreamedSentences:
+    def __init__(self, pages, language="french"):
+        self.pages = pages
+        self.language = language
+
+    def __iter__(self):
+        return iter_page_sentences(self.pages, self.language)
+
+
+class PageSentences:
+    """Sentences of pages held in memory, kept as offsets into the pages themselves.
+
+    Documents of `iter_page_sentences` are added in order, one per page plus the last one.
+    Only the sentence carried from the previous page is stored besides the offsets: the
+    text of a document is rebuilt from it and its page when the documents are iterated.
+    """
+
+    def __init__(self, pages):
+        self.pages = pages
+        self._documents = []
+
+    def _page(self, idx):
+        return self.pages[idx] if idx < len(self.pages) else ""
+
+    # Keeps the next document, and returns the number of bytes it holds
+    def add(self, document):
+        page = self._page(len(self._documents))
+        # The text of a document ends with its page, after the carried sentence if any
+        prefix = document.text[: len(document.text) - len(page)]
+        self._documents.append((prefix, document.starts, document.ends))
+        offsets = document.starts.itemsize * (len(document.starts) + len(document.ends))
+        return offsets + (sys.getsizeof(prefix) if prefix else 0)
+
+    def __len__(self):
+        return len(self._documents)
+
+    def __iter__(self):
+        for idx, (prefix, starts, ends) in enumerate(self._documents):
+            page = self._page(idx)
+            yield SentenceIndex(prefix + page if prefix else page, starts, ends)
+
+
+# Running theme counts over a stream of pages, yielded after every page and once more at the
+# end of the document. `on_document` receives the sentences of every page, e.g. to keep them.
+def iter_theme_counts(pages, selected_subjects, language="french", on_document=None):
+    matcher = get_matcher(selected_subjects)
+    subject_count = {subject: 0 for subject in selected_subjects}
+    total_sentences = 0
+    pages_done = 0
+
+    def counted_pages():
+        nonlocal pages_done
+        for page in pages:
+            pages_done += 1
+            yield page
+
+    for document in iter_page_sentences(counted_pages(), language):
+        if on_document is not None:
+            on_document(document)
+        for mask in matcher.match_spans(document):
+            for subject in matcher.themes_of(mask):
+                subject_count[subject] += 1
+        total_sentences += len(document)
+        yield RunningCounts(
+            pages_done, total_sentences, dict(subject_count), theme_proportions(subject_count)
+        )
+
+
+# Number of sentences matching each theme over already segmented documents, in one pass
+def count_document_themes(documents, selected_subjects):
+    matcher = get_matcher(selected_subjects)
+    subject_count = {subject: 0 for subject in selected_subjects}
+    for document in documents:
+        for mask in matcher.match_spans(document):
+            for subject in matcher.themes_of(mask):
+                subject_count[subject] += 1
+    return subject_count
+
+
+# Final counts of a stream of pages
+def count_themes(pages, selected_subjects, language="french"):
+    result = None
+    for result in iter_theme_counts(pages, selected_subjects, language):
+        pass
+    return result
@@ -0,0 +1,116 @@
+import time
+
+# At most this many front-end updates per second, each moving the bar by at least MIN_STEP
+FRAME_RATE = 10
+MIN_STEP = 0.01
+
+
+class ProgressReporter:
+    """Progress of a long loop, forwarded to `render(fraction, message)` at a bounded rate.
+
+    The loop reports every item with `update(done, total)` or `advance()`; only the updates
+    that come at least 1 / `frame_rate` seconds after the previous one and move the bar by
+    at least `min_step` are rendered, plus the first and the last. `calls` and `emitted`
+    count the reported and the rendered updates.
+    """
+
+    def __init__(
+        self,
+        render,
+        total=None,
+        label="",
+        frame_rate=FRAME_RATE,
+        min_step=MIN_STEP,
+        clock=time.monotonic,
+    ):
+        self.render = render
+        self.total = total
+        self.label = label
+        self.min_interval = 1 / frame_rate if frame_rate else 0
+        self.min_step = min_step
+        self.clock = clock
+        self.started = clock()
+        self.done = 0
+        self.calls = 0
+        self.emitted = 0
+        self._last_emit = None
+        self._last_fraction = None
+
+    @property
+    def fraction(self):
+        if not self.total:
+            return 0.0
+        return min(1.0, self.done / self.total)
+
+    # Items per second since the reporter was created
+    @property
+    def rate(self):
+        elapsed = self.clock() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    # Seconds left at the current rate, or None while it is unknown
+    @property
+    def eta(self):
+        rate = self.rate
+        if not self.total or not rate:
+            return None
+        return max(0.0, (self.total - self.done) / rate)
+
+    def message(self):
+        parts = [f"{self.done}/{self.total}" if self.total else str(self.done)]
+        if self.done:
+            parts.append(f"{self.rate:.1f}/s")
+        eta = self.eta
+        if eta is not None and self.done < self.total:
+            parts.append(f"ETA {eta:.0f} s")
+        text = " · ".join(parts)
+        return f"{self.label} {text}" if self.label else text
+
+    def update(self, done, total=None):
+        self.calls += 1
+        self.done = done
+        if total is not None:
+            self.total = total
+        now = self.clock()
+        fraction = self.fraction
+        finished = bool(self.total) and done >= self.total
+        if self._last_emit is not None and not finished:
+            if now - self._last_emit < self.min_interval:
+                return False
+            if fraction - self._last_fraction < self.min_step:
+                return False
+        if finished and self._last_fraction == fraction and self._last_emit is not None:
+            return False
+        self._last_emit = now
+        self._last_fraction = fraction
+        self.emitted += 1
+        self.render(fraction, self.message())
+        return True
+
+    def advance(self, count=1):
+        return self.update(self.done + count)
+
+    # Full bar at the end of the loop, even when no item had to be reported (cached results)
+    def finish(self):
+        if self._last_fraction == 1.0:
+            return
+        if not self.total:
+            self.total = self.done
+        self._last_emit = self.clock()
+        self._last_fraction = 1.0
+        self.emitted += 1
+        self.render(1.0, self.message() if self.calls else "")
+
+
+# Reporter drawing a Streamlit progress bar with a caption for the rate and the ETA
+def streamlit_progress(total=None, label="", **kwargs):
+    import streamlit as st
+
+    caption = st.empty()
+    bar = st.progress(0)
+
+    def render(fraction, message):
+        bar.progress(fraction)
+        caption.text(message)
+
+    return ProgressReporter(render, total=total, label=label, **kwargs)
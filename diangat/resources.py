@@ -0,0 +1,174 @@
+"""NLP resources shared by every session of the process.
+
+NLTK data is never downloaded while the apps run: it is looked up in a local directory
+(`DIANGAT_NLTK_DATA`, `nltk_data/` at the root of the repository by default) before NLTK's
+own search path, and `check_nltk_data` only verifies that it is there. It is installed
+once, typically when the image is built, with
+
+    python -m diangat.resources
+
+The Punkt tokenizers, justext stoplists and YAKE extractors are built on first use and
+then shared by all sessions, as Streamlit reruns the scripts in the same process.
+"""
+import argparse
+import functools
+import os
+import threading
+from pathlib import Path
+
+NLTK_DATA_DIR = Path(
+    os.environ.get("DIANGAT_NLTK_DATA", Path(__file__).resolve().parent.parent / "nltk_data")
+)
+
+
+class ResourceMissing(LookupError):
+    pass
+
+
+def _nltk():
+    import nltk
+
+    if str(NLTK_DATA_DIR) not in nltk.data.path:
+        nltk.data.path.insert(0, str(NLTK_DATA_DIR))
+    return nltk
+
+
+# Punkt tokenizer class of NLTK >= 3.8.2, None for the versions loading pickled models
+def _punkt_tokenizer_class():
+    try:
+        from nltk.tokenize import PunktTokenizer
+    except ImportError:
+        return None
+    return PunktTokenizer
+
+
+# NLTK packages the analyses need, as (package name, resource path) pairs
+def nltk_packages():
+    if _punkt_tokenizer_class() is None:
+        return [("punkt", "tokenizers/punkt")]
+    return [("punkt_tab", "tokenizers/punkt_tab")]
+
+
+def missing_nltk_packages():
+    nltk = _nltk()
+    missing = []
+    for package, path in nltk_packages():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            missing.append(package)
+    return missing
+
+
+# Checks the NLTK data once per process, without network access; a failed check is
+# repeated on the next call, so that installing the data does not need a restart
+@functools.lru_cache(maxsize=None)
+def check_nltk_data():
+    missing = missing_nltk_packages()
+    if missing:
+        raise ResourceMissing(
+            f"NLTK data not found: {', '.join(missing)} (looked in {NLTK_DATA_DIR} and the "
+            f"NLTK data path). Install it with `python -m diangat.resources`."
+        )
+    return NLTK_DATA_DIR
+
+
+# Whether the NLTK data is there, for the apps: a missing package is reported in the page
+# rather than raised, and nothing is ever downloaded while they run
+def nltk_data_ready():
+    import streamlit as st
+
+    try:
+        check_nltk_data()
+    except ResourceMissing as e:
+        st.error(str(e))
+        return False
+    return True
+
+
+# Punkt sentence tokenizer of a language
+@functools.lru_cache(maxsize=None)
+def sentence_tokenizer(language="french"):
+    check_nltk_data()
+    punkt_tokenizer = _punkt_tokenizer_class()
+    if punkt_tokenizer is None:
+        return _nltk().data.load(f"tokenizers/punkt/{language}.pickle")
+    return punkt_tokenizer(language)
+
+
+# Lower-cased like justext does, so that justext finds it in its own stoplist cache
+@functools.lru_cache(maxsize=None)
+def justext_stoplist(language="French"):
+    import justext
+
+    return frozenset(word.lower() for word in justext.get_stoplist(language))
+
+
+class SharedKeywordExtractor:
+    """YAKE extractor of one configuration, shared by the sessions.
+
+    YAKE keeps similarity caches on the extractor, so extractions are serialized; they
+    hold the GIL anyway.
+    """
+
+    def __init__(self, extractor):
+        self.extractor = extractor
+        self._lock = threading.Lock()
+
+    def extract_keywords(self, text):
+        with self._lock:
+            return self.extractor.extract_keywords(text)
+
+    # Similarity of two keywords by the deduplication function of the extractor
+    def similarity(self, keyword, other):
+        # Named dedu_function before yake 0.6
+        dedup = getattr(self.extractor, "dedup_function", None) or self.extractor.dedu_function
+        with self._lock:
+            return dedup(keyword, other)
+
+
+@functools.lru_cache(maxsize=None)
+def keyword_extractor(language="french", max_ngram_size=3, deduplication_threshold=0.9, top=20):
+    import yake
+
+    return SharedKeywordExtractor(
+        yake.KeywordExtractor(
+            lan=language,
+            n=max_ngram_size,
+            dedupLim=deduplication_threshold,
+            top=top,
+            features=None,
+        )
+    )
+
+
+# Downloads the missing NLTK packages to `directory`, the only network access of the module
+def install_nltk_data(directory=NLTK_DATA_DIR):
+    nltk = _nltk()
+    directory = Path(directory)
+    if str(directory) not in nltk.data.path:
+        nltk.data.path.insert(0, str(directory))
+    missing = missing_nltk_packages()
+    for package in missing:
+        if not nltk.download(package, download_dir=str(directory), quiet=True):
+            raise ResourceMissing(f"could not download the NLTK package {package}")
+    check_nltk_data.cache_clear()
+    return missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Install the NLTK data of the analyses")
+    parser.add_argument("--dir", default=str(NLTK_DATA_DIR), help="NLTK data directory")
+    parser.add_argument("--check", action="store_true", help="only report missing packages")
+    args = parser.parse_args()
+
+    if args.check:
+        missing = missing_nltk_packages()
+        print(f"missing: {', '.join(missing)}" if missing else "NLTK data is installed")
+        raise SystemExit(1 if missing else 0)
+    installed = install_nltk_data(args.dir)
+    print(f"installed: {', '.join(installed)}" if installed else "NLTK data is installed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+from array import array
+
+from diangat.resources import sentence_tokenizer as get_sentence_tokenizer
+from diangat.timing import span
+
+
+class SentenceIndex:
+    """Sentence boundaries of a text, as two arrays of character offsets.
+
+    Sentences are never copied out of the text: `sentence(i)` slices it on demand,
+    which is only needed to display the occurrences of a theme.
+    """
+
+    def __init__(self, text, starts, ends):
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def sentence(self, idx):
+        return self.text[self.starts[idx] : self.ends[idx]]
+
+    def sentences(self, ids):
+        return [self.sentence(idx) for idx in ids]
+
+
+def segment(text, language="french"):
+    starts = array("I")
+    ends = array("I")
+    with span("segmentation"):
+        for start, end in get_sentence_tokenizer(language).span_tokenize(text):
+            starts.append(start)
+            ends.append(end)
+    return SentenceIndex(text, starts, ends)
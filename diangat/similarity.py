@@ -0,0 +1,60 @@
+import numpy as np
+from scipy import sparse
+
+
+# Sparse document x term matrix of `rows`, one mapping from term to count per document
+def sparse_rows(rows, vocabulary=None):
+    vocabulary = {} if vocabulary is None else vocabulary
+    indptr = [0]
+    indices = []
+    data = []
+    for row in rows:
+        for term, count in row.items():
+            indices.append(vocabulary.setdefault(term, len(vocabulary)))
+            data.append(count)
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), indptr),
+        shape=(len(indptr) - 1, len(vocabulary)),
+    )
+    return matrix, vocabulary
+
+
+# Sublinear TF-IDF weights, so that shared function words weigh less than distinctive terms
+def tfidf(counts):
+    counts = sparse.csr_matrix(counts, dtype=np.float64)
+    document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+    idf = np.log((1 + counts.shape[0]) / (1 + document_frequency)) + 1
+    weights = counts.copy()
+    weights.data = (1 + np.log(weights.data)) * idf[weights.indices]
+    return weights
+
+
+# Cosine similarity of every pair of rows; a row without any weight is similar to nothing
+def cosine_similarity(matrix):
+    matrix = sparse.csr_matrix(matrix, dtype=np.float64)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    normalized = sparse.diags(inverse) @ matrix
+    similarity = (normalized @ normalized.T).toarray()
+    return np.clip(similarity, 0.0, 1.0)
+
+
+# Order of the documents that puts the most similar ones next to each other (average linkage)
+def cluster_order(similarity):
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+
+    if len(similarity) <= 2:
+        return np.arange(len(similarity))
+    distances = squareform(1.0 - similarity, checks=False)
+    return leaves_list(linkage(distances, method="average"))
+
+
+def term_similarity(term_rows):
+    counts, _ = sparse_rows(term_rows)
+    return cosine_similarity(tfidf(counts))
+
+
+def theme_similarity(theme_matrix):
+    return cosine_similarity(sparse.csr_matrix(theme_matrix.proportions()))
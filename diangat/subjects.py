@@ -0,0 +1,244 @@
+# Themes of interest with their synonyms
+selected_subjects = {'Économie': ['économie',
+  'économies',
+  'économies',
+  'finances',
+  'marché',
+  'marchés',
+  'marchés',
+  'croissance',
+  'croissances',
+  'croissances',
+  'investissement étranger',
+  'investissement étrangers',
+  'investissement étrangers',
+  'politique économique',
+  'politique économiques',
+  'politique économiques'],
+ 'Finance': ['finance',
+  'finances',
+  'finances',
+  'investissement',
+  'investissements',
+  'investissements',
+  'banque',
+  'banques',
+  'banques',
+  'budget',
+  'budgets',
+  'budgets',
+  'finances'],
+ 'Gaz': ['gaz naturel',
+  'gaz naturels',
+  'gaz naturels',
+  'énergie fossile',
+  'énergie fossiles',
+  'énergie fossiles',
+  'exploitation gazière',
+  'exploitation gazières',
+  'exploitation gazières',
+  'gazoduc',
+  'gazoducs',
+  'gazoducs'],
+ 'Éducation': ['éducation',
+  'éducations',
+  'éducations',
+  'scolarité',
+  'scolarités',
+  'scolarités',
+  'apprentissage',
+  'apprentissages',
+  'apprentissages',
+  'formation',
+  'formations',
+  'formations'],
+ 'Agriculture': ['agriculture',
+  'agricultures',
+  'agricultures',
+  'cultures',
+  'agroalimentaire',
+  'agroalimentaires',
+  'agroalimentaires',
+  'cultivateurs'],
+ 'Industrialisation': ['industrialisation',
+  'industrialisations',
+  'industrialisations',
+  'manufacture',
+  'manufactures',
+  'manufactures',
+  'production',
+  'productions',
+  'productions',
+  'usine',
+  'usines',
+  'usines'],
+ 'Pêche': ['pêche',
+  'pêches',
+  'pêches',
+  'pisciculture',
+  'piscicultures',
+  'piscicultures',
+  'aquaculture',
+  'aquacultures',
+  'aquacultures',
+  'maritime',
+  'maritimes',
+  'maritimes'],
+ 'Emploi': ['emploi',
+  'emplois',
+  'emplois',
+  'travail',
+  'travails',
+  'travails',
+  'marché du travail',
+  'marché du travails',
+  'marché du travails',
+  'chômage',
+  'chômages',
+  'chômages'],
+ 'Gouvernance': ['gouvernance',
+  'gouvernances',
+  'gouvernances',
+  'administration',
+  'administrations',
+  'administrations',
+  'politique',
+  'politiques',
+  'politiques',
+  'leadership',
+  'leaderships',
+  'leaderships'],
+ 'Transparence': ['transparence',
+  'transparences',
+  'transparences',
+  'responsabilité',
+  'responsabilités',
+  'responsabilités',
+  'ouverture',
+  'ouvertures',
+  'ouvertures',
+  'intégrité',
+  'intégrités',
+  'intégrités'],
+ 'Justice': ['justice',
+  'justices',
+  'justices',
+  'tribunal',
+  'tribunals',
+  'tribunals',
+  'légal',
+  'légals',
+  'légals',
+  'droits'],
+ 'Sécurité': ['sécurité',
+  'sécurités',
+  'sécurités',
+  'défense',
+  'défenses',
+  'défenses',
+  'protection',
+  'protections',
+  'protections',
+  'sûreté',
+  'sûretés',
+  'sûretés'],
+ 'Numérique': ['numérique',
+  'numériques',
+  'numériques',
+  'technologie',
+  'technologies',
+  'technologies',
+  'informatique',
+  'informatiques',
+  'informatiques',
+  'innovation',
+  'innovations',
+  'innovations'],
+ 'Santé': ['santé',
+  'santés',
+  'santés',
+  'soins médicaux',
+  'soins médicauxs',
+  'soins médicauxs',
+  'hôpital',
+  'hôpitals',
+  'hôpitals',
+  'prévention',
+  'préventions',
+  'préventions',
+  'médecine',
+  'médecines',
+  'médecines'],
+ 'Infrastructure': ['infrastructure',
+  'infrastructures',
+  'routes',
+  'ponts',
+  'transports'],
+ 'Environnement': ['environnement',
+  'environnements',
+  'écologie',
+  'écologies',
+  'développement durable',
+  'développement durables',
+  'protection de la nature',
+  'protection de la natures'],
+ 'Énergie': ['énergie',
+  'énergies',
+  'renouvelable',
+  'renouvelables',
+  'solaire',
+  'solaires',
+  'éolienne',
+  'éoliennes',
+  'hydroélectrique',
+  'hydroélectriques'],
+ 'Santé Publique': ['santé publique',
+  'santé publiques',
+  'prévention',
+  'préventions',
+  'vaccination',
+  'vaccinations',
+  'politiques de santé',
+  'politiques de santés'],
+ 'Technologie et Innovation': ['technologie',
+  'technologies',
+  'innovation',
+  'innovations',
+  'startup',
+  'startups',
+  'numérique',
+  'numériques',
+  'futur',
+  'futurs'],
+ 'Culture': ['culture',
+  'cultures',
+  'patrimoine',
+  'patrimoines',
+  'arts',
+  'traditions'],
+ 'Sport': ['sport',
+  'sports',
+  'activités physiques',
+  'infrastructures sportives',
+  'événements sportifs'],
+ 'Tourisme': ['tourisme',
+  'tourismes',
+  'promotion',
+  'promotions',
+  'sites touristiques',
+  'culture et patrimoine',
+  'culture et patrimoines'],
+ 'Politique Sociale': ['politique sociale',
+  'politique sociales',
+  'inclusion',
+  'inclusions',
+  'solidarité',
+  'solidarités',
+  'aide sociale',
+  'aide sociales'],
+ 'Droits Humains': ['droits humains',
+  'libertés fondamentales',
+  'égalité',
+  'égalités',
+  'justice sociale',
+  'justice sociales']}
@@ -0,0 +1,61 @@
+import threading
+from collections import Counter, OrderedDict
+
+from diangat.disk_cache import content_hash
+from diangat.timing import span
+
+# Number of tokenized texts kept in memory by the process
+MAX_CACHED_COUNTERS = 16
+
+_counters = OrderedDict()
+_counters_lock = threading.Lock()
+
+
+class TermCounter:
+    """Occurrences of words and phrases in a text, tokenized once.
+
+    Tokens are the whitespace-separated, lowercased words of the text, as in the historical
+    `text.lower().split().count(word)`. Unigrams are counted up front; the counts of the
+    n-grams of a given length are built the first time a phrase of that length is asked.
+    """
+
+    def __init__(self, text):
+        with span("term_counts"):
+            self.tokens = text.lower().split()
+            self.unigrams = Counter(self.tokens)
+        self._ngrams = {1: self.unigrams}
+
+    def _ngram_counts(self, n):
+        counts = self._ngrams.get(n)
+        if counts is None:
+            with span("term_counts"):
+                counts = Counter(zip(*(self.tokens[i:] for i in range(n))))
+            self._ngrams[n] = counts
+        return counts
+
+    def count(self, term):
+        words = term.lower().split()
+        if not words:
+            return 0
+        if len(words) == 1:
+            return self.unigrams[words[0]]
+        return self._ngram_counts(len(words))[tuple(words)]
+
+    def counts(self, terms):
+        return {term: self.count(term) for term in terms}
+
+
+# Counter of a text, shared by every rerun and widget change showing the same text
+def get_term_counter(text):
+    key = content_hash(text)
+    with _counters_lock:
+        counter = _counters.get(key)
+        if counter is not None:
+            _counters.move_to_end(key)
+            return counter
+    counter = TermCounter(text)
+    with _counters_lock:
+        _counters[key] = counter
+        while len(_counters) > MAX_CACHED_COUNTERS:
+            _counters.popitem(last=False)
+    return counter
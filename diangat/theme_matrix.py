@@ -0,0 +1,44 @@
+import numpy as np
+
+
+class ThemeMatrix:
+    """Number of sentences matching each theme in each document, as a NumPy matrix.
+
+    `counts[i, j]` is the number of sentences of document `i` mentioning theme `j` and
+    `sentences[i]` the number of sentences of document `i`. Proportions, single-theme
+    columns and the heatmap are all computed from these two arrays.
+    """
+
+    def __init__(self, documents, themes, counts, sentences):
+        self.documents = list(documents)
+        self.themes = list(themes)
+        self.counts = np.asarray(counts, dtype=np.int64).reshape(
+            len(self.documents), len(self.themes)
+        )
+        self.sentences = np.asarray(sentences, dtype=np.int64)
+        self._proportions = None
+
+    # All the themes of every indexed document, from the posting lists of the indexes
+    @classmethod
+    def from_indexes(cls, documents, indexes, subjects):
+        counts = np.array(
+            [[index.count_sentences(terms) for terms in subjects.values()] for index in indexes],
+            dtype=np.int64,
+        )
+        sentences = np.array([index.total_sentences for index in indexes], dtype=np.int64)
+        return cls(documents, subjects, counts, sentences)
+
+    # Share of the sentences of each document mentioning each theme; 0 for empty documents
+    def proportions(self):
+        if self._proportions is None:
+            totals = self.sentences[:, np.newaxis]
+            self._proportions = np.divide(
+                self.counts,
+                totals,
+                out=np.zeros(self.counts.shape, dtype=np.float64),
+                where=totals > 0,
+            )
+        return self._proportions
+
+    def theme_proportions(self, theme):
+        return self.proportions()[:, self.themes.index(theme)]
@@ -0,0 +1,160 @@
+"""Per-stage timing and memory instrumentation of an analysis run.
+
+An app calls `start_run` at the top of its script and `finish_run` at the end; the
+library code wraps each stage in `span(name)`, which costs nothing when no run is
+active. With DIANGAT_TIMING_LOG set, every run is appended to that JSON-lines file;
+`python -m diangat.timing LOG` prints latency percentiles per stage. `record_bytes` adds
+the size of what a stage sends to the browser, such as a chart spec, to the same record.
+"""
+import contextvars
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+TIMING_LOG = os.environ.get("DIANGAT_TIMING_LOG")
+
+_current_run = contextvars.ContextVar("diangat_run", default=None)
+
+
+# Resident memory of the process, in bytes
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        # Peak rather than current RSS, in kilobytes on Linux and bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class Run:
+    def __init__(self, app):
+        self.app = app
+        self.timestamp = time.time()
+        self.started = time.perf_counter()
+        self.total_seconds = None
+        # name -> {"calls", "seconds", "rss_delta"[, "bytes"]}; spans of the same name are summed
+        self.stages = {}
+        # Spans may end in the threads an analysis starts, e.g. concurrent downloads
+        self._lock = threading.Lock()
+
+    def _stage(self, name):
+        return self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "rss_delta": 0})
+
+    def add(self, name, seconds, rss_delta):
+        with self._lock:
+            stage = self._stage(name)
+            stage["calls"] += 1
+            stage["seconds"] += seconds
+            stage["rss_delta"] += rss_delta
+
+    def add_bytes(self, name, nbytes):
+        with self._lock:
+            stage = self._stage(name)
+            stage["bytes"] = stage.get("bytes", 0) + nbytes
+
+    def to_record(self):
+        return {
+            "app": self.app,
+            "timestamp": self.timestamp,
+            "total_seconds": self.total_seconds,
+            "rss": _rss_bytes(),
+            "stages": self.stages,
+        }
+
+
+def start_run(app):
+    run = Run(app)
+    _current_run.set(run)
+    return run
+
+
+def finish_run(run, log_path=TIMING_LOG):
+    run.total_seconds = time.perf_counter() - run.started
+    if _current_run.get() is run:
+        _current_run.set(None)
+    if log_path and run.stages:
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(run.to_record(), ensure_ascii=False) + "\n")
+    return run
+
+
+# Time and resident memory growth of a stage of the current run
+@contextmanager
+def span(name):
+    run = _current_run.get()
+    if run is None:
+        yield
+        return
+    rss_before = _rss_bytes()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.add(name, time.perf_counter() - start, _rss_bytes() - rss_before)
+
+
+# Payload of a stage of the current run, e.g. the JSON spec of a chart sent to the browser
+def record_bytes(name, nbytes):
+    run = _current_run.get()
+    if run is not None:
+        run.add_bytes(name, nbytes)
+
+
+# Sidebar panel of the stages of a finished run
+def show_diagnostics(run):
+    import pandas as pd
+    import streamlit as st
+
+    if not run.stages:
+        return
+    with st.sidebar.expander("Diagnostics"):
+        st.write(f"Durée totale : {run.total_seconds:.2f} s")
+        df = pd.DataFrame(
+            [
+                {
+                    "Étape": name,
+                    "Appels": stage["calls"],
+                    "Durée (s)": round(stage["seconds"], 3),
+                    "Mémoire (Mo)": round(stage["rss_delta"] / 2**20, 1),
+                    "Envoyé (ko)": round(stage.get("bytes", 0) / 1024, 1),
+                }
+                for name, stage in sorted(
+                    run.stages.items(), key=lambda item: item[1]["seconds"], reverse=True
+                )
+            ]
+        )
+        st.table(df)
+
+
+def _percentile(sorted_values, fraction):
+    idx = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+# Latency percentiles per app and stage of a timing log
+def summarize(log_path):
+    durations = {}
+    with open(log_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            durations.setdefault((record["app"], "total"), []).append(record["total_seconds"])
+            for name, stage in record["stages"].items():
+                durations.setdefault((record["app"], name), []).append(stage["seconds"])
+    print(f"{'app':<10} {'stage':<18} {'runs':>6} {'p50 (s)':>9} {'p90 (s)':>9} {'p99 (s)':>9}")
+    for (app, name), values in sorted(durations.items()):
+        values.sort()
+        print(
+            f"{app:<10} {name:<18} {len(values):>6} {_percentile(values, 0.5):>9.3f} "
+            f"{_percentile(values, 0.9):>9.3f} {_percentile(values, 0.99):>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    summarize(sys.argv[1] if len(sys.argv) > 1 else TIMING_LOG)
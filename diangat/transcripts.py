@@ -0,0 +1,167 @@
+"""YouTube transcripts: on-disk cache and concurrent analysis of playlists and channels.
+
+Transcripts come from a fetcher, any object with two methods: `video_ids(url)`, the IDs of
+the videos of a video, playlist or channel URL, and `transcript(video_id, languages)`, the
+text of a transcript. `YouTubeFetcher` asks YouTube through pytube and
+youtube_transcript_api; tests and benchmarks pass a local fake instead. A fetched
+transcript is kept in a DiskCache keyed by video ID and languages, so a video is only
+downloaded once however many playlists it appears in.
+"""
+import os
+import re
+from collections import namedtuple
+from functools import partial
+
+from diangat.disk_cache import CACHE_ROOT, DiskCache, content_hash
+from diangat.keywords import extract_keywords
+from diangat.matcher import get_matcher, theme_proportions
+from diangat.segmentation import segment
+from diangat.timing import span
+
+TRANSCRIPT_CACHE_BYTES = int(os.environ.get("DIANGAT_TRANSCRIPT_CACHE_MB", "64")) * 1024 * 1024
+LANGUAGES = ("fr",)
+
+# Transcripts downloaded at the same time; YouTube throttles clients asking for many more
+MAX_CONNECTIONS = 4
+
+_VIDEO_ID = re.compile(r"(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/live/|/v/)([A-Za-z0-9_-]{11})")
+_BARE_VIDEO_ID = re.compile(r"[A-Za-z0-9_-]{11}")
+_CHANNEL_URL = re.compile(r"youtube\.com/(?:@|c/|channel/|user/)")
+
+VideoAnalysis = namedtuple(
+    "VideoAnalysis", ["index", "video_id", "error", "sentences", "subject_count", "keywords"]
+)
+PlaylistCounts = namedtuple(
+    "PlaylistCounts", ["videos", "failed", "total_sentences", "subject_count", "proportions"]
+)
+
+_transcript_cache = None
+_fetcher = None
+
+
+def get_transcript_cache():
+    global _transcript_cache
+    if _transcript_cache is None:
+        _transcript_cache = DiskCache(CACHE_ROOT / "transcripts", TRANSCRIPT_CACHE_BYTES)
+    return _transcript_cache
+
+
+# ID of the video of a watch, short, embed or youtu.be URL, or of a bare ID
+def video_id(url):
+    url = url.strip()
+    if _BARE_VIDEO_ID.fullmatch(url):
+        return url
+    match = _VIDEO_ID.search(url)
+    if match is None:
+        raise ValueError(f"No YouTube video ID in {url!r}")
+    return match.group(1)
+
+
+class YouTubeFetcher:
+    def video_ids(self, url):
+        if "list=" in url:
+            from pytube import Playlist
+
+            return [video_id(video_url) for video_url in Playlist(url).video_urls]
+        if _CHANNEL_URL.search(url):
+            from pytube import Channel
+
+            return [video_id(video_url) for video_url in Channel(url).video_urls]
+        return [video_id(url)]
+
+    def transcript(self, video_id, languages=LANGUAGES):
+        from youtube_transcript_api import YouTubeTranscriptApi
+
+        if hasattr(YouTubeTranscriptApi, "get_transcript"):
+            entries = YouTubeTranscriptApi.get_transcript(video_id, languages=list(languages))
+        else:
+            # youtube_transcript_api >= 1.0 only has instance methods
+            fetched = YouTubeTranscriptApi().fetch(video_id, languages=list(languages))
+            entries = fetched.to_raw_data()
+        return "\n".join(entry["text"] for entry in entries)
+
+
+def get_fetcher():
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = YouTubeFetcher()
+    return _fetcher
+
+
+# Distinct IDs of the videos of a video, playlist or channel URL, in playlist order
+def list_videos(url, fetcher=None):
+    fetcher = fetcher or get_fetcher()
+    with span("transcript"):
+        return list(dict.fromkeys(fetcher.video_ids(url)))
+
+
+# Transcript of a video, downloaded once and then served from the on-disk cache
+def fetch_transcript(video_id, languages=LANGUAGES, fetcher=None, cache=None):
+    cache = get_transcript_cache() if cache is None else cache
+    key = content_hash(f"{video_id}\n{','.join(languages)}")
+    cached = cache.get(key)
+    if cached is not None:
+        return cached.decode("utf-8")
+    fetcher = fetcher or get_fetcher()
+    with span("transcript"):
+        text = fetcher.transcript(video_id, tuple(languages))
+    cache.set(key, text.encode("utf-8"))
+    return text
+
+
+# Number of sentences, theme hits and YAKE keywords of a transcript, run in a worker process
+def transcript_analysis(text, subjects, num_keywords, language="french"):
+    document = segment(text, language)
+    hits = get_matcher(subjects).find_hits(document)
+    keywords = extract_keywords(text, top=num_keywords, language=language) if num_keywords else ()
+    subject_count = {subject: len(sentence_ids) for subject, sentence_ids in hits.items()}
+    return len(document), subject_count, keywords
+
+
+# Analysis of every video of a playlist: at most `max_connections` transcripts are
+# downloaded at a time while the ones received are analysed on `executor`. Each video is
+# yielded as soon as it is analysed, followed by the running theme counts of the playlist.
+def iter_video_analyses(
+    video_ids,
+    subjects,
+    num_keywords=20,
+    languages=LANGUAGES,
+    language="french",
+    max_connections=MAX_CONNECTIONS,
+    executor=None,
+    fetcher=None,
+    cache=None,
+):
+    from diangat.ingest import iter_processed_urls
+
+    subjects = dict(subjects)
+    download = partial(
+        fetch_transcript,
+        languages=tuple(languages),
+        fetcher=fetcher or get_fetcher(),
+        cache=get_transcript_cache() if cache is None else cache,
+    )
+    subject_count = dict.fromkeys(subjects, 0)
+    videos = failed = total_sentences = 0
+    processed = iter_processed_urls(
+        video_ids,
+        transcript_analysis,
+        (subjects, num_keywords, language),
+        max_connections,
+        executor,
+        download=download,
+    )
+    for idx, video, result in processed:
+        if isinstance(result, Exception):
+            failed += 1
+            analysis = VideoAnalysis(idx, video, result, None, None, None)
+        else:
+            videos += 1
+            sentences, counts, keywords = result
+            total_sentences += sentences
+            for subject, count in counts.items():
+                subject_count[subject] += count
+            analysis = VideoAnalysis(idx, video, None, sentences, counts, keywords)
+        yield analysis, PlaylistCounts(
+            videos, failed, total_sentences, dict(subject_count), theme_proportions(subject_count)
+        )
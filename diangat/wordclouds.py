@@ -0,0 +1,79 @@
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from diangat.disk_cache import CACHE_ROOT, DiskCache, content_hash
+from diangat.timing import span
+
+# Width of the main column of a Streamlit page, and pixels rendered per displayed pixel so
+# that the image stays sharp on high density screens
+COLUMN_WIDTH = 704
+PIXEL_RATIO = 2
+ASPECT_RATIO = 2
+
+WORDCLOUD_CACHE_BYTES = int(os.environ.get("DIANGAT_WORDCLOUD_CACHE_MB", "64")) * 1024 * 1024
+MAX_CACHED_WORDCLOUDS = 32
+
+_wordcloud_cache = None
+_png_cache = OrderedDict()
+_png_lock = threading.Lock()
+
+
+def get_wordcloud_cache():
+    global _wordcloud_cache
+    if _wordcloud_cache is None:
+        _wordcloud_cache = DiskCache(CACHE_ROOT / "wordclouds", WORDCLOUD_CACHE_BYTES)
+    return _wordcloud_cache
+
+
+# Rendered size of a word cloud displayed `width` pixels wide
+def wordcloud_size(width=COLUMN_WIDTH):
+    return width * PIXEL_RATIO, width * PIXEL_RATIO // ASPECT_RATIO
+
+
+# Word weights from YAKE scores: the lower the score, the more relevant, hence the bigger
+def keyword_frequencies(keywords):
+    frequencies = {}
+    for keyword, score in keywords:
+        frequencies[keyword] = max(frequencies.get(keyword, 0.0), 1.0 / max(score, 1e-12))
+    return frequencies
+
+
+def render_wordcloud(keywords, width, height):
+    from wordcloud import WordCloud
+
+    wordcloud = WordCloud(
+        width=width, height=height, background_color="white", random_state=0
+    ).generate_from_frequencies(keyword_frequencies(keywords))
+    buffer = io.BytesIO()
+    wordcloud.to_image().save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+# PNG of the word cloud of YAKE keywords, rendered once per list of keywords and size. The
+# key is the keywords and scores themselves, so the same text scored with other extraction
+# parameters gets its own image.
+def wordcloud_png(keywords, size=None):
+    width, height = size or wordcloud_size()
+    weights = json.dumps([[keyword, float(score)] for keyword, score in keywords])
+    key = content_hash(f"{weights}\n{width}x{height}")
+    with _png_lock:
+        png = _png_cache.get(key)
+        if png is not None:
+            _png_cache.move_to_end(key)
+            return png
+
+    cache = get_wordcloud_cache()
+    png = cache.get(key)
+    if png is None:
+        with span("wordcloud"):
+            png = render_wordcloud(keywords, width, height)
+        cache.set(key, png)
+
+    with _png_lock:
+        _png_cache[key] = png
+        while len(_png_cache) > MAX_CACHED_WORDCLOUDS:
+            _png_cache.popitem(last=False)
+    return png
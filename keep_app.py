@@ -1,332 +1,197 @@
-import re
-
-import justext
-import nltk
-import pandas as pd
-import plotly.express as px
-import requests
 import streamlit as st
-from nltk.tokenize import sent_tokenize
-from PyPDF2 import PdfReader
 
-nltk.download("punkt")
-nltk.download("wordnet")
+from diangat.bounded import MemoryCeiling, MemoryLimitExceeded, extract_bounded
+from diangat.charts import draw_chart, proportion_bars
+from diangat.disk_cache import content_hash
+from diangat.graph import ComputationGraph
+from diangat.matcher import get_matcher, theme_proportions
+from diangat.progress import streamlit_progress
+from diangat.resources import nltk_data_ready
+from diangat.pipeline import (
+    PageSentences,
+    StreamedSentences,
+    count_document_themes,
+    iter_theme_counts,
+)
+from diangat.segmentation import segment
+from diangat.subjects import selected_subjects
+from diangat.timing import finish_run, show_diagnostics, start_run
 
 st.set_page_config(
     page_title="Jàngat - App",
     page_icon="https://thumb.ac-illust.com/41/4137d1a06f24fba4ad746d7672551894_t.jpeg",
 )
 
-# Updated selected_subjects
- 
-selected_subjects = {'Économie': ['économie',
-  'économies',
-  'économies',
-  'finances',
-  'marché',
-  'marchés',
-  'marchés',
-  'croissance',
-  'croissances',
-  'croissances',
-  'investissement étranger',
-  'investissement étrangers',
-  'investissement étrangers',
-  'politique économique',
-  'politique économiques',
-  'politique économiques'],
- 'Finance': ['finance',
-  'finances',
-  'finances',
-  'investissement',
-  'investissements',
-  'investissements',
-  'banque',
-  'banques',
-  'banques',
-  'budget',
-  'budgets',
-  'budgets',
-  'finances'],
- 'Gaz': ['gaz naturel',
-  'gaz naturels',
-  'gaz naturels',
-  'énergie fossile',
-  'énergie fossiles',
-  'énergie fossiles',
-  'exploitation gazière',
-  'exploitation gazières',
-  'exploitation gazières',
-  'gazoduc',
-  'gazoducs',
-  'gazoducs'],
- 'Éducation': ['éducation',
-  'éducations',
-  'éducations',
-  'scolarité',
-  'scolarités',
-  'scolarités',
-  'apprentissage',
-  'apprentissages',
-  'apprentissages',
-  'formation',
-  'formations',
-  'formations'],
- 'Agriculture': ['agriculture',
-  'agricultures',
-  'agricultures',
-  'cultures',
-  'agroalimentaire',
-  'agroalimentaires',
-  'agroalimentaires',
-  'cultivateurs'],
- 'Industrialisation': ['industrialisation',
-  'industrialisations',
-  'industrialisations',
-  'manufacture',
-  'manufactures',
-  'manufactures',
-  'production',
-  'productions',
-  'productions',
-  'usine',
-  'usines',
-  'usines'],
- 'Pêche': ['pêche',
-  'pêches',
-  'pêches',
-  'pisciculture',
-  'piscicultures',
-  'piscicultures',
-  'aquaculture',
-  'aquacultures',
-  'aquacultures',
-  'maritime',
-  'maritimes',
-  'maritimes'],
- 'Emploi': ['emploi',
-  'emplois',
-  'emplois',
-  'travail',
-  'travails',
-  'travails',
-  'marché du travail',
-  'marché du travails',
-  'marché du travails',
-  'chômage',
-  'chômages',
-  'chômages'],
- 'Gouvernance': ['gouvernance',
-  'gouvernances',
-  'gouvernances',
-  'administration',
-  'administrations',
-  'administrations',
-  'politique',
-  'politiques',
-  'politiques',
-  'leadership',
-  'leaderships',
-  'leaderships'],
- 'Transparence': ['transparence',
-  'transparences',
-  'transparences',
-  'responsabilité',
-  'responsabilités',
-  'responsabilités',
-  'ouverture',
-  'ouvertures',
-  'ouvertures',
-  'intégrité',
-  'intégrités',
-  'intégrités'],
- 'Justice': ['justice',
-  'justices',
-  'justices',
-  'tribunal',
-  'tribunals',
-  'tribunals',
-  'légal',
-  'légals',
-  'légals',
-  'droits'],
- 'Sécurité': ['sécurité',
-  'sécurités',
-  'sécurités',
-  'défense',
-  'défenses',
-  'défenses',
-  'protection',
-  'protections',
-  'protections',
-  'sûreté',
-  'sûretés',
-  'sûretés'],
- 'Numérique': ['numérique',
-  'numériques',
-  'numériques',
-  'technologie',
-  'technologies',
-  'technologies',
-  'informatique',
-  'informatiques',
-  'informatiques',
-  'innovation',
-  'innovations',
-  'innovations'],
- 'Santé': ['santé',
-  'santés',
-  'santés',
-  'soins médicaux',
-  'soins médicauxs',
-  'soins médicauxs',
-  'hôpital',
-  'hôpitals',
-  'hôpitals',
-  'prévention',
-  'préventions',
-  'préventions',
-  'médecine',
-  'médecines',
-  'médecines'],
- 'Infrastructure': ['infrastructure',
-  'infrastructures',
-  'routes',
-  'ponts',
-  'transports'],
- 'Environnement': ['environnement',
-  'environnements',
-  'écologie',
-  'écologies',
-  'développement durable',
-  'développement durables',
-  'protection de la nature',
-  'protection de la natures'],
- 'Énergie': ['énergie',
-  'énergies',
-  'renouvelable',
-  'renouvelables',
-  'solaire',
-  'solaires',
-  'éolienne',
-  'éoliennes',
-  'hydroélectrique',
-  'hydroélectriques'],
- 'Santé Publique': ['santé publique',
-  'santé publiques',
-  'prévention',
-  'préventions',
-  'vaccination',
-  'vaccinations',
-  'politiques de santé',
-  'politiques de santés'],
- 'Technologie et Innovation': ['technologie',
-  'technologies',
-  'innovation',
-  'innovations',
-  'startup',
-  'startups',
-  'numérique',
-  'numériques',
-  'futur',
-  'futurs'],
- 'Culture': ['culture',
-  'cultures',
-  'patrimoine',
-  'patrimoines',
-  'arts',
-  'traditions'],
- 'Sport': ['sport',
-  'sports',
-  'activités physiques',
-  'infrastructures sportives',
-  'événements sportifs'],
- 'Tourisme': ['tourisme',
-  'tourismes',
-  'promotion',
-  'promotions',
-  'sites touristiques',
-  'culture et patrimoine',
-  'culture et patrimoines'],
- 'Politique Sociale': ['politique sociale',
-  'politique sociales',
-  'inclusion',
-  'inclusions',
-  'solidarité',
-  'solidarités',
-  'aide sociale',
-  'aide sociales'],
- 'Droits Humains': ['droits humains',
-  'libertés fondamentales',
-  'égalité',
-  'égalités',
-  'justice sociale',
-  'justice sociales']}
+CHART_REFRESH_PAGES = 10
+
+# Timing of the stages of this rerun, shown in the sidebar at the end of the script
+run = start_run("keep_app")
 
 
 # Function to scrape content from URL
 def scrape_content_url(url):
+    from diangat.fetch import fetch_article_text
+
     try:
-        response = requests.get(url)
-        paragraphs = justext.justext(response.content, justext.get_stoplist("French"))
-        scraped_content = [
-            paragraph.text for paragraph in paragraphs if not paragraph.is_boilerplate
-        ]
-        content_text = " ".join(scraped_content)
+        content_text = fetch_article_text(url)
         return content_text
     except Exception as e:
         st.error(f"Error scraping content: {str(e)}")
         return None
 
 
-# Function to scrape content from PDF
-def scrape_content_pdf(pdf_file):
+# Function to scrape content from several PDFs, with the pages spread over the CPU cores.
+# Very large PDFs are rather spilled to disk a chunk of pages at a time, under `ceiling`.
+def scrape_contents_pdf(pdf_files, ceiling):
     try:
-        pdf_reader = PdfReader(pdf_file)
-        total_pages = len(pdf_reader.pages)
-        extracted_text = [pdf_reader.pages[i].extract_text() for i in range(total_pages)]
-        content_text = " ".join(extracted_text)
-        st.info(
-            f"Nombre de pages dans le document '{pdf_file.name.replace('.pdf', '')}': {total_pages}"
-        )
-        return content_text
+        progress = streamlit_progress(label="Pages extraites :")
+        extracted_texts = extract_bounded(pdf_files, ceiling, on_page=progress.update)
+        progress.finish()
     except Exception as e:
         st.error(f"Error extracting text from PDF: {str(e)}")
-        return None
+        return [None] * len(pdf_files)
+    contents = []
+    for extracted_text in extracted_texts:
+        if isinstance(extracted_text, Exception):
+            st.error(f"Error extracting text from PDF: {str(extracted_text)}")
+            contents.append(None)
+            continue
+        contents.append(extracted_text)
+    return contents
+
+
+# Nodes of the document of an upload, from its content to its chart
+def discard_document(graph, idx):
+    for stage in ("upload", "pages", "sentences", "hits", "chart"):
+        graph.discard(f"{stage}:{idx}")
+
+
+# Drops the nodes of the uploads removed since the previous run, and of those whose content
+# changed when their `keys` are given, so that the session does not keep their pages
+def discard_uploads(graph, count, keys=None):
+    for name in list(graph.store):
+        if name.startswith("upload:"):
+            idx = int(name[len("upload:") :])
+            if idx >= count or (keys is not None and graph.get(name, key=keys[idx]) is None):
+                discard_document(graph, idx)
+
+
+# Pages of the uploaded PDFs as graph nodes. Only the uploads whose content changed since the
+# previous analysis are extracted; a failed extraction is None.
+def pdf_page_nodes(graph, pdf_files, ceiling):
+    keys = [content_hash(pdf_file.getvalue()) for pdf_file in pdf_files]
+    discard_uploads(graph, len(keys), keys)
+
+    uploads = []
+    for idx, (pdf_file, key) in enumerate(zip(pdf_files, keys)):
+        name = f"upload:{idx}"
+        uploads.append(graph.get(name, key=key) or graph.set(name, pdf_file.name, key=key))
+
+    stale = [
+        idx for idx, upload in enumerate(uploads) if graph.get(f"pages:{idx}", (upload,)) is None
+    ]
+    if stale:
+        contents = scrape_contents_pdf([pdf_files[idx] for idx in stale], ceiling)
+        for idx, pages in zip(stale, contents):
+            if pages:
+                graph.set(f"pages:{idx}", pages, (uploads[idx],))
+    return [graph.get(f"pages:{idx}", (upload,)) for idx, upload in enumerate(uploads)]
+
+
+# Theme chart of one document through the graph: pages -> sentences -> hits per theme ->
+# chart. The first analysis segments and matches in one pass, the chart following the
+# running counts; afterwards only the themes never matched before go through the matcher.
+def draw_document_themes(graph, idx, pages_node, subjects, container, title, ceiling):
+    sentences = graph.get(f"sentences:{idx}", (pages_node,))
+    drawn = None
+    if sentences is None:
+        pages = pages_node.value
+        # Pages held in memory keep their sentences as offsets, without a copy of the text
+        documents = PageSentences(pages) if isinstance(pages, list) else None
+        counts = None
+
+        def keep_document(document):
+            ceiling.hold(documents.add(document))
+
+        on_document = keep_document if documents is not None else None
+        for counts in iter_theme_counts(pages, subjects, on_document=on_document):
+            if counts.pages % CHART_REFRESH_PAGES == 0 and counts.proportions != drawn:
+                draw_proportions(container, counts.proportions, title, use_container_width=True)
+                drawn = counts.proportions
+        if documents is None:
+            # Spooled pages stay on disk and are segmented again if a theme is added
+            documents = StreamedSentences(pages)
+        sentences = graph.set(f"sentences:{idx}", documents, (pages_node,))
+        for subject, terms in subjects.items():
+            graph.set(
+                f"hits:{idx}:{subject}", counts.subject_count[subject], (sentences,), tuple(terms)
+            )
+
+    hits = {}
+    missing = {}
+    for subject, terms in subjects.items():
+        node = graph.get(f"hits:{idx}:{subject}", (sentences,), tuple(terms))
+        if node is None:
+            missing[subject] = terms
+        else:
+            hits[subject] = node
+    if missing:
+        for subject, count in count_document_themes(sentences.value, missing).items():
+            hits[subject] = graph.set(
+                f"hits:{idx}:{subject}", count, (sentences,), tuple(missing[subject])
+            )
+
+    hit_nodes = [hits[subject] for subject in subjects]
+    chart = graph.node(
+        f"chart:{idx}",
+        lambda *counts: theme_proportions(dict(zip(subjects, counts))),
+        hit_nodes,
+        key=tuple(subjects),
+    )
+    # The running chart may already show the final counts
+    if chart.value != drawn:
+        draw_proportions(container, chart.value, title, use_container_width=True)
 
 
-# Updated function to find subject occurrences in text
+# Updated function to find subject occurrences in text. The occurrences are the ids of the
+# matching sentences, to be read back from the returned sentence index.
 def find_subject_occurrences(text, selected_subjects):
-    occurrences = {subject: set() for subject in selected_subjects.keys()}
-    subject_count = {subject: 0 for subject in selected_subjects.keys()}
-
-    sentences = sent_tokenize(text)
-
-    for subject, synonyms in selected_subjects.items():
-        pattern = re.compile(
-            r"\b(?:{})\b".format("|".join(map(re.escape, synonyms))), re.IGNORECASE
-        )
-        for sentence in sentences:
-            if re.search(pattern, sentence):
-                occurrences[subject].add(sentence)
-                subject_count[subject] += 1
-
-    total_subjects = sum(subject_count.values())
+    document = segment(text)
+    occurrences = get_matcher(selected_subjects).find_hits(document)
+    subject_count = {subject: len(sentence_ids) for subject, sentence_ids in occurrences.items()}
+
+    proportions_count = theme_proportions(subject_count)
+
+    return document, occurrences, proportions_count
+
+
+# Horizontal bar chart of the proportion of each theme
+def plot_proportions(result_count_proportions, title):
+    return proportion_bars(
+        list(result_count_proportions),
+        list(result_count_proportions.values()),
+        title,
+        orientation="h",
+        label_title="Thématiques",
+        value_title="Proportions (%)",
+        width=800,
+        height=600,
+    )
 
-    proportions_count = {}
-    if total_subjects != 0:
-        proportions_count = {
-            subject: count / total_subjects for subject, count in subject_count.items()
-        }
 
-    return occurrences, proportions_count
+# Draws the chart in `container`; the figure of given proportions is only built once
+def draw_proportions(container, result_count_proportions, title, **kwargs):
+    draw_chart(container, plot_proportions(result_count_proportions, title), **kwargs)
 
 
 # Streamlit app
 st.title("Comparateur de programmes")
 st.write("Analyse thématique des propositions des candidats aux élections présidentielles")
 
-option = st.sidebar.radio("Choisir une source de données:", ("Article web : URL", "Document PDF"))
+option = st.sidebar.radio(
+    "Choisir une source de données:",
+    ("Article web : URL", "Articles web : liste d'URL", "Document PDF"),
+)
 
 selected_subjects_list = list(selected_subjects.keys())
 # Adding the "Select all" checkbox
@@ -343,11 +208,15 @@ else:
 
 if option == "Article web : URL":
     url = st.text_input("Enter URL:")
-    if st.button("Scrape"):
+    if st.button("Scrape") and nltk_data_ready():
         sample_text = scrape_content_url(url)
         if sample_text:
             try:
-                result_occurrences, result_count_proportions = find_subject_occurrences(
+                (
+                    document,
+                    result_occurrences,
+                    result_count_proportions,
+                ) = find_subject_occurrences(
                     sample_text,
                     {
                         subject: selected_subjects[subject]
@@ -356,9 +225,9 @@ if option == "Article web : URL":
                 )
 
                 # Display occurrences
-                for subject, sentences in result_occurrences.items():
+                for subject, sentence_ids in result_occurrences.items():
                     st.subheader(f"Occurrences de '{subject}':")
-                    for sentence in sentences:
+                    for sentence in dict.fromkeys(document.sentences(sentence_ids)):
                         st.write(f"'{sentence}'")
 
                 # Display proportions
@@ -366,89 +235,100 @@ if option == "Article web : URL":
                     st.write(f"Proportion de '{subject}': {proportion:.2%}")
 
                 # Plotting
-                proportions_df = pd.DataFrame(
-                    result_count_proportions.items(), columns=["Thématiques", "Proportions"]
+                draw_proportions(
+                    st,
+                    result_count_proportions,
+                    "Proportion de thématiques liées au développement dans le programme du candidat",
                 )
-                fig = px.bar(
-                    proportions_df,
-                    x="Proportions",
-                    y="Thématiques",
-                    orientation="h",
-                    text=proportions_df["Proportions"].apply(lambda x: f"{x:.2%}"),
-                    labels={"Proportions": "Proportions (%)", "Thématiques": "Thématiques"},
-                    title="Proportion de thématiques liées au développement dans le programme du candidat",
-                    color=proportions_df["Proportions"],
-                    color_continuous_scale=px.colors.qualitative.Safe,
-                    width=800,
-                    height=600,
-                )
-                st.plotly_chart(fig)
 
             except ZeroDivisionError:
                 st.error("Une division par zéro s'est produite lors du calcul de la proportion.")
         else:
             st.warning("Échec de récupération du contenu depuis l'URL.")
 
+elif option == "Articles web : liste d'URL":
+    urls_text = st.text_area("Une URL par ligne :")
+    urls = list(dict.fromkeys(line.strip() for line in urls_text.splitlines() if line.strip()))
+    if st.button("Analyser les articles") and nltk_data_ready():
+        if urls:
+            from diangat.ingest import iter_url_theme_counts
+
+            subjects = {
+                subject: selected_subjects[subject] for subject in selected_subjects_multiselect
+            }
+            progress = streamlit_progress(len(urls), label="Articles analysés :")
+            chart = st.empty()
+            rows = []
+            title = f"Proportion de thématiques sur {len(urls)} articles"
+
+            # Articles are downloaded concurrently; the aggregate follows each arrival and
+            # the chart is redrawn whenever it changes
+            drawn = None
+            for article, aggregate in iter_url_theme_counts(urls, subjects):
+                if article.error is not None:
+                    st.error(f"Error scraping content from {article.url}: {str(article.error)}")
+                else:
+                    rows.append(dict(article.subject_count, URL=article.url))
+                progress.advance()
+                if aggregate.proportions and aggregate.proportions != drawn:
+                    draw_proportions(chart, aggregate.proportions, title)
+                    drawn = aggregate.proportions
+
+            if rows:
+                import pandas as pd
+
+                st.dataframe(pd.DataFrame(rows).set_index("URL"))
+            else:
+                st.warning("Échec de récupération du contenu depuis les URL.")
+        else:
+            st.warning("Veuillez saisir au moins une URL.")
+
 elif option == "Document PDF":
+    # Results of the previous analyses of the session, reused by the next click as long as
+    # their inputs did not change
+    if "analysis_graph" not in st.session_state:
+        st.session_state["analysis_graph"] = {}
+    graph = ComputationGraph(st.session_state["analysis_graph"])
+
     pdf_files = st.file_uploader(
         "Charger deux fichers PDF", type=["pdf"], accept_multiple_files=True
     )
     pdf_files_names = [pdf_file.name for pdf_file in pdf_files]
-    if st.button("Analyser"):
+    discard_uploads(graph, len(pdf_files))
+    if st.button("Analyser") and nltk_data_ready():
         if pdf_files is not None and len(pdf_files) == 2:
-            sample_texts = [scrape_content_pdf(pdf_file) for pdf_file in pdf_files]
-            if all(sample_texts):
+            # Memory the whole analysis of the two documents may add to the process
+            ceiling = MemoryCeiling()
+            page_nodes = pdf_page_nodes(graph, pdf_files, ceiling)
+            if all(page_nodes):
                 try:
                     col1, col2 = st.columns(2)
+                    subjects = {
+                        subject: selected_subjects[subject]
+                        for subject in selected_subjects_multiselect
+                    }
 
-                    for idx, sample_text in enumerate(sample_texts):
+                    for idx, pages_node in enumerate(page_nodes):
                         with col1 if idx == 0 else col2:
-                            (
-                                result_occurrences,
-                                result_count_proportions,
-                            ) = find_subject_occurrences(
-                                sample_text,
-                                {
-                                    subject: selected_subjects[subject]
-                                    for subject in selected_subjects_multiselect
-                                },
-                            )
-
-                            # Display proportions
-                            proportions_df = pd.DataFrame(
-                                result_count_proportions.items(),
-                                columns=["Thématiques", "Proportions"],
+                            title = pdf_files_names[idx].replace(".pdf", "")  # Remove '.pdf'
+                            st.info(
+                                f"Nombre de pages dans le document '{title}': "
+                                f"{len(pages_node.value)}"
                             )
-
-                            # Plotting
-                            fig = px.bar(
-                                proportions_df,
-                                x="Proportions",
-                                y="Thématiques",
-                                orientation="h",
-                                text=proportions_df["Proportions"].apply(lambda x: f"{x:.2%}"),
-                                labels={
-                                    "Proportions": "Proportions (%)",
-                                    "Thématiques": "Thématiques",
-                                },
-                                title=pdf_files_names[idx].replace(
-                                    ".pdf", ""
-                                ),  # Remove '.pdf' from title
-                                color=proportions_df["Proportions"],
-                                color_continuous_scale=px.colors.qualitative.Safe,
-                                width=800,
-                                height=600,
+                            chart = st.empty()
+                            draw_document_themes(
+                                graph, idx, pages_node, subjects, chart, title, ceiling
                             )
 
-                            st.plotly_chart(
-                                fig, use_container_width=True
-                            )  # Set use_container_width to True
-
                 except ZeroDivisionError:
                     st.error(
                         "Une division par zéro s'est produite lors du calcul de la proportion."
                     )
+                except MemoryLimitExceeded as e:
+                    st.error(f"Analyse interrompue, mémoire insuffisante : {str(e)}")
             else:
                 st.warning("Échec de récupération du contenu depuis l'un des fichiers PDF.")
         else:
             st.warning("Veuillez télécharger exactement deux fichiers PDF.")
+
+show_diagnostics(finish_run(run))
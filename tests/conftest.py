@@ -0,0 +1,35 @@
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from diangat.disk_cache import DiskCache
+
+
+class ConcurrencyRecorder:
+    """Calls made to a fake backend from several threads, and how many of them overlapped."""
+
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    # Records a call for the duration of the block, which gets the number of calls so far
+    @contextmanager
+    def call(self, *args):
+        with self._lock:
+            self.calls.append(args)
+            calls = len(self.calls)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            yield calls
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DiskCache(tmp_path / "cache", max_bytes=1 << 30)
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from diangat import batch
+from diangat.batch import checkpoint_path, load_checkpoint, run, run_params
+
+TEXTS = {
+    "agriculture.txt": "L'agriculture et la pêche d'abord. Les cultivateurs seront aidés.",
+    "education.txt": "L'éducation et la formation des jeunes. La santé publique sera renforcée.",
+}
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    sources = []
+    for name, text in TEXTS.items():
+        path = tmp_path / name
+        path.write_text(text, encoding="utf-8")
+        sources.append(str(path))
+    return sources
+
+
+def checkpoint_lines(output):
+    with open(checkpoint_path(output), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_checkpoint_starts_with_the_run_parameters(corpus, tmp_path):
+    output = tmp_path / "results.csv"
+    run(corpus, output, workers=1, num_keywords=0)
+    header, *records = checkpoint_lines(output)
+    assert header == {"params": run_params(0, "french")}
+    assert sorted(record["document"] for record in records) == corpus
+    assert len(load_checkpoint(checkpoint_path(output), run_params(0, "french"))) == 2
+
+
+def test_records_of_other_parameters_are_ignored(corpus, tmp_path):
+    output = tmp_path / "results.csv"
+    run(corpus, output, workers=1, num_keywords=0)
+    assert load_checkpoint(checkpoint_path(output), run_params(3, "french")) == {}
+
+    records = run(corpus, output, workers=1, num_keywords=3)
+    assert all(record["keywords"] for record in records.values())
+    header, *lines = checkpoint_lines(output)
+    assert header == {"params": run_params(3, "french")}
+    assert len(lines) == 2
+
+
+def test_checkpoint_without_parameters_is_ignored(corpus, tmp_path):
+    path = checkpoint_path(tmp_path / "results.csv")
+    path.write_text(json.dumps({"document": corpus[0], "error": None}) + "\n", encoding="utf-8")
+    assert load_checkpoint(path, run_params(0, "french")) == {}
+
+
+def test_checkpoint_depends_on_the_themes(monkeypatch):
+    params = run_params(10, "french")
+    monkeypatch.setattr(batch, "selected_subjects", {"Santé": ["santé"]})
+    assert run_params(10, "french") != params
+
+
+def test_keywords_are_extracted_in_the_language_of_the_run(corpus, monkeypatch):
+    from diangat import keywords
+
+    languages = []
+
+    def extract_keywords(text, top, language):
+        languages.append(language)
+        return [("programme", 0.1)]
+
+    monkeypatch.setattr(keywords, "extract_keywords", extract_keywords)
+    record = batch.analyse_source(corpus[0], 5, "english")
+    assert record["error"] is None
+    assert record["keywords"] == "programme"
+    assert languages == ["english"]
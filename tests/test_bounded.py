@@ -0,0 +1,121 @@
+import sys
+
+import pytest
+
+from collections import OrderedDict
+
+from diangat import bounded, index, pdf_text
+from diangat.bounded import (
+    MemoryCeiling,
+    MemoryLimitExceeded,
+    extract_bounded,
+    spool_pdf_pages,
+)
+from diangat.index import DocumentIndex, iter_pdf_indexes
+from diangat.pdf_text import extract_pages
+
+from benchmarks.synthetic import make_pages, make_pdf
+
+
+@pytest.fixture(autouse=True)
+def page_cache(cache, monkeypatch):
+    monkeypatch.setattr(pdf_text, "_page_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "programme.pdf"
+    path.write_bytes(make_pdf(make_pages(40)))
+    return path
+
+
+def test_spooled_pages_match_extraction(pdf):
+    with spool_pdf_pages(pdf, chunk_pages=8, max_workers=1) as pages:
+        assert list(pages) == extract_pages(pdf)
+
+
+def test_chunks_are_extracted_on_the_pool_in_page_order(pdf, monkeypatch):
+    def no_extraction(*args):
+        raise AssertionError("the PDF was extracted on the calling thread")
+
+    monkeypatch.setattr(bounded, "extract_reader_pages", no_extraction)
+    ceiling = MemoryCeiling(max_bytes=None)
+    with spool_pdf_pages(pdf, chunk_pages=4, ceiling=ceiling, max_workers=2) as pages:
+        assert list(pages) == extract_pages(pdf)
+        text_bytes = sum(sys.getsizeof(page) for page in pages)
+    # 4 chunks of 4 pages in flight at most, out of 10
+    assert 0 < ceiling.peak < text_bytes * 0.6
+
+
+def test_spooled_pages_are_cached(pdf, monkeypatch):
+    with spool_pdf_pages(pdf, chunk_pages=8, max_workers=1) as pages:
+        expected = list(pages)
+
+    def no_extraction(*args):
+        raise AssertionError("the PDF was extracted again")
+
+    monkeypatch.setattr(bounded, "extract_reader_pages", no_extraction)
+    with spool_pdf_pages(pdf, chunk_pages=8) as pages:
+        assert list(pages) == expected
+
+
+def test_large_pdf_is_parsed_once(pdf, monkeypatch):
+    readers = []
+    real_reader = pdf_text.PdfReader
+
+    def counting_reader(*args, **kwargs):
+        readers.append(args)
+        return real_reader(*args, **kwargs)
+
+    monkeypatch.setattr(pdf_text, "PdfReader", counting_reader)
+    monkeypatch.setattr(bounded, "PdfReader", counting_reader)
+    ceiling = MemoryCeiling()
+    [pages] = extract_bounded([pdf], ceiling, bounded_pages=10)
+    assert isinstance(pages, bounded.SpooledPages)
+    assert len(pages) == 40
+    assert len(readers) == 1
+    pages.close()
+
+
+def test_small_pdf_is_not_spooled(pdf):
+    [pages] = extract_bounded([pdf], MemoryCeiling(), bounded_pages=100)
+    assert pages == extract_pages(pdf)
+
+
+def test_ceiling_counts_what_the_analysis_holds(pdf):
+    ceiling = MemoryCeiling(max_bytes=None)
+    with spool_pdf_pages(pdf, chunk_pages=8, ceiling=ceiling, max_workers=1) as pages:
+        # Chunks are released once spilled: only the page offsets stay
+        assert ceiling.used == pages.offsets.itemsize * len(pages)
+        text_bytes = sum(len(page.encode("utf-8")) for page in pages)
+    # At most one chunk of 8 pages was held at a time
+    assert 0 < ceiling.peak < text_bytes / 2
+
+
+def test_ceiling_aborts_the_analysis(pdf):
+    with pytest.raises(MemoryLimitExceeded):
+        spool_pdf_pages(
+            pdf, chunk_pages=8, ceiling=MemoryCeiling(max_bytes=1024), max_workers=1
+        )
+
+
+def test_indexes_of_an_analysis_share_the_ceiling(pdf, tmp_path, monkeypatch):
+    monkeypatch.setattr(index, "_indexes", OrderedDict())
+    small = tmp_path / "small.pdf"
+    small.write_bytes(make_pdf(make_pages(5)))
+    ceiling = MemoryCeiling(max_bytes=None)
+    results = dict(iter_pdf_indexes([pdf, small], bounded_pages=10, ceiling=ceiling, max_workers=1))
+    assert all(isinstance(result, DocumentIndex) for result in results.values())
+
+    index._indexes.clear()
+    alone = MemoryCeiling(max_bytes=None)
+    list(iter_pdf_indexes([pdf], bounded_pages=10, ceiling=alone, max_workers=1))
+    assert ceiling.used > alone.used > 0
+
+
+def test_ceiling_aborts_the_indexing_of_small_pdfs(pdf, monkeypatch):
+    monkeypatch.setattr(index, "_indexes", OrderedDict())
+    ceiling = MemoryCeiling(max_bytes=1024)
+    [(_, result)] = iter_pdf_indexes([pdf], bounded_pages=100, ceiling=ceiling, max_workers=1)
+    assert isinstance(result, MemoryLimitExceeded)
@@ -0,0 +1,109 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from diangat.fetch import ResponseTooLarge, fetch_url
+
+BODY = "<html><body><p>Le programme agricole du Sénégal.</p></body></html>".encode("utf-8")
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, body, headers=(), length=True):
+        self.send_response(200)
+        if length:
+            self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        if self.path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+            else:
+                self.send_body(BODY, [("ETag", '"v1"')])
+        elif self.path == "/max-age":
+            self.send_body(BODY, [("Cache-Control", "max-age=300")])
+        elif self.path == "/no-store":
+            self.send_body(BODY, [("Cache-Control", "no-store"), ("ETag", '"v1"')])
+        elif self.path == "/large":
+            self.send_body(b"x" * 4096)
+        elif self.path == "/large-unsized":
+            self.send_response(200)
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(b"x" * 4096)
+            self.close_connection = True
+        elif self.path == "/trickle":
+            self.send_response(200)
+            self.send_header("Content-Length", "1000")
+            self.end_headers()
+            for _ in range(1000):
+                try:
+                    self.wfile.write(b"x")
+                    self.wfile.flush()
+                except OSError:
+                    return
+                time.sleep(0.1)
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_port}{path}"
+
+
+def test_etag_is_revalidated(server, cache):
+    assert fetch_url(url(server, "/etag"), cache=cache) == BODY
+    assert fetch_url(url(server, "/etag"), cache=cache) == BODY
+    assert len(server.requests) == 2
+    assert "If-None-Match" not in server.requests[0][1]
+    assert server.requests[1][1]["If-None-Match"] == '"v1"'
+
+
+def test_fresh_response_is_reused(server, cache):
+    assert fetch_url(url(server, "/max-age"), cache=cache) == BODY
+    assert fetch_url(url(server, "/max-age"), cache=cache) == BODY
+    assert len(server.requests) == 1
+
+
+def test_no_store_is_not_cached(server, cache):
+    fetch_url(url(server, "/no-store"), cache=cache)
+    fetch_url(url(server, "/no-store"), cache=cache)
+    assert len(server.requests) == 2
+    assert "If-None-Match" not in server.requests[1][1]
+
+
+@pytest.mark.parametrize("path", ["/large", "/large-unsized"])
+def test_size_cap(server, cache, path):
+    with pytest.raises(ResponseTooLarge):
+        fetch_url(url(server, path), max_bytes=1024, cache=cache)
+
+
+def test_deadline_stops_a_trickling_server(server, cache):
+    start = time.monotonic()
+    # Every byte comes well within the read timeout, the whole body would take 100 s
+    with pytest.raises(requests.Timeout):
+        fetch_url(url(server, "/trickle"), timeout=(5, 5), deadline=0.5, cache=cache)
+    assert time.monotonic() - start < 2
@@ -0,0 +1,22 @@
+from diangat.graph import ComputationGraph
+
+
+def test_unchanged_nodes_are_reused():
+    graph = ComputationGraph({})
+    calls = []
+    upload = graph.set("upload:0", "programme.pdf", key="hash")
+    pages = graph.node("pages:0", lambda name: calls.append(name) or [name], (upload,))
+    assert graph.node("pages:0", lambda name: calls.append(name), (upload,)) == pages
+    assert calls == ["programme.pdf"]
+
+    upload = graph.set("upload:0", "programme.pdf", key="other hash")
+    assert graph.get("pages:0", (upload,)) is None
+
+
+def test_discard_drops_a_node_and_those_under_it():
+    graph = ComputationGraph({})
+    for name in ["pages:1", "pages:10", "hits:1:Santé", "hits:1:Pêche", "hits:10:Santé"]:
+        graph.set(name, 0)
+    graph.discard("pages:1")
+    graph.discard("hits:1")
+    assert sorted(graph.store) == ["hits:10:Santé", "pages:10"]
@@ -0,0 +1,37 @@
+from diangat.index import DocumentIndex
+from diangat.matcher import ThemeMatcher
+from diangat.segmentation import segment
+from diangat.subjects import selected_subjects
+
+from benchmarks.synthetic import make_pages
+
+# Synonyms across a page break, in capitals and as parts of longer words
+EDGE_PAGES = [
+    "L'ÉDUCATION et la Formation professionnelle. Les usines",
+    "agricoles et la pêche2024. La santé publique d'abord.",
+    "",
+    "Rien à signaler ici",
+]
+
+
+def test_theme_counts_match_the_matcher():
+    for pages in [EDGE_PAGES, make_pages(6)]:
+        index = DocumentIndex.build(pages)
+        document = segment(" ".join(pages))
+        hits = ThemeMatcher(selected_subjects).find_hits(document)
+        assert index.total_sentences == len(document)
+        assert index.theme_counts(selected_subjects) == {
+            theme: len(sentence_ids) for theme, sentence_ids in hits.items()
+        }
+        assert sum(len(sentence_ids) for sentence_ids in hits.values()) > 0
+
+
+def test_postings_of_phrases():
+    index = DocumentIndex.build(EDGE_PAGES)
+    # Phrases of the vocabulary are exact, other phrases have all of their words
+    assert list(index.postings("Formation professionnelle")) == [0]
+    assert list(index.postings("santé publique")) == [2]
+    assert list(index.postings("publique santé")) == [2]
+    assert list(index.postings("signaler")) == [3]
+    assert list(index.postings("...")) == []
+    assert index.term_counts()["la"] == 3
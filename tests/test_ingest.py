@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from diangat.ingest import iter_processed_urls
+from diangat.timing import finish_run, span, start_run
+
+
+def download(url):
+    with span("fetch"):
+        return url.upper()
+
+
+def test_every_item_is_processed_once():
+    urls = [f"https://example.org/{idx}" for idx in range(10)]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(iter_processed_urls(urls, len, (), 3, executor, download=download))
+    assert sorted(idx for idx, _, _ in results) == list(range(10))
+    assert all(result == len(url) for _, url, result in results)
+
+
+def test_failed_item_comes_with_its_exception():
+    def failing(url):
+        raise LookupError(url)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        [(idx, url, result)] = iter_processed_urls(["a"], len, (), 1, executor, download=failing)
+    assert (idx, url) == (0, "a")
+    assert isinstance(result, LookupError)
+
+
+def test_spans_of_the_threads_go_to_the_run():
+    run = start_run("test")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(iter_processed_urls(["a", "b", "c"], len, (), 2, executor, download=download))
+    finish_run(run, log_path=None)
+    assert run.stages["fetch"]["calls"] == 3
+    assert run.stages["analysis"]["calls"] == 3
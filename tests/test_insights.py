@@ -0,0 +1,160 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from diangat import insights
+from diangat.insights import (
+    HTTPBackend,
+    RateLimiter,
+    TransientError,
+    start_stub_server,
+    summarize,
+)
+
+from conftest import ConcurrencyRecorder
+
+THEMES = ["agriculture", "éducation", "santé", "numérique", "pêche", "énergie"]
+TEXT = " ".join(
+    f"La phrase {idx} parle de {THEMES[idx % len(THEMES)]} et de {THEMES[idx * 7 % 6]}."
+    for idx in range(300)
+)
+
+
+class RecordingBackend(ConcurrencyRecorder):
+    def __init__(self, answer="agriculture, santé", latency=0.0, failures=0, error=None):
+        super().__init__()
+        self.model = "recording"
+        self.answer = answer
+        self.latency = latency
+        self.failures = failures
+        self.error = error or TransientError("unavailable")
+
+    def complete(self, prompt, max_tokens):
+        with self.call(prompt) as calls:
+            time.sleep(self.latency)
+            if calls <= self.failures:
+                raise self.error
+            return self.answer
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(insights, "RETRY_BACKOFF", 0.0)
+
+
+def run(text, backend, cache, **kwargs):
+    kwargs.setdefault("chunk_tokens", 200)
+    kwargs.setdefault("overlap_tokens", 20)
+    return summarize(text, backend, requests_per_minute=0, cache=cache, **kwargs)
+
+
+def test_summary_is_cached(cache):
+    backend = RecordingBackend()
+    first = run(TEXT, backend, cache)
+    assert len(first.chunks) > 1
+    assert first.summary == "agriculture, santé"
+    assert first.requests == len(backend.calls)
+    assert first.cached == 0
+
+    second = run(TEXT, backend, cache)
+    assert len(backend.calls) == first.requests
+    assert second.cached == second.requests == first.requests
+    assert second.summary == first.summary
+
+
+def test_reduce_ends_when_two_insights_exceed_a_chunk(cache):
+    # Every answer is longer than half a chunk, so no two of them fit in one request
+    backend = RecordingBackend(answer=" ".join(["thème"] * 120))
+    result = run(TEXT, backend, cache)
+    assert result.summary == backend.answer
+    assert len(result.chunk_insights) > 2
+
+
+def test_reduce_rounds_are_bounded(cache, monkeypatch):
+    monkeypatch.setattr(insights, "MAX_REDUCE_ROUNDS", 1)
+    backend = RecordingBackend(answer=" ".join(["thème"] * 120))
+    result = run(TEXT, backend, cache)
+    # Map requests, then every insight merged in one request
+    assert result.requests == len(result.chunks) + 1
+
+
+def test_transient_errors_are_retried(cache):
+    backend = RecordingBackend(failures=2)
+    result = run("Une seule phrase sur la santé.", backend, cache, retries=3)
+    assert result.summary == "agriculture, santé"
+    assert len(backend.calls) == 3
+
+
+def test_other_errors_are_not_retried(cache):
+    backend = RecordingBackend(failures=1, error=ValueError("bad request"))
+    with pytest.raises(ValueError):
+        run("Une seule phrase sur la santé.", backend, cache, retries=3)
+    assert len(backend.calls) == 1
+
+
+def test_concurrency_is_bounded(cache):
+    backend = RecordingBackend(latency=0.05)
+    result = run(TEXT, backend, cache, max_concurrency=3)
+    assert len(result.chunks) > 3
+    assert 1 < backend.max_in_flight <= 3
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(600)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    assert time.monotonic() - start >= 0.45
+
+
+def test_stub_server_end_to_end(cache):
+    server = start_stub_server()
+    try:
+        backend = HTTPBackend(f"http://127.0.0.1:{server.server_port}/v1", model="stub")
+        result = run(TEXT, backend, cache, max_concurrency=4)
+    finally:
+        server.shutdown()
+    assert len(result.chunks) > 1
+    assert "agriculture" in result.summary
+
+
+def status_server(status):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.mark.parametrize(
+    "status, error", [(429, TransientError), (503, TransientError), (401, requests.HTTPError)]
+)
+def test_http_backend_errors(status, error):
+    server = status_server(status)
+    try:
+        backend = HTTPBackend(f"http://127.0.0.1:{server.server_port}/v1", model="stub")
+        with pytest.raises(error):
+            backend.complete("prompt", 10)
+    finally:
+        server.shutdown()
+
+
+def test_http_backend_connection_error_is_transient():
+    server = status_server(200)
+    port = server.server_port
+    server.shutdown()
+    server.server_close()
+    backend = HTTPBackend(f"http://127.0.0.1:{port}/v1", model="stub")
+    with pytest.raises(TransientError):
+        backend.complete("prompt", 10)
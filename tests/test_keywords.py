@@ -0,0 +1,90 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from diangat import keywords
+from diangat.keywords import (
+    extract_keywords,
+    extract_keywords_parallel,
+    merge_candidates,
+    rank_overlap,
+    sentence_chunks,
+)
+from diangat.segmentation import segment
+
+from benchmarks.synthetic import make_pages
+
+CANDIDATES = [
+    [("Santé publique", 0.5), ("pêche", 0.2)],
+    [("santé publique", 0.5), ("école", 0.3), ("Santés publique", 0.6)],
+]
+
+
+@pytest.fixture(autouse=True)
+def keywords_cache(monkeypatch):
+    monkeypatch.setattr(keywords, "_keywords_cache", OrderedDict())
+
+
+def test_chunks_are_whole_sentences_covering_the_text():
+    text = " ".join(make_pages(3))
+    document = segment(text)
+    starts, ends = set(document.starts), set(document.ends)
+    chunks = sentence_chunks(text, chunk_chars=2000)
+    assert len(chunks) > 1
+
+    position = document.starts[0]
+    for chunk in chunks:
+        start = text.index(chunk, position)
+        assert not text[position:start].strip()
+        assert start in starts and start + len(chunk) in ends
+        assert len(chunk) <= 2000 or len(segment(chunk)) == 1
+        position = start + len(chunk)
+    assert position == document.ends[-1]
+
+
+def test_sentence_longer_than_a_chunk_is_a_chunk_of_its_own():
+    long_sentence = "La liste " + "des écoles " * 50 + "est longue."
+    text = f"La santé d'abord. {long_sentence} La pêche ensuite."
+    assert sentence_chunks(text, chunk_chars=100) == [
+        "La santé d'abord.",
+        long_sentence,
+        "La pêche ensuite.",
+    ]
+
+
+def test_candidates_of_the_chunks_are_merged():
+    # The inverse scores add up: twice 0.5 is 0.25, ranked between 0.2 and 0.3
+    assert merge_candidates(CANDIDATES, top=5, deduplication_threshold=1) == (
+        ("pêche", 0.2),
+        ("Santé publique", 0.25),
+        ("école", 0.3),
+        ("Santés publique", 0.6),
+    )
+    assert merge_candidates(CANDIDATES, top=2, deduplication_threshold=1) == (
+        ("pêche", 0.2),
+        ("Santé publique", 0.25),
+    )
+
+
+def test_near_duplicate_candidates_are_dropped():
+    merged = merge_candidates(CANDIDATES, top=5, deduplication_threshold=0.8)
+    assert [keyword for keyword, _ in merged] == ["pêche", "Santé publique", "école"]
+
+
+def test_rank_overlap():
+    assert rank_overlap(["a", "b", "c"], ["A", "b", "c"]) == 1.0
+    assert rank_overlap(["a", "b"], ["c", "d"]) == 0.0
+    assert rank_overlap([], []) == 1.0
+    assert rank_overlap(["a", "b", "c"], ["b", "a", "c"]) < rank_overlap(
+        ["a", "b", "c"], ["a", "c", "b"]
+    )
+
+
+def test_chunked_keywords_agree_with_the_whole_text():
+    text = " ".join(make_pages(20))
+    reference = [keyword for keyword, _ in extract_keywords(text, top=20)]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        chunked = extract_keywords_parallel(text, top=20, chunk_chars=15000, executor=executor)
+    assert len(chunked) == 20
+    assert rank_overlap(reference, [keyword for keyword, _ in chunked], 20) > 0.8
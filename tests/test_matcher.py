@@ -0,0 +1,42 @@
+import pytest
+
+from diangat.matcher import ThemeMatcher
+from diangat.subjects import selected_subjects
+
+from benchmarks.bench_matcher import make_document, matcher_hits, regex_hits
+from benchmarks.synthetic import make_sentences
+
+# Sentences on the edges of the historical regex: word boundaries, repeated and nested
+# synonyms, and characters that case folding treats apart
+EDGE_SENTENCES = [
+    "L'ÉDUCATION et la Formation professionnelle.",
+    "Les usines_agricoles ne comptent pas, les usines-agricoles si.",
+    "Une pêche2024 durable et la pisciculture.",
+    "L'investissement étranger et l'investissement étrangers.",
+    "İNVESTİSSEMENT dans les banques, İnvestissement dans le gaz naturel.",
+    "La ſanté publique et les ſervices de ſanté.",
+    "ÉCONOMIE NUMÉRIQUE, économies d'énergie.",
+    "Rien à signaler ici.",
+    "",
+]
+
+
+def test_matches_the_regex_on_the_bundled_subjects():
+    sentences = make_sentences(20) + EDGE_SENTENCES
+    expected = regex_hits(sentences, selected_subjects)
+    assert matcher_hits(make_document(sentences), selected_subjects) == expected
+    assert sum(expected.values()) > 0
+
+
+@pytest.mark.parametrize("sentence", EDGE_SENTENCES)
+def test_each_sentence_matches_the_regex(sentence):
+    matcher = ThemeMatcher(selected_subjects)
+    counts = regex_hits([sentence], selected_subjects)
+    expected = [theme for theme, count in counts.items() if count]
+    assert matcher.themes_of(matcher.match(sentence)) == expected
+
+
+def test_dotted_capital_i_keeps_offsets():
+    sentences = ["İNVESTİSSEMENT public.", "Les banques.", "Rien."]
+    hits = ThemeMatcher(selected_subjects).find_hits(make_document(sentences))
+    assert list(hits["Finance"]) == [0, 1]
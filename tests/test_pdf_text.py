@@ -0,0 +1,83 @@
+import io
+
+import pytest
+from PyPDF2 import PdfReader
+
+from diangat import pdf_text
+from diangat.pdf_text import extract_many, extract_reader_pages, iter_extract_many, pdf_cache_key
+
+from benchmarks.synthetic import make_pages, make_pdf
+
+PDFS = [make_pdf(make_pages(10, seed=1)), make_pdf(make_pages(7, seed=2))]
+
+
+@pytest.fixture(autouse=True)
+def page_cache(cache, monkeypatch):
+    monkeypatch.setattr(pdf_text, "_page_cache", cache)
+    return cache
+
+
+def reference_pages(data):
+    pdf_reader = PdfReader(io.BytesIO(data))
+    _, pages, _ = extract_reader_pages(pdf_reader, 0, len(pdf_reader.pages), None)
+    return pages
+
+
+def test_pages_are_reassembled_in_order(monkeypatch):
+    run_inline = pdf_text._run_inline
+    pending = {}
+
+    # The page ranges of each file come back last first
+    def last_range_first(path, start, stop, page_timeout):
+        if path not in pending:
+            total_pages = len(PdfReader(path).pages)
+            step = stop - start
+            pending[path] = [
+                run_inline(path, first, min(first + step, total_pages), page_timeout)
+                for first in range(0, total_pages, step)
+            ]
+        return pending[path].pop()
+
+    monkeypatch.setattr(pdf_text, "_run_inline", last_range_first)
+    results = extract_many(PDFS, max_workers=1, pages_per_task=3)
+    assert results == [reference_pages(data) for data in PDFS]
+    assert len(pending) == 2 and not any(pending.values())
+
+
+def test_unreadable_file_does_not_fail_the_others(monkeypatch):
+    run_inline = pdf_text._run_inline
+
+    def failing_range(path, start, stop, page_timeout):
+        if path.endswith("2.pdf") and start > 0:
+            raise ValueError("corrupted page")
+        return run_inline(path, start, stop, page_timeout)
+
+    monkeypatch.setattr(pdf_text, "_run_inline", failing_range)
+    pdf_files = [PDFS[0], b"not a pdf", PDFS[1]]
+    results = dict(iter_extract_many(pdf_files, max_workers=1, pages_per_task=3))
+    assert sorted(results) == [0, 1, 2]
+    assert results[0] == reference_pages(PDFS[0])
+    assert isinstance(results[1], Exception)
+    assert isinstance(results[2], ValueError)
+
+
+def test_pages_that_timed_out_are_not_cached(page_cache, monkeypatch):
+    run_inline = pdf_text._run_inline
+
+    def slow_first_page(path, start, stop, page_timeout):
+        start, pages, timed_out = run_inline(path, start, stop, page_timeout)
+        if path.endswith("1.pdf") and start == 0:
+            pages[0] = ""
+            timed_out = [0]
+        return start, pages, timed_out
+
+    monkeypatch.setattr(pdf_text, "_run_inline", slow_first_page)
+    results = extract_many(PDFS, max_workers=1, pages_per_task=3)
+    assert results[0] == reference_pages(PDFS[0])
+    assert results[1][0] == "" and results[1][1:] == reference_pages(PDFS[1])[1:]
+    assert page_cache.get(pdf_cache_key(PDFS[0])) is not None
+    assert page_cache.get(pdf_cache_key(PDFS[1])) is None
+
+    # The next extraction tries the file again
+    monkeypatch.setattr(pdf_text, "_run_inline", run_inline)
+    assert extract_many(PDFS[1:], max_workers=1, pages_per_task=3) == [reference_pages(PDFS[1])]
@@ -0,0 +1,74 @@
+from diangat.matcher import theme_proportions
+from diangat.pipeline import (
+    MAX_CARRY_CHARS,
+    PageSentences,
+    count_document_themes,
+    count_themes,
+    iter_page_sentences,
+)
+from diangat.segmentation import segment
+from diangat.subjects import selected_subjects
+
+from benchmarks.synthetic import make_pages
+
+# The first sentence of a page often starts on the previous one
+PAGES = [
+    "La santé publique d'abord. Les écoles et la formation des",
+    "jeunes seront une priorité. L'agriculture aussi.",
+    "Sans point final sur la pêche",
+    "",
+    "et les usines. Fin du programme.",
+]
+
+
+def test_page_sentences_match_the_segmentation():
+    for pages in [PAGES, make_pages(12)]:
+        expected = list(iter_page_sentences(pages))
+        sentences = PageSentences(pages)
+        for document in iter_page_sentences(pages):
+            assert sentences.add(document) > 0
+        assert len(sentences) == len(expected) == len(pages) + 1
+        for document, kept in zip(expected, sentences):
+            assert kept.text == document.text
+            assert list(kept.starts) == list(document.starts)
+            assert list(kept.ends) == list(document.ends)
+        assert count_document_themes(sentences, selected_subjects) == count_document_themes(
+            expected, selected_subjects
+        )
+
+
+def test_page_sentences_do_not_copy_the_pages():
+    pages = make_pages(12)
+    sentences = PageSentences(pages)
+    held = sum(sentences.add(document) for document in iter_page_sentences(pages))
+    # The pages are only referenced, the carried sentences and the offsets are kept
+    assert held < sum(len(page) for page in pages) / 4
+    first = next(iter(sentences))
+    assert first.text is pages[0]
+
+
+def test_streamed_counts_match_the_whole_document():
+    for pages in [PAGES, make_pages(12)]:
+        result = count_themes(pages, selected_subjects)
+        document = segment(" ".join(pages))
+        subject_count = count_document_themes([document], selected_subjects)
+        assert sum(subject_count.values()) > 0
+        assert result.pages == len(pages)
+        assert result.total_sentences == len(document)
+        assert result.subject_count == subject_count
+        assert result.proportions == theme_proportions(subject_count)
+
+
+def test_sentence_longer_than_the_carry_is_cut():
+    words = "les chiffres du tableau suivent"
+    table = " ".join([words] * (MAX_CARRY_CHARS // len(words) + 10))
+    pages = [
+        "La santé publique d'abord. Une liste sans fin commence " + table[:15000],
+        table[15000:] + " avec la pêche",
+        table[:12000] + " fin de la liste. L'école aussi.",
+    ]
+    result = count_themes(pages, selected_subjects)
+    document = segment(" ".join(pages))
+    # The run-on sentence is split once it outgrows the carry, its themes are counted once
+    assert result.total_sentences == len(document) + 1
+    assert result.subject_count == count_document_themes([document], selected_subjects)
@@ -0,0 +1,66 @@
+import numpy as np
+
+from diangat.similarity import (
+    cosine_similarity,
+    sparse_rows,
+    term_similarity,
+    theme_similarity,
+    tfidf,
+)
+from diangat.theme_matrix import ThemeMatrix
+
+ROWS = [
+    {"santé": 3, "école": 1, "la": 5},
+    {"santé": 1, "pêche": 2, "la": 4},
+    {},
+    {"école": 2, "la": 1},
+]
+
+
+def dense_tfidf(counts):
+    counts = np.asarray(counts, dtype=np.float64)
+    document_frequency = (counts > 0).sum(axis=0)
+    idf = np.log((1 + len(counts)) / (1 + document_frequency)) + 1
+    weights = np.zeros_like(counts)
+    present = counts > 0
+    weights[present] = 1 + np.log(counts[present])
+    return weights * idf
+
+
+def dense_cosine(matrix):
+    norms = np.linalg.norm(matrix, axis=1)
+    similarity = np.zeros((len(matrix), len(matrix)))
+    for i in range(len(matrix)):
+        for j in range(len(matrix)):
+            if norms[i] and norms[j]:
+                similarity[i, j] = matrix[i] @ matrix[j] / (norms[i] * norms[j])
+    return similarity
+
+
+def test_sparse_rows_share_the_vocabulary():
+    counts, vocabulary = sparse_rows(ROWS)
+    assert counts.shape == (4, 4)
+    assert counts[0, vocabulary["la"]] == 5
+    assert counts[2].nnz == 0
+    more, same = sparse_rows([{"pêche": 1, "mer": 1}], vocabulary)
+    assert same is vocabulary and more.shape == (1, 5)
+
+
+def test_tfidf_and_cosine_match_the_dense_reference():
+    counts, _ = sparse_rows(ROWS)
+    weights = tfidf(counts)
+    expected = dense_tfidf(counts.toarray())
+    assert np.allclose(weights.toarray(), expected)
+
+    similarity = cosine_similarity(weights)
+    assert np.allclose(similarity, dense_cosine(expected))
+    assert np.allclose(np.diag(similarity), [1.0, 1.0, 0.0, 1.0])
+    assert not similarity[2].any() and not similarity[:, 2].any()
+    assert np.allclose(similarity, similarity.T)
+    assert np.allclose(term_similarity(ROWS), similarity)
+
+
+def test_documents_without_themes_are_similar_to_nothing():
+    counts = [2, 0, 4, 0, 0, 0]
+    matrix = ThemeMatrix(["a.pdf", "b.pdf", "vide.pdf"], ["Santé", "Pêche"], counts, [4, 8, 0])
+    assert np.allclose(theme_similarity(matrix), [[1, 1, 0], [1, 1, 0], [0, 0, 0]])
@@ -0,0 +1,45 @@
+import numpy as np
+
+from diangat.index import DocumentIndex
+from diangat.subjects import selected_subjects
+from diangat.theme_matrix import ThemeMatrix
+
+from benchmarks.synthetic import make_pages
+
+SUBJECTS = {theme: selected_subjects[theme] for theme in ["Santé", "Éducation", "Agriculture"]}
+
+
+def test_proportions_of_empty_documents_are_zero():
+    counts = [2, 1, 0, 0, 0, 0, 0, 3, 6]
+    matrix = ThemeMatrix(["a.pdf", "vide.pdf", "b.pdf"], SUBJECTS, counts, [4, 0, 6])
+    assert matrix.proportions().tolist() == [
+        [0.5, 0.25, 0.0],
+        [0.0, 0.0, 0.0],
+        [0.0, 0.5, 1.0],
+    ]
+    assert matrix.theme_proportions("Éducation").tolist() == [0.25, 0.0, 0.5]
+
+
+def test_matrix_of_indexes():
+    documents = ["a.pdf", "b.pdf", "vide.pdf"]
+    indexes = [
+        DocumentIndex.build(make_pages(2, seed=1)),
+        DocumentIndex.build(make_pages(3, seed=2)),
+        DocumentIndex.build([""]),
+    ]
+    matrix = ThemeMatrix.from_indexes(documents, indexes, SUBJECTS)
+    assert matrix.counts.shape == (3, 3)
+    assert matrix.sentences.tolist() == [index.total_sentences for index in indexes]
+    for row, index in enumerate(indexes):
+        counts = index.theme_counts(SUBJECTS)
+        assert matrix.counts[row].tolist() == list(counts.values())
+    for column, theme in enumerate(SUBJECTS):
+        expected = [
+            index.theme_counts(SUBJECTS)[theme] / index.total_sentences
+            if index.total_sentences
+            else 0.0
+            for index in indexes
+        ]
+        assert np.allclose(matrix.theme_proportions(theme), expected)
+        assert np.array_equal(matrix.theme_proportions(theme), matrix.proportions()[:, column])
+    assert matrix.counts[:2].sum() > 0
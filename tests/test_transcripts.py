@@ -0,0 +1,119 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from diangat.subjects import selected_subjects
+from diangat.transcripts import (
+    fetch_transcript,
+    iter_video_analyses,
+    list_videos,
+    transcript_analysis,
+    video_id,
+)
+
+from benchmarks.synthetic import make_pages
+from conftest import ConcurrencyRecorder
+
+SUBJECTS = {theme: selected_subjects[theme] for theme in ["Santé", "Éducation", "Agriculture"]}
+
+
+class RecordingFetcher(ConcurrencyRecorder):
+    def __init__(self, videos=8, latency=0.0, missing=()):
+        super().__init__()
+        self.transcripts = {
+            f"video{idx:06d}": " ".join(make_pages(1, seed=idx)) for idx in range(videos)
+        }
+        self.latency = latency
+        self.missing = set(missing)
+
+    def video_ids(self, url):
+        ids = list(self.transcripts)
+        return ids + ids[:2]
+
+    def transcript(self, video_id, languages):
+        with self.call(video_id, languages):
+            time.sleep(self.latency)
+            if video_id in self.missing:
+                raise LookupError(f"no transcript for {video_id}")
+            return self.transcripts[video_id]
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+def analyse(fetcher, cache, executor, **kwargs):
+    return list(
+        iter_video_analyses(
+            list(fetcher.transcripts),
+            SUBJECTS,
+            num_keywords=0,
+            executor=executor,
+            fetcher=fetcher,
+            cache=cache,
+            **kwargs,
+        )
+    )
+
+
+def test_video_id():
+    assert video_id("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10") == "dQw4w9WgXcQ"
+    assert video_id("https://youtu.be/dQw4w9WgXcQ") == "dQw4w9WgXcQ"
+    assert video_id("dQw4w9WgXcQ") == "dQw4w9WgXcQ"
+    with pytest.raises(ValueError):
+        video_id("https://www.youtube.com/")
+
+
+def test_videos_are_listed_once():
+    fetcher = RecordingFetcher(videos=3)
+    assert list_videos("playlist", fetcher) == list(fetcher.transcripts)
+
+
+def test_transcript_is_downloaded_once(cache):
+    fetcher = RecordingFetcher(videos=1)
+    [video] = fetcher.transcripts
+    first = fetch_transcript(video, ("fr",), fetcher, cache)
+    assert fetch_transcript(video, ("fr",), fetcher, cache) == first == fetcher.transcripts[video]
+    assert fetcher.calls == [(video, ("fr",))]
+
+    # Another choice of languages is another transcript
+    fetch_transcript(video, ("en", "fr"), fetcher, cache)
+    assert len(fetcher.calls) == 2
+
+
+def test_playlist_downloads_are_bounded(cache, executor):
+    fetcher = RecordingFetcher(videos=8, latency=0.05)
+    analyses = analyse(fetcher, cache, executor, max_connections=3)
+    assert len(analyses) == 8
+    assert 1 < fetcher.max_in_flight <= 3
+
+
+def test_playlist_counts_add_up(cache, executor):
+    fetcher = RecordingFetcher(videos=6, missing=["video000002"])
+    analyses = analyse(fetcher, cache, executor)
+
+    expected = dict.fromkeys(SUBJECTS, 0)
+    for video, text in fetcher.transcripts.items():
+        if video not in fetcher.missing:
+            _, counts, _ = transcript_analysis(text, SUBJECTS, 0)
+            for subject, count in counts.items():
+                expected[subject] += count
+    assert sum(expected.values()) > 0
+
+    failed = [video for video, _ in analyses if video.error is not None]
+    assert [video.video_id for video in failed] == ["video000002"]
+    _, aggregate = analyses[-1]
+    assert (aggregate.videos, aggregate.failed) == (5, 1)
+    assert aggregate.subject_count == expected
+    assert aggregate.total_sentences == sum(video.sentences or 0 for video, _ in analyses)
+
+
+def test_playlist_analysed_again_from_the_cache(cache, executor):
+    fetcher = RecordingFetcher(videos=4)
+    first = analyse(fetcher, cache, executor)
+    second = analyse(fetcher, cache, executor)
+    assert len(fetcher.calls) == 4
+    assert second[-1][1] == first[-1][1]
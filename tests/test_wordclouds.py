@@ -0,0 +1,40 @@
+import pytest
+
+from diangat import wordclouds
+from diangat.disk_cache import DiskCache
+
+
+@pytest.fixture
+def renders(tmp_path, monkeypatch):
+    renders = []
+
+    def render(keywords, width, height):
+        renders.append(keywords)
+        return f"{keywords} {width}x{height}".encode("utf-8")
+
+    monkeypatch.setattr(wordclouds, "_wordcloud_cache", DiskCache(tmp_path / "wordclouds", 1 << 30))
+    monkeypatch.setattr(wordclouds, "_png_cache", type(wordclouds._png_cache)())
+    monkeypatch.setattr(wordclouds, "render_wordcloud", render)
+    return renders
+
+
+def test_same_keywords_are_rendered_once(renders):
+    keywords = (("agriculture", 0.01), ("santé publique", 0.02))
+    first = wordclouds.wordcloud_png(keywords)
+    assert wordclouds.wordcloud_png(list(keywords)) == first
+    wordclouds._png_cache.clear()
+    assert wordclouds.wordcloud_png(keywords) == first
+    assert len(renders) == 1
+
+
+def test_other_keywords_get_their_own_image(renders):
+    # Same text and number of keywords, other extraction parameters
+    first = wordclouds.wordcloud_png((("agriculture", 0.01), ("santé", 0.02)))
+    second = wordclouds.wordcloud_png((("agriculture", 0.01), ("santé publique", 0.03)))
+    assert first != second
+    assert len(renders) == 2
+
+
+def test_size_is_part_of_the_key(renders):
+    keywords = (("agriculture", 0.01),)
+    assert wordclouds.wordcloud_png(keywords, (200, 100)) != wordclouds.wordcloud_png(keywords)